@@ -1,7 +1,8 @@
 from typing import Optional, Sequence
-from asgiref.sync import sync_to_async
 from django.db.models import Q
 from core.models import Post
+from core.dbexec import db_read
+from core.writer import write
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes
 
@@ -21,14 +22,16 @@ def format_post(p: Post) -> str:
     ]
     return "\n".join(lines)
 
-@sync_to_async
+@db_read
 def fetch_unposted(limit: int = 10) -> Sequence[Post]:
-    return list(Post.objects.filter(posted_to_channel=False).order_by("created_at")[:limit])
+    return list(Post.objects.unposted().order_by("created_at")[:limit])
 
-@sync_to_async
-def mark_posted(ids: list[int]):
+def _mark_posted_sync(ids: list[int]):
     Post.objects.filter(id__in=ids).update(posted_to_channel=True)
 
+async def mark_posted(ids: list[int]):
+    await write(_mark_posted_sync, ids)
+
 async def post_new_items_job(context: ContextTypes.DEFAULT_TYPE):
     channel = context.bot_data.get("target_channel")
     if not channel:
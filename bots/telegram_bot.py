@@ -1,8 +1,11 @@
 from typing import Sequence
+import asyncio
 import re, html
-from asgiref.sync import sync_to_async
 from django.db.models import QuerySet
 from core.models import Post
+from core.dbexec import db_read
+from core.writer import write
+from crawlers.backpressure import backpressure_enabled, current as current_pressure, posts_per_tick
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes, JobQueue
 
@@ -198,12 +201,12 @@ def format_post(p: dict) -> str:
 
 # ----------------- DB (async-safe) -----------------
 
-@sync_to_async
+@db_read
 def fetch_unposted(limit: int = 1) -> list[dict]:
     qs: QuerySet[Post] = (
         Post.objects
+        .unposted()
         .select_related("source")
-        .filter(posted_to_channel=False)
         .order_by("created_at")[:limit]
     )
     out: list[dict] = []
@@ -222,44 +225,71 @@ def fetch_unposted(limit: int = 1) -> list[dict]:
             "currency": obj.currency or "",
             "period": obj.period or "",
             "tags": obj.tags or [],
+            "tg_message_id": obj.tg_message_id,
         })
     return out
 
-@sync_to_async
-def mark_posted(ids: list[int]) -> None:
+def _mark_posted_sync(ids: list[int]) -> None:
     Post.objects.filter(id__in=ids).update(posted_to_channel=True)
 
+async def mark_posted(ids: list[int]) -> None:
+    await write(_mark_posted_sync, ids)
+
 # ----------------- Bot jobs & handlers -----------------
 
+# Spacing between posts within one tick (Telegram throttles bursts to a channel)
+POST_GAP_SECONDS = 3.0
+
 async def post_new_items_job(context: ContextTypes.DEFAULT_TYPE):
-    """Runs every N seconds. Posts at most ONE item to throttle the channel."""
+    """
+    Runs every N seconds. Posts ONE item to throttle the channel, or a few
+    when the unposted backlog is under pressure (crawlers/backpressure.py).
+    Channel posts are re-checked against Telegram first.
+    """
     channel = context.bot_data.get("target_channel")
     if not channel:
         return
 
-    items = await fetch_unposted(limit=1)
-    if not items:
-        return
-
-    p = items[0]
-    try:
-        await context.bot.send_message(
-            chat_id=channel,
-            text=format_post(p),
-            disable_web_page_preview=True,
-        )
-        await mark_posted([p["id"]])
-        print(f"✅ Posted: {p['title']}")
-    except Exception as e:
-        print(f"⚠️ Failed to post: {e}")
+    limit = 1
+    if backpressure_enabled():
+        limit = posts_per_tick(current_pressure())
+    items = await fetch_unposted(limit=limit)
+
+    # Channel posts may have been edited or deleted since ingestion (crawlers/tg_sync.py)
+    pool = context.bot_data.get("channel_pool")
+    if pool and any(p["tg_message_id"] for p in items):
+        from crawlers.tg_sync import verify
+        held = await verify(pool, [p["id"] for p in items if p["tg_message_id"]])
+        items = [p for p in items if p["id"] not in held]
+
+    for i, p in enumerate(items):
+        if i:
+            await asyncio.sleep(POST_GAP_SECONDS)
+        try:
+            await context.bot.send_message(
+                chat_id=channel,
+                text=format_post(p),
+                disable_web_page_preview=True,
+            )
+            await mark_posted([p["id"]])
+            print(f"✅ Posted: {p['title']}")
+        except Exception as e:
+            print(f"⚠️ Failed to post: {e}")
+            break
 
 async def ping(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("pong")
 
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Crawl-cycle lag/overrun metrics (crawlers/metrics.py)."""
+    from crawlers.metrics import format_stats
+    await update.message.reply_text(format_stats())
+
 def build_application(bot_token: str, target_channel: str, post_interval_seconds: int = 10):
     """Build PTB Application with an explicit JobQueue."""
     app = Application.builder().token(bot_token).job_queue(JobQueue()).build()
     app.add_handler(CommandHandler("ping", ping))
+    app.add_handler(CommandHandler("stats", stats))
 
     if app.job_queue:
         app.job_queue.run_repeating(
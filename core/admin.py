@@ -1,17 +1,143 @@
 # core/admin.py
+import json
+from datetime import datetime, timedelta, timezone
 from django.contrib import admin
-from .models import Source, Post
+from django.db.models import Avg, Count, Max, Q, Sum
+from .models import Source, Post, CrawlJob, CrawlRun, ResolvedPeer, SourceCrawlStats
 
 @admin.register(Source)
 class SourceAdmin(admin.ModelAdmin):
-    list_display = ("name", "type", "category", "is_active", "last_crawled", "parser")
-    list_filter = ("type", "category", "is_active")
+    list_display = ("name", "type", "category", "is_active", "last_crawled", "crawl_interval", "next_due",
+                    "failure_streak", "breaker_state", "quarantined_until", "last_error", "parser")
+    list_filter = ("type", "category", "is_active", "breaker_state")
     search_fields = ("name", "url", "parser")
+    actions = ("reset_breaker",)
+
+    @admin.action(description="Reset circuit breaker (crawl again now)")
+    def reset_breaker(self, request, queryset):
+        from crawlers.breaker import reset
+        n = reset(queryset)
+        self.message_user(request, f"Breaker reset for {n} source(s); picked up at the next scheduler resync.")
 
 @admin.register(Post)
 class PostAdmin(admin.ModelAdmin):
     list_display = ("title", "company", "location", "currency", "salary_min", "salary_max",
-                    "source", "category", "posted_to_channel", "created_at")
-    list_filter = ("category", "posted_to_channel", "source", "currency", "period")
-    search_fields = ("title", "description", "link", "company", "location", "raw_text")
-    readonly_fields = ("created_at",)
+                    "source", "category", "posted_to_channel", "is_duplicate", "created_at")
+    list_filter = ("category", "posted_to_channel", "is_duplicate", "source", "currency", "period")
+    search_fields = ("title", "description", "link", "company", "location")
+    readonly_fields = ("created_at", "payload_preview")
+    raw_id_fields = ("duplicate_of",)
+
+    @admin.display(description="Payload (extras / raw text)")
+    def payload_preview(self, obj):
+        # Only the change view loads the compressed side row
+        return json.dumps(obj.load_payload(), ensure_ascii=False, indent=2)[:5000] if obj.pk else ""
+
+@admin.register(CrawlJob)
+class CrawlJobAdmin(admin.ModelAdmin):
+    list_display = ("source", "due_at", "priority", "lease_owner", "lease_expires", "attempts", "created_at")
+    list_filter = ("lease_owner",)
+    raw_id_fields = ("source",)
+
+@admin.register(CrawlRun)
+class CrawlRunAdmin(admin.ModelAdmin):
+    list_display = ("source", "started_at", "duration_ms", "fetch_ms", "parse_ms", "persist_ms",
+                    "bytes_downloaded", "http_attempts", "scraped", "new", "updated", "unchanged", "error")
+    list_filter = ("error", "source__type", "source")
+    date_hierarchy = "started_at"
+    ordering = ("-started_at",)
+    list_select_related = ("source",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ResolvedPeer)
+class ResolvedPeerAdmin(admin.ModelAdmin):
+    # deleting a row forces a fresh resolve on the next crawl
+    list_display = ("username", "account", "peer_id", "peer_type", "resolved_at")
+    list_filter = ("account", "peer_type")
+    search_fields = ("username",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+# Window the crawl-stats changelist aggregates over
+CRAWL_STATS_DAYS = 7
+
+@admin.register(SourceCrawlStats)
+class SourceCrawlStatsAdmin(admin.ModelAdmin):
+    """Per-source CrawlRun aggregates; sort by a column to find the slowest/noisiest sources."""
+    list_display = ("name", "type", "runs", "avg_s", "max_s", "avg_fetch_s", "avg_persist_s",
+                    "mb_downloaded", "avg_attempts", "avg_new", "error_pct")
+    list_filter = ("type", "category", "is_active")
+    search_fields = ("name",)
+
+    def get_queryset(self, request):
+        since = datetime.now(timezone.utc) - timedelta(days=CRAWL_STATS_DAYS)
+        recent = Q(crawl_runs__started_at__gte=since)
+        return super().get_queryset(request).annotate(
+            _runs=Count("crawl_runs", filter=recent),
+            _avg_ms=Avg("crawl_runs__duration_ms", filter=recent),
+            _max_ms=Max("crawl_runs__duration_ms", filter=recent),
+            _fetch_ms=Avg("crawl_runs__fetch_ms", filter=recent),
+            _persist_ms=Avg("crawl_runs__persist_ms", filter=recent),
+            _bytes=Sum("crawl_runs__bytes_downloaded", filter=recent),
+            _attempts=Avg("crawl_runs__http_attempts", filter=recent),
+            _new=Avg("crawl_runs__new", filter=recent),
+            _errors=Count("crawl_runs", filter=recent & ~Q(crawl_runs__error="")),
+        ).order_by("-_avg_ms")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    @staticmethod
+    def _secs(ms):
+        return None if ms is None else round(ms / 1000, 2)
+
+    @admin.display(description=f"runs ({CRAWL_STATS_DAYS}d)", ordering="_runs")
+    def runs(self, obj):
+        return obj._runs
+
+    @admin.display(description="avg s", ordering="_avg_ms")
+    def avg_s(self, obj):
+        return self._secs(obj._avg_ms)
+
+    @admin.display(description="max s", ordering="_max_ms")
+    def max_s(self, obj):
+        return self._secs(obj._max_ms)
+
+    @admin.display(description="avg fetch s", ordering="_fetch_ms")
+    def avg_fetch_s(self, obj):
+        return self._secs(obj._fetch_ms)
+
+    @admin.display(description="avg persist s", ordering="_persist_ms")
+    def avg_persist_s(self, obj):
+        return self._secs(obj._persist_ms)
+
+    @admin.display(description="MB", ordering="_bytes")
+    def mb_downloaded(self, obj):
+        return None if obj._bytes is None else round(obj._bytes / 1e6, 1)
+
+    @admin.display(description="avg HTTP attempts", ordering="_attempts")
+    def avg_attempts(self, obj):
+        return None if obj._attempts is None else round(obj._attempts, 1)
+
+    @admin.display(description="avg new", ordering="_new")
+    def avg_new(self, obj):
+        return None if obj._new is None else round(obj._new, 1)
+
+    @admin.display(description="errors %", ordering="_errors")
+    def error_pct(self, obj):
+        return round(100 * obj._errors / obj._runs) if obj._runs else None
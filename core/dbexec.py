@@ -0,0 +1,49 @@
+# core/dbexec.py
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, TypeVar
+
+from django.db import connection
+
+# =========================================================
+# Dedicated executor for DB reads from async code
+# =========================================================
+#
+# The bot (PTB), the Pyrogram client and the crawl loops share one event
+# loop, so an ORM call made on it stalls Telegram I/O for as long as the DB
+# takes. Reads go to a small pool of their own instead: plain sync_to_async
+# funnels every call through one shared thread, where a slow query would
+# also queue up unrelated lookups. Writes keep going through core/writer.py.
+#
+# Tunables:
+#   DB_READ_THREADS  worker threads (default 4)
+
+DB_READ_THREADS = int(os.getenv("DB_READ_THREADS", "4"))
+
+_pool = ThreadPoolExecutor(max_workers=DB_READ_THREADS, thread_name_prefix="db-read")
+
+T = TypeVar("T")
+
+def _call(fn: Callable[..., T], args: tuple, kwargs: dict) -> T:
+    try:
+        return fn(*args, **kwargs)
+    except Exception:
+        # Each worker thread keeps its own connection; drop it if it broke
+        connection.close_if_unusable_or_obsolete()
+        raise
+
+async def run_db(fn: Callable[..., T], *args, **kwargs) -> T:
+    """Run a synchronous ORM read on the DB executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, _call, fn, args, kwargs)
+
+def db_read(fn: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Decorator: drop-in replacement for @sync_to_async on read helpers."""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs) -> Any:
+        return await run_db(fn, *args, **kwargs)
+    return wrapper
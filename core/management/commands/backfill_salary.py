@@ -7,13 +7,13 @@ class Command(BaseCommand):
 
     def handle(self, *args, **opts):
         updated = 0
-        for p in Post.objects.all().iterator():
+        for p in Post.objects.select_related("payload").iterator():
             if p.salary_min is not None or p.salary_max is not None:
                 continue
             blob = " ".join([
                 p.title or "",
                 p.description or "",
-                str(p.extras or ""),
+                str(p.load_payload()["extras"] or ""),
             ])
             mn, mx, cur, per = parse_salary(blob)
             if mn is not None or mx is not None or cur or per:
@@ -0,0 +1,30 @@
+# core/management/commands/crawl_worker.py
+import asyncio
+import os
+from django.core.management.base import BaseCommand
+from crawlers.workers import CRAWL_WORKER_CONCURRENCY, CRAWL_WORKER_POLL, default_owner, worker_loop
+
+class Command(BaseCommand):
+    help = "Claim and crawl due website sources from the CrawlJob table (run any number of these)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", default=None, help="Lease owner id (default: host:pid).")
+        parser.add_argument("--concurrency", type=int, default=CRAWL_WORKER_CONCURRENCY,
+                            help="Jobs crawled at once by this process.")
+        parser.add_argument("--poll", type=float, default=CRAWL_WORKER_POLL, help="Seconds between claims when idle.")
+        parser.add_argument("--with-coordinator", action="store_true",
+                            help="Also enqueue due sources (when main.py isn't running with CRAWL_MODE=distributed).")
+        parser.add_argument("--once", action="store_true", help="Exit when no job is left to claim.")
+
+    def handle(self, *args, **opts):
+        try:
+            asyncio.run(worker_loop(
+                opts["owner"] or default_owner(),
+                concurrency=opts["concurrency"],
+                base_interval=int(os.getenv("CRAWL_INTERVAL_SECONDS", "60")),
+                poll=opts["poll"],
+                with_coordinator=opts["with_coordinator"],
+                once=opts["once"],
+            ))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from core.models import NearDupBucket, Post
+from crawlers.dedupe import index_post
+
+class Command(BaseCommand):
+    help = "Build the near-duplicate index for existing posts and mark cross-source duplicates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch", type=int, default=500, help="Posts per transaction (default: 500).")
+        parser.add_argument("--rebuild", action="store_true",
+                            help="Drop the index and fingerprint canonical posts again (after a weighting change).")
+
+    def handle(self, *args, **opts):
+        batch = opts["batch"]
+        if opts["rebuild"]:
+            dropped, _ = NearDupBucket.objects.all().delete()
+            self.stdout.write(f"Dropped {dropped} index rows.")
+        # Oldest first, so the earliest copy of a job becomes the canonical one
+        pending = (
+            Post.objects.filter(is_duplicate=False, dup_buckets__isnull=True)
+            .order_by("id")
+            .only("id", "title", "company", "description")
+        )
+        ids = list(pending.values_list("id", flat=True))
+        indexed = dupes = 0
+        for i in range(0, len(ids), batch):
+            with transaction.atomic():
+                for p in pending.filter(id__in=ids[i:i + batch]):
+                    if index_post(p) is not None:
+                        dupes += 1
+                    indexed += 1
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} posts, marked {dupes} duplicates."))
@@ -0,0 +1,50 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from core.retention import (
+    RETENTION_BATCH, archive_path, default_archive_dir, min_retention_days, prunable, prune_batch, prune_tombstones,
+    vacuum_analyze,
+)
+
+class Command(BaseCommand):
+    help = "Archive and delete posted/duplicate/skipped posts older than N days, in short batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30, help="Keep posts newer than this (default: 30).")
+        parser.add_argument("--batch", type=int, default=RETENTION_BATCH, help="Rows per transaction.")
+        parser.add_argument("--pause", type=float, default=0.2, help="Seconds to sleep between batches.")
+        parser.add_argument("--archive-dir", help="Directory for .jsonl.gz archives (default: RETENTION_ARCHIVE_DIR or ./archive).")
+        parser.add_argument("--no-archive", action="store_true", help="Delete without writing an archive file.")
+        parser.add_argument("--vacuum", action="store_true", help="Run a full VACUUM afterwards (SQLite: locks the DB while it runs).")
+        parser.add_argument("--dry", action="store_true", help="Only count what would be pruned.")
+
+    def handle(self, *args, **opts):
+        days = opts["days"]
+        if days < min_retention_days():
+            raise CommandError(f"--days must be at least {min_retention_days()} (CHANNEL_LOOKBACK_DAYS + 1)")
+
+        if opts["dry"]:
+            self.stdout.write(f"Would prune {prunable(days).count()} posts older than {days} days.")
+            return
+
+        if opts["no_archive"]:
+            path = None
+        else:
+            path = archive_path(Path(opts["archive_dir"]) if opts["archive_dir"] else default_archive_dir())
+
+        total = 0
+        started = time.monotonic()
+        while True:
+            n = prune_batch(days, opts["batch"], path)
+            if not n:
+                break
+            total += n
+            self.stdout.write(f"  pruned {total}...")
+            time.sleep(opts["pause"])
+
+        prune_tombstones()
+        vacuum_analyze(full_vacuum=opts["vacuum"])
+        where = f" (archived to {path})" if path and total else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Pruned {total} posts in {time.monotonic() - started:.1f}s{where}."
+        ))
@@ -0,0 +1,97 @@
+# core/management/commands/tg_loadtest.py
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.dbexec import db_read
+from core.models import Category, Post, Source, SourceType
+
+PREFIX = "loadtest_"
+
+@db_read
+def _loadtest_sources():
+    return list(
+        Source.objects.filter(is_active=True, type=SourceType.TELEGRAM_CHANNEL, name__startswith=PREFIX)
+        .only("id", "name", "url", "category", "crawl_interval", "next_due", "failure_streak",
+              "breaker_state", "yield_ewma", "last_message_id")
+    )
+
+class Command(BaseCommand):
+    help = ("Run the channel ingestion pipeline against the fake Telegram backend (crawlers/tg_fake.py) "
+            "for a while and report throughput. Creates loadtest_* channel sources; use a scratch DB.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--channels", type=int, default=20, help="Synthetic channels.")
+        parser.add_argument("--accounts", type=int, default=1, help="Fake accounts in the client pool.")
+        parser.add_argument("--rate", type=float, default=6, help="Posts per minute per channel.")
+        parser.add_argument("--backlog", type=int, default=50, help="Posts per channel at start.")
+        parser.add_argument("--latency-ms", type=float, default=50, help="Fake API latency per request.")
+        parser.add_argument("--flood-rate", type=float, default=0, help="Probability of a FloodWait per request.")
+        parser.add_argument("--seconds", type=float, default=60, help="How long to run.")
+        parser.add_argument("--interval", type=int, default=10, help="Crawl interval (seconds).")
+        parser.add_argument("--push", action="store_true", help="Also run push mode (polling becomes gap filling).")
+        parser.add_argument("--sync", type=int, default=0, help="Run edit/delete sync every N seconds (0 = off).")
+        parser.add_argument("--edit-rate", type=float, default=0, help="Share of posts marked filled later.")
+        parser.add_argument("--delete-rate", type=float, default=0, help="Share of posts deleted later.")
+        parser.add_argument("--change-after", type=float, default=60, help="Seconds until those edits/deletions.")
+        parser.add_argument("--keep", action="store_true", help="Keep the loadtest_* sources and their posts.")
+
+    def handle(self, *args, **opts):
+        names = [f"{PREFIX}{i}" for i in range(opts["channels"])]
+        for name in names:
+            Source.objects.update_or_create(
+                name=name,
+                defaults=dict(url=f"https://t.me/{name}", type=SourceType.TELEGRAM_CHANNEL, category=Category.JOB,
+                              is_active=True, next_due=None, last_message_id=None, crawl_interval=0),
+            )
+        before = Post.objects.filter(source__name__startswith=PREFIX).count()
+        try:
+            elapsed = asyncio.run(self._run(opts))
+            created = Post.objects.filter(source__name__startswith=PREFIX).count() - before
+            from crawlers.metrics import format_stats
+            self.stdout.write(format_stats())
+            self.stdout.write(self.style.SUCCESS(
+                f"{created} posts from {len(names)} channels in {elapsed:.1f}s ({created / elapsed:.1f} posts/s)"
+            ))
+        finally:
+            if not opts["keep"]:
+                Source.objects.filter(name__startswith=PREFIX).delete()
+
+    async def _run(self, opts) -> float:
+        from crawlers import due_queue
+        from crawlers.pyro_channels import build_channel_pool, telegram_channels_loop
+        from crawlers.pyro_push import CHANNEL_GAP_FILL_INTERVAL, push_loop
+        from crawlers.crawl_runs import flush_runs
+        from crawlers.tg_fake import FakeBackend
+        from crawlers.tg_sync import sync_loop
+        from core.writer import write
+
+        backends = [
+            FakeBackend(account=f"fake{i}", rate=opts["rate"], backlog=opts["backlog"],
+                        latency_ms=opts["latency_ms"], flood_rate=opts["flood_rate"], edit_rate=opts["edit_rate"],
+                        delete_rate=opts["delete_rate"], change_after=opts["change_after"])
+            for i in range(max(1, opts["accounts"]))
+        ]
+        # every channel due at once: measure throughput, not the scheduler's startup spread
+        due_queue.SCHEDULER_RESTART_SPREAD = 0
+        pool = await build_channel_pool(backends=backends)
+        tasks = [asyncio.create_task(telegram_channels_loop(
+            opts["interval"], pool, CHANNEL_GAP_FILL_INTERVAL if opts["push"] else 0, list_sources=_loadtest_sources,
+        ))]
+        if opts["push"]:
+            tasks += [asyncio.create_task(push_loop(b, list_sources=_loadtest_sources)) for b in pool.backends]
+        if opts["sync"]:
+            tasks.append(asyncio.create_task(sync_loop(pool, opts["sync"])))
+        started = time.monotonic()
+        try:
+            await asyncio.sleep(opts["seconds"])
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await pool.stop()
+            # cancelled crawls may have left jobs on the writer: let them land before the cleanup
+            await flush_runs(force=True)
+            await write(lambda: None)
+        return time.monotonic() - started
@@ -0,0 +1,70 @@
+# core/management/commands/train_category.py
+import random
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Post, SourceType
+from crawlers import categorize
+
+def _report(model, examples) -> str:
+    hits, per_label = 0, Counter()
+    for feats, label in examples:
+        got, _ = model.predict(feats)
+        hits += got == label
+        per_label[(label, got == label)] += 1
+    labels = sorted({label for _, label in examples})
+    recall = ", ".join(f"{l} {per_label[(l, True)] / max(1, per_label[(l, True)] + per_label[(l, False)]):.2f}"
+                       for l in labels)
+    return f"accuracy {hits / len(examples):.2f}; recall {recall}"
+
+class Command(BaseCommand):
+    help = ("Train the per-message category classifier (crawlers/categorize.py) from the website posts, "
+            "whose category comes from their source, and write CATEGORY_MODEL.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=20000, help="Newest website posts to use (default: 20000).")
+        parser.add_argument("--epochs", type=int, default=5)
+        parser.add_argument("--holdout", type=float, default=0.2, help="Share kept out for evaluation.")
+        parser.add_argument("--no-balance", action="store_true",
+                            help="Don't oversample the smaller categories to the size of the largest.")
+        parser.add_argument("--out", default="", help="Model file (default: CATEGORY_MODEL).")
+
+    def handle(self, *args, **opts):
+        rows = list(
+            Post.objects.filter(source__type=SourceType.WEBSITE, is_duplicate=False)
+            .order_by("-created_at")
+            .values_list("title", "description", "category")[:opts["limit"]]
+        )
+        if not rows:
+            raise CommandError("no website posts to learn from; crawl some first")
+        examples = [(categorize.features(title, desc), category) for title, desc, category in rows]
+        random.Random(1).shuffle(examples)
+        n_test = int(len(examples) * opts["holdout"])
+        test, train = examples[:n_test], examples[n_test:]
+
+        counts = Counter(label for _, label in train)
+        self.stdout.write(f"{len(train)} training / {len(test)} held-out posts: "
+                          + ", ".join(f"{label} {n}" for label, n in counts.most_common()))
+        if not opts["no_balance"]:
+            rng = random.Random(2)
+            largest = max(counts.values())
+            for label, n in counts.items():
+                pool = [ex for ex in train if ex[1] == label]
+                train += [rng.choice(pool) for _ in range(largest - n)]
+
+        # start from the seed cues, so channel slang the websites never use keeps a weight
+        model = categorize.seed_model().fit(train, epochs=opts["epochs"])
+        out = Path(opts["out"]) if opts["out"] else categorize.model_path()
+        model.save(out, trained_on=len(rows) - n_test)
+        if test:
+            self.stdout.write(f"seed cues: {_report(categorize.seed_model(), test)}")
+            self.stdout.write(f"trained:   {_report(model, test)}")
+            started = time.perf_counter()
+            for title, desc, _ in rows[:n_test]:
+                model.predict(categorize.features(title, desc))
+            rate = n_test / max(1e-9, time.perf_counter() - started)
+            self.stdout.write(f"{rate:,.0f} posts/s (features + prediction, one core)")
+        size = sum(len(m.weights) for m in model.models.values())
+        self.stdout.write(self.style.SUCCESS(f"Model ({size} weights) written to {out}"))
@@ -0,0 +1,76 @@
+# core/management/commands/train_spam.py
+import json
+import random
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from core.models import Post, SourceType
+from crawlers import spam
+
+def _label(value) -> int:
+    if isinstance(value, str):
+        return int(value.strip().lower() in ("1", "true", "yes", "spam"))
+    return int(bool(value))
+
+def _report(name: str, model, examples, threshold: float) -> str:
+    tp = fp = fn = 0
+    for feats, label in examples:
+        hit = model.proba(feats) >= threshold
+        tp += hit and label
+        fp += hit and not label
+        fn += (not hit) and label
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return f"{name}: precision {precision:.2f}, recall {recall:.2f} at threshold {threshold}"
+
+class Command(BaseCommand):
+    help = ("Train the channel spam filter (crawlers/spam.py) from labeled messages: a JSON Lines file of "
+            '{"text": ..., "spam": true/false}. --export writes recent channel posts in that format, '
+            "pre-labeled with the current model, for hand review.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Labeled JSON Lines file (input, or output with --export).")
+        parser.add_argument("--export", action="store_true", help="Write recent channel posts to `path` instead.")
+        parser.add_argument("--limit", type=int, default=2000, help="Posts to export (default: 2000).")
+        parser.add_argument("--epochs", type=int, default=5)
+        parser.add_argument("--holdout", type=float, default=0.2, help="Share kept out for evaluation.")
+        parser.add_argument("--out", default="", help="Model file (default: SPAM_MODEL).")
+
+    def handle(self, *args, **opts):
+        path = Path(opts["path"])
+        if opts["export"]:
+            return self._export(path, opts["limit"])
+
+        try:
+            rows = [json.loads(ln) for ln in path.read_text(encoding="utf-8").splitlines() if ln.strip()]
+        except (OSError, ValueError) as e:
+            raise CommandError(f"can't read {path}: {e}")
+        examples = [(spam.features(r.get("text") or ""), _label(r.get("spam"))) for r in rows]
+        if not examples:
+            raise CommandError(f"no examples in {path}")
+        random.Random(1).shuffle(examples)
+        n_test = int(len(examples) * opts["holdout"])
+        test, train = examples[:n_test], examples[n_test:]
+
+        # start from the hand-set cue weights, so rare cues keep a sensible weight
+        model = spam.seed_model().fit(train, epochs=opts["epochs"])
+        out = Path(opts["out"]) if opts["out"] else spam.model_path()
+        model.save(out, trained_on=len(train))
+        self.stdout.write(f"{len(train)} training / {len(test)} held-out examples, "
+                          f"{sum(label for _, label in examples)} spam")
+        if test:
+            self.stdout.write(_report("seed weights", spam.seed_model(), test, spam.SPAM_THRESHOLD))
+            self.stdout.write(_report("trained", model, test, spam.SPAM_THRESHOLD))
+        self.stdout.write(self.style.SUCCESS(f"Model ({len(model.weights)} weights) written to {out}"))
+
+    def _export(self, path: Path, limit: int):
+        posts = (
+            Post.objects.filter(source__type=SourceType.TELEGRAM_CHANNEL)
+            .order_by("-created_at")
+            .values_list("description", flat=True)[:limit]
+        )
+        with path.open("w", encoding="utf-8") as f:
+            for text in posts:
+                f.write(json.dumps({"text": text, "spam": spam.score(text) >= spam.SPAM_THRESHOLD},
+                                   ensure_ascii=False) + "\n")
+        self.stdout.write(self.style.SUCCESS(f"Wrote {len(posts)} posts to {path}; fix the labels and train."))
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_post_company_post_currency_post_extras_post_location_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='core.post'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_duplicate',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.CreateModel(
+            name='NearDupBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('key', models.PositiveIntegerField()),
+                ('fingerprint', models.BigIntegerField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dup_buckets', to='core.post')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['band', 'key'], name='core_neardu_band_f92a19_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_post_near_duplicates'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_duplicate', False), ('posted_to_channel', False)), fields=['created_at'], name='post_unposted_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:38
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def move_payloads(apps, schema_editor):
+    """Copy extras/raw_text into zlib-compressed PostPayload rows (format: core/payload.py)."""
+    Post = apps.get_model("core", "Post")
+    PostPayload = apps.get_model("core", "PostPayload")
+    batch = []
+    rows = Post.objects.values_list("id", "extras", "raw_text", "description").iterator(chunk_size=1000)
+    for post_id, extras, raw_text, description in rows:
+        doc = {}
+        if extras:
+            doc["extras"] = extras
+        if raw_text and raw_text.strip() != (description or "").strip():
+            doc["raw_text"] = raw_text
+        if not doc:
+            continue
+        raw = json.dumps(doc, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        batch.append(PostPayload(post_id=post_id, data=b"z" + zlib.compress(raw, 6)))
+        if len(batch) >= 1000:
+            PostPayload.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        PostPayload.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_post_unposted_queue_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostPayload',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='core.post')),
+                ('data', models.BinaryField()),
+            ],
+        ),
+        migrations.RunPython(move_payloads, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='post',
+            name='extras',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='raw_text',
+        ),
+    ]
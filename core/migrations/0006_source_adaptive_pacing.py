@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_post_payload_side_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='crawl_interval',
+            field=models.PositiveIntegerField(default=0, help_text='seconds between crawls'),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='next_due',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_source_adaptive_pacing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='failure_streak',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
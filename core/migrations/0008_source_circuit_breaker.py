@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_source_failure_streak'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='breaker_state',
+            field=models.CharField(choices=[('CLOSED', 'Closed'), ('OPEN', 'Open (quarantined)'), ('HALF_OPEN', 'Half-open (probing)')], db_index=True, default='CLOSED', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='last_error',
+            field=models.CharField(blank=True, max_length=300),
+        ),
+        migrations.AddField(
+            model_name='source',
+            name='quarantined_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
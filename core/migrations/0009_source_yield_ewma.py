@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_source_circuit_breaker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='yield_ewma',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_source_yield_ewma'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CrawlJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_at', models.DateTimeField()),
+                ('priority', models.FloatField(default=0.0)),
+                ('lease_owner', models.CharField(blank=True, max_length=100)),
+                ('lease_expires', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('source', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_job', to='core.source')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['lease_expires', 'due_at'], name='crawljob_claim_idx')],
+            },
+        ),
+    ]
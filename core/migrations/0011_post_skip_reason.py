@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_crawl_job_lease'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_unposted_queue_idx',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='skip_reason',
+            field=models.CharField(blank=True, choices=[('STALE', 'Stale (backlog too old)'), ('OVERFLOW', 'Overflow (backlog too large)')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_duplicate', False), ('posted_to_channel', False), ('skip_reason', '')), fields=['created_at'], name='post_unposted_queue_idx'),
+        ),
+    ]
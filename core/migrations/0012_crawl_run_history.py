@@ -0,0 +1,50 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_post_skip_reason'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceCrawlStats',
+            fields=[
+            ],
+            options={
+                'verbose_name': 'source crawl stats',
+                'verbose_name_plural': 'source crawl stats',
+                'proxy': True,
+                'indexes': [],
+                'constraints': [],
+            },
+            bases=('core.source',),
+        ),
+        migrations.CreateModel(
+            name='CrawlRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(db_index=True)),
+                ('finished_at', models.DateTimeField()),
+                ('duration_ms', models.PositiveIntegerField(default=0)),
+                ('fetch_ms', models.PositiveIntegerField(default=0)),
+                ('parse_ms', models.PositiveIntegerField(default=0)),
+                ('persist_ms', models.PositiveIntegerField(default=0)),
+                ('bytes_downloaded', models.PositiveBigIntegerField(default=0)),
+                ('http_attempts', models.PositiveIntegerField(default=0)),
+                ('scraped', models.PositiveIntegerField(default=0)),
+                ('new', models.PositiveIntegerField(default=0)),
+                ('updated', models.PositiveIntegerField(default=0)),
+                ('unchanged', models.PositiveIntegerField(default=0)),
+                ('error', models.CharField(blank=True, db_index=True, max_length=60)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='crawl_runs', to='core.source')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'started_at'], name='core_crawlr_source__908a3b_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_crawl_run_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='last_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_source_last_message_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResolvedPeer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account', models.CharField(max_length=32)),
+                ('username', models.CharField(max_length=64)),
+                ('peer_id', models.BigIntegerField()),
+                ('access_hash', models.BigIntegerField()),
+                ('peer_type', models.CharField(default='channel', max_length=16)),
+                ('resolved_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'username'), name='uniq_peer_account_username')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_resolved_peer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='tg_edit_date',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='tg_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='skip_reason',
+            field=models.CharField(blank=True, choices=[('STALE', 'Stale (backlog too old)'), ('OVERFLOW', 'Overflow (backlog too large)'), ('DELETED', 'Deleted at the source'), ('FILLED', 'Marked filled/closed at the source')], max_length=20),
+        ),
+    ]
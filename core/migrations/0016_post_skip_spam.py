@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_post_tg_sync'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='skip_reason',
+            field=models.CharField(blank=True, choices=[('STALE', 'Stale (backlog too old)'), ('OVERFLOW', 'Overflow (backlog too large)'), ('DELETED', 'Deleted at the source'), ('FILLED', 'Marked filled/closed at the source'), ('SPAM', 'Rejected by the spam filter')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_post_skip_spam'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrunedLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('link_hash', models.BigIntegerField()),
+                ('pruned_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pruned_links', to='core.source')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'link_hash'), name='uniq_pruned_source_link')],
+            },
+        ),
+    ]
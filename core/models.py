@@ -10,6 +10,11 @@ class Category(models.TextChoices):
     PROJECT = "PROJECT", "Project"
     COMPETITION = "COMPETITION", "Competition"
 
+class BreakerState(models.TextChoices):
+    CLOSED = "CLOSED", "Closed"
+    OPEN = "OPEN", "Open (quarantined)"
+    HALF_OPEN = "HALF_OPEN", "Half-open (probing)"
+
 class Source(models.Model):
     name = models.CharField(max_length=200, unique=True)
     url = models.URLField(max_length=500, blank=True)
@@ -18,10 +23,36 @@ class Source(models.Model):
     parser = models.CharField(max_length=100, blank=True, help_text="websites.py function name")
     is_active = models.BooleanField(default=True)
     last_crawled = models.DateTimeField(null=True, blank=True)
+    # Channels: newest message id already ingested (crawlers/pyro_channels.py); null = full lookback
+    last_message_id = models.BigIntegerField(null=True, blank=True)
+
+    # Adaptive pacing (crawlers/pacing.py): 0 = not adapted yet, use CRAWL_INTERVAL_SECONDS
+    crawl_interval = models.PositiveIntegerField(default=0, help_text="seconds between crawls")
+    next_due = models.DateTimeField(null=True, blank=True, db_index=True)
+    failure_streak = models.PositiveIntegerField(default=0)  # consecutive failed crawls
+    yield_ewma = models.FloatField(default=0.0)  # smoothed new posts per crawl (crawl ordering)
+
+    # Circuit breaker (crawlers/breaker.py)
+    breaker_state = models.CharField(max_length=10, choices=BreakerState.choices,
+                                     default=BreakerState.CLOSED, db_index=True)
+    quarantined_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=300, blank=True)
 
     def __str__(self):
         return f"{self.name} [{self.type}/{self.category}]"
 
+class SkipReason(models.TextChoices):
+    STALE = "STALE", "Stale (backlog too old)"
+    OVERFLOW = "OVERFLOW", "Overflow (backlog too large)"
+    DELETED = "DELETED", "Deleted at the source"
+    FILLED = "FILLED", "Marked filled/closed at the source"
+    SPAM = "SPAM", "Rejected by the spam filter"
+
+class PostQuerySet(models.QuerySet):
+    def unposted(self):
+        """The bot's queue: not posted, not a duplicate, not skipped."""
+        return self.filter(posted_to_channel=False, is_duplicate=False, skip_reason="")
+
 class Post(models.Model):
     source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name="posts")
     title = models.CharField(max_length=500)
@@ -37,19 +68,170 @@ class Post(models.Model):
     currency = models.CharField(max_length=16, blank=True)  # e.g., USD, EUR
     period = models.CharField(max_length=16, blank=True)    # e.g., YEARLY, MONTHLY, HOURLY, PROJECT
     tags = models.JSONField(default=list, blank=True)       # list of strings
-    extras = models.JSONField(default=dict, blank=True)     # raw source payload (keep everything)
-    raw_text = models.TextField(blank=True)                 # original text snapshot, if available
+    # raw source payload + original text live compressed in PostPayload (load_payload())
 
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     posted_to_channel = models.BooleanField(default=False, db_index=True)
 
+    # Near-duplicate clustering (see crawlers/dedupe.py); the bot skips duplicates
+    is_duplicate = models.BooleanField(default=False, db_index=True)
+    duplicate_of = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name="duplicates")
+
+    # Channel posts: message id and last edit seen, for edit/delete sync (crawlers/tg_sync.py)
+    tg_message_id = models.BigIntegerField(null=True, blank=True)
+    tg_edit_date = models.DateTimeField(null=True, blank=True)
+
+    # Set when the bot will never post this row (crawlers/backpressure.py); "" = still queued
+    skip_reason = models.CharField(max_length=20, choices=SkipReason.choices, blank=True)
+
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(fields=["source", "link"], name="uniq_source_link")
         ]
         indexes = [
             models.Index(fields=["posted_to_channel", "created_at"]),
+            # Bot queue: only the small unposted, canonical slice is indexed
+            models.Index(fields=["created_at"], name="post_unposted_queue_idx",
+                         condition=models.Q(posted_to_channel=False, is_duplicate=False, skip_reason="")),
         ]
 
     def __str__(self):
         return f"{self.title} ({self.source.name})"
+
+    def load_payload(self) -> dict:
+        """
+        Fetch the compressed side row (one extra query).
+        Returns {"extras": dict, "raw_text": str}; raw_text defaults to description.
+        """
+        try:
+            doc = self.payload.load()
+        except PostPayload.DoesNotExist:
+            doc = {}
+        return {
+            "extras": doc.get("extras") or {},
+            "raw_text": doc.get("raw_text") or self.description,
+        }
+
+class PostPayload(models.Model):
+    """Heavy, rarely-read Post blobs (extras, raw_text), compressed (core/payload.py)."""
+    post = models.OneToOneField(Post, on_delete=models.CASCADE, primary_key=True, related_name="payload")
+    data = models.BinaryField()
+
+    def load(self) -> dict:
+        from .payload import unpack
+        if not hasattr(self, "_doc"):
+            self._doc = unpack(self.data)
+        return self._doc
+
+    def __str__(self):
+        return f"payload post={self.post_id} ({len(self.data or b'')} bytes)"
+
+class NearDupBucket(models.Model):
+    """One LSH band of a canonical post's 64-bit SimHash fingerprint."""
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="dup_buckets")
+    band = models.PositiveSmallIntegerField()
+    key = models.PositiveIntegerField()
+    fingerprint = models.BigIntegerField()  # full SimHash, stored signed
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["band", "key"]),
+        ]
+
+    def __str__(self):
+        return f"post={self.post_id} band={self.band} key={self.key:04x}"
+
+class PrunedLink(models.Model):
+    """
+    Tombstone of a post deleted by retention (core/retention.py): a 64-bit
+    hash of its link, so a listing still up on the site isn't re-ingested
+    (and re-posted) as new.
+    """
+    source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name="pruned_links")
+    link_hash = models.BigIntegerField()  # signed, like NearDupBucket.fingerprint
+    pruned_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["source", "link_hash"], name="uniq_pruned_source_link")
+        ]
+
+    def __str__(self):
+        return f"pruned source={self.source_id} link={self.link_hash:x}"
+
+class CrawlJob(models.Model):
+    """
+    A due website crawl, claimed by one crawl_worker process via a lease
+    (crawlers/workers.py). One row per source at most; deleted when done.
+    """
+    source = models.OneToOneField(Source, on_delete=models.CASCADE, related_name="crawl_job")
+    due_at = models.DateTimeField()
+    priority = models.FloatField(default=0.0)  # Source.yield_ewma at enqueue time
+    lease_owner = models.CharField(max_length=100, blank=True)
+    lease_expires = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)  # claims so far (expired leases count)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["lease_expires", "due_at"], name="crawljob_claim_idx"),
+        ]
+
+    def __str__(self):
+        owner = f" leased by {self.lease_owner}" if self.lease_owner else ""
+        return f"job source={self.source_id} due {self.due_at:%H:%M:%S}{owner}"
+
+class CrawlRun(models.Model):
+    """One crawl of one source, with per-stage timings (crawlers/crawl_runs.py)."""
+    source = models.ForeignKey(Source, on_delete=models.CASCADE, related_name="crawl_runs")
+    started_at = models.DateTimeField(db_index=True)
+    finished_at = models.DateTimeField()
+    duration_ms = models.PositiveIntegerField(default=0)
+    fetch_ms = models.PositiveIntegerField(default=0)    # network incl. retries/backoff
+    parse_ms = models.PositiveIntegerField(default=0)    # scraper time outside fetch()
+    persist_ms = models.PositiveIntegerField(default=0)  # incl. waiting for the DB writer
+    bytes_downloaded = models.PositiveBigIntegerField(default=0)
+    http_attempts = models.PositiveIntegerField(default=0)
+    scraped = models.PositiveIntegerField(default=0)
+    new = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    unchanged = models.PositiveIntegerField(default=0)
+    error = models.CharField(max_length=60, blank=True, db_index=True)  # exception class, "timeout", ...
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["source", "started_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.source_id} @ {self.started_at:%Y-%m-%d %H:%M:%S} ({self.duration_ms}ms)"
+
+class ResolvedPeer(models.Model):
+    """
+    Cached Telegram username resolution (crawlers/peers.py). Access hashes
+    are only valid for the account that resolved them, hence the key.
+    """
+    account = models.CharField(max_length=32)   # Telegram user id of the crawling account
+    username = models.CharField(max_length=64)  # lower-cased, no "@"
+    peer_id = models.BigIntegerField()          # marked id (-100... for channels)
+    access_hash = models.BigIntegerField()
+    peer_type = models.CharField(max_length=16, default="channel")
+    resolved_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["account", "username"], name="uniq_peer_account_username")
+        ]
+
+    def __str__(self):
+        return f"@{self.username} -> {self.peer_id} ({self.account})"
+
+class SourceCrawlStats(Source):
+    """Read-only admin view: per-source aggregates over recent CrawlRun rows."""
+    class Meta:
+        proxy = True
+        verbose_name = "source crawl stats"
+        verbose_name_plural = "source crawl stats"
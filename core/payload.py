@@ -0,0 +1,105 @@
+# core/payload.py
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# --- Optional zstd codec (pip install zstandard); zlib is always available
+try:
+    import zstandard  # type: ignore
+except Exception:
+    zstandard = None
+
+# =========================================================
+# Compressed Post payloads (extras + raw_text side table)
+# =========================================================
+#
+# Blobs are JSON {"extras": ..., "raw_text": ...} compressed with zstd when
+# installed, zlib otherwise. The first byte names the codec so rows written
+# with either one stay readable. raw_text equal to the post description is
+# not stored at all (Telegram posts), readers fall back to the description.
+#
+# Tunables:
+#   PAYLOAD_CODEC  zstd | zlib  (default: zstd if available)
+#   PAYLOAD_LEVEL  compression level (default 6)
+
+CODEC_ZLIB = b"z"
+CODEC_ZSTD = b"s"
+
+PAYLOAD_LEVEL = int(os.getenv("PAYLOAD_LEVEL", "6"))
+
+def _codec() -> bytes:
+    want = os.getenv("PAYLOAD_CODEC", "zstd" if zstandard else "zlib").lower()
+    return CODEC_ZSTD if (want == "zstd" and zstandard) else CODEC_ZLIB
+
+def pack(extras: Optional[Dict[str, Any]], raw_text: str = "", description: str = "") -> Optional[bytes]:
+    """Compress a payload; returns None when there's nothing worth storing."""
+    doc: Dict[str, Any] = {}
+    if extras:
+        doc["extras"] = extras
+    if raw_text and raw_text.strip() != (description or "").strip():
+        doc["raw_text"] = raw_text
+    if not doc:
+        return None
+    raw = json.dumps(doc, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    codec = _codec()
+    if codec == CODEC_ZSTD:
+        return codec + zstandard.ZstdCompressor(level=PAYLOAD_LEVEL).compress(raw)
+    return codec + zlib.compress(raw, PAYLOAD_LEVEL)
+
+def unpack(blob: Optional[bytes]) -> Dict[str, Any]:
+    if not blob:
+        return {}
+    blob = bytes(blob)
+    codec, body = blob[:1], blob[1:]
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("payload is zstd-compressed but 'zstandard' is not installed")
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raw = zlib.decompress(body)
+    return json.loads(raw.decode("utf-8"))
+
+def store_payloads(rows: Iterable[Tuple[int, Optional[Dict[str, Any]], str, str]]) -> int:
+    """
+    Upsert payloads for (post_id, extras, raw_text, description) tuples in one
+    statement. Rows with nothing to keep are skipped. Returns rows written.
+    """
+    from core.models import PostPayload  # avoid import cycle with models
+
+    objs = []
+    for post_id, extras, raw_text, description in rows:
+        blob = pack(extras, raw_text, description)
+        if blob is not None:
+            objs.append(PostPayload(post_id=post_id, data=blob))
+    if objs:
+        PostPayload.objects.bulk_create(
+            objs, update_conflicts=True, unique_fields=["post"], update_fields=["data"],
+        )
+    return len(objs)
+
+def refresh_payloads(rows: Iterable[Tuple[int, Optional[Dict[str, Any]], str, str]]) -> int:
+    """
+    store_payloads() for rows that may already have a payload: only blobs
+    that differ from the stored one are written (so re-crawling an unchanged
+    page writes nothing), and payloads that became empty are deleted.
+    Returns rows written or deleted.
+    """
+    from core.models import PostPayload
+
+    blobs = {post_id: pack(extras, raw_text, description) for post_id, extras, raw_text, description in rows}
+    if not blobs:
+        return 0
+    stored = dict(PostPayload.objects.filter(post_id__in=list(blobs)).values_list("post_id", "data"))
+    objs = [PostPayload(post_id=pk, data=blob) for pk, blob in blobs.items()
+            if blob is not None and (pk not in stored or bytes(stored[pk]) != blob)]
+    gone = [pk for pk, blob in blobs.items() if blob is None and pk in stored]
+    if objs:
+        PostPayload.objects.bulk_create(
+            objs, update_conflicts=True, unique_fields=["post"], update_fields=["data"],
+        )
+    if gone:
+        PostPayload.objects.filter(post_id__in=gone).delete()
+    return len(objs) + len(gone)
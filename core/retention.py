@@ -0,0 +1,165 @@
+# core/retention.py
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, TypeVar
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from .models import Post, PostPayload, PrunedLink, NearDupBucket, Source
+
+# =========================================================
+# Retention: archive + prune old Post rows in short batches
+# =========================================================
+#
+# Candidates are rows the bot is done with (posted, duplicate or skipped) and
+# older than N days. Each batch is deleted in its own short transaction, so
+# the live bot/crawlers only ever wait for one small batch, and appended to a
+# gzipped JSON Lines archive once that transaction has committed (a rolled
+# back batch is neither deleted nor archived). Afterwards the planner stats
+# are refreshed (ANALYZE) and, optionally, the file is compacted (VACUUM).
+#
+# A deleted post leaves a tombstone (PrunedLink: source + link hash), and
+# ingestion skips links with one, so a job still listed on its site isn't
+# picked up and posted again. Tombstones are dropped after
+# RETENTION_TOMBSTONE_DAYS; listings are long gone by then.
+#
+# Tunables:
+#   RETENTION_DAYS            keep this many days (0 = disabled for the scheduled task)
+#   RETENTION_BATCH           rows per transaction (default 500)
+#   RETENTION_ARCHIVE_DIR     where archive files go (default <BASE_DIR>/archive, "" = don't archive)
+#   RETENTION_TOMBSTONE_DAYS  keep tombstones this many days (default 365, 0 = forever)
+
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "500"))
+RETENTION_TOMBSTONE_DAYS = int(os.getenv("RETENTION_TOMBSTONE_DAYS", "365"))
+
+def min_retention_days() -> int:
+    """Rows younger than the channel re-crawl window would be re-ingested and re-posted."""
+    return int(os.getenv("CHANNEL_LOOKBACK_DAYS", "7")) + 1
+
+def default_archive_dir() -> Optional[Path]:
+    d = os.getenv("RETENTION_ARCHIVE_DIR")
+    if d is None:
+        return Path(settings.BASE_DIR) / "archive"
+    return Path(d) if d.strip() else None
+
+def archive_path(archive_dir: Optional[Path]) -> Optional[Path]:
+    if archive_dir is None:
+        return None
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    return archive_dir / f"posts-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.jsonl.gz"
+
+def prunable(days: int):
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    return Post.objects.filter(
+        Q(posted_to_channel=True) | Q(is_duplicate=True) | ~Q(skip_reason=""), created_at__lt=cutoff,
+    )
+
+# ----------------- tombstones -----------------
+
+def link_hash(link: str) -> int:
+    h = int.from_bytes(hashlib.blake2b(link.encode("utf-8"), digest_size=8).digest(), "big")
+    return h - (1 << 64) if h >= (1 << 63) else h  # BIGINT is signed
+
+Row = TypeVar("Row", bound=Sequence)
+
+def drop_pruned(source: Source, rows: List[Row]) -> List[Row]:
+    """Ingest rows ((link, ...) tuples) minus those whose post retention already deleted."""
+    if not rows:
+        return rows
+    hashes = {link_hash(r[0]): r for r in rows}
+    gone = set(PrunedLink.objects.filter(source=source, link_hash__in=list(hashes)).values_list("link_hash", flat=True))
+    if not gone:
+        return rows
+    return [r for r in rows if link_hash(r[0]) not in gone]
+
+def prune_tombstones(days: int = RETENTION_TOMBSTONE_DAYS) -> int:
+    if days <= 0:
+        return 0
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    return PrunedLink.objects.filter(pruned_at__lt=cutoff).delete()[0]
+
+# ----------------- archive + prune -----------------
+
+def _archive_docs(ids: List[int]) -> List[dict]:
+    rows = (
+        Post.objects.filter(pk__in=ids)
+        .select_related("source", "payload")
+        .order_by("pk")
+    )
+    return [
+        {
+            "id": p.pk,
+            "source": p.source.name,
+            "title": p.title,
+            "description": p.description,
+            "link": p.link,
+            "category": p.category,
+            "company": p.company,
+            "location": p.location,
+            "salary_min": p.salary_min,
+            "salary_max": p.salary_max,
+            "currency": p.currency,
+            "period": p.period,
+            "tags": p.tags,
+            "created_at": p.created_at,
+            "posted_to_channel": p.posted_to_channel,
+            "duplicate_of": p.duplicate_of_id,
+            "skip_reason": p.skip_reason,
+            **p.load_payload(),
+        }
+        for p in rows
+    ]
+
+def _write_archive(path: Path, docs: Iterable[dict]):
+    # Appending opens a new gzip member per batch; readers see one stream
+    with gzip.open(path, "at", encoding="utf-8") as fh:
+        for doc in docs:
+            fh.write(json.dumps(doc, ensure_ascii=False, default=str))
+            fh.write("\n")
+
+def prune_batch(days: int, batch: int = RETENTION_BATCH, path: Optional[Path] = None) -> int:
+    """
+    Delete one batch, leaving tombstones, and archive it (if path) once the
+    outermost transaction commits. Returns rows removed; 0 = done.
+    """
+    with transaction.atomic():
+        rows = list(prunable(days).order_by("pk").values_list("pk", "source_id", "link")[:batch])
+        if not rows:
+            return 0
+        ids = [pk for pk, _, _ in rows]
+        if path is not None:
+            docs = _archive_docs(ids)
+            transaction.on_commit(lambda: _write_archive(path, docs))
+        PrunedLink.objects.bulk_create(
+            [PrunedLink(source_id=source_id, link_hash=link_hash(link)) for _, source_id, link in rows],
+            ignore_conflicts=True,
+        )
+        # Children first with plain deletes, so the Post delete stays cheap
+        NearDupBucket.objects.filter(post_id__in=ids).delete()
+        PostPayload.objects.filter(post_id__in=ids).delete()
+        Post.objects.filter(duplicate_of_id__in=ids).update(duplicate_of=None)
+        Post.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+def vacuum_analyze(full_vacuum: bool = False):
+    """Refresh planner stats; full_vacuum also compacts (locks SQLite while it runs)."""
+    tables = [m._meta.db_table for m in (Post, PostPayload, NearDupBucket)]
+    with connection.cursor() as cur:
+        if connection.vendor == "postgresql":
+            # Plain VACUUM doesn't block readers/writers; FULL rewrites the table
+            verb = "VACUUM (FULL, ANALYZE)" if full_vacuum else "VACUUM (ANALYZE)"
+            for t in tables:
+                cur.execute(f"{verb} {connection.ops.quote_name(t)}")
+        elif connection.vendor == "sqlite":
+            for t in tables:
+                cur.execute(f"ANALYZE {connection.ops.quote_name(t)}")
+            cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if full_vacuum:
+                cur.execute("VACUUM")
@@ -1,3 +1,924 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock, skipUnless
+from datetime import datetime, timedelta, timezone
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from core import payload, retention
+from core.models import (
+    BreakerState, Category, CrawlJob, NearDupBucket, Post, PostPayload, PrunedLink, SkipReason, Source, SourceType,
+)
+from core.writer import SingleWriter
+from crawlers import backpressure, breaker, categorize, dedupe, due_queue, pacing, sandbox, spam
+from crawlers.base import ChannelItem, is_filled_text, normalize_channel_items
+
+
+def _source(name: str) -> Source:
+    return Source.objects.create(name=name, type=SourceType.WEBSITE, url=f"https://{name}.example", parser="p")
+
+
+class SingleWriterTests(TransactionTestCase):
+    """core/writer.py: one thread, jobs committed in order, one batch per transaction."""
+
+    def setUp(self):
+        # a long wait so everything submitted below lands in one batch
+        self.writer = SingleWriter(max_batch=50, max_wait=0.3)
+
+    def test_jobs_run_in_submission_order(self):
+        seen = []
+
+        def job(n):
+            seen.append(n)
+            return _source(f"order{n}").pk
+
+        futures = [self.writer.submit(job, n) for n in range(10)]
+        pks = [f.result(timeout=5) for f in futures]
+        self.assertEqual(seen, list(range(10)))
+        self.assertEqual(pks, sorted(pks))
+        self.assertEqual(self.writer.jobs, 10)
+
+    def test_result_is_visible_once_resolved(self):
+        pk = self.writer.submit(lambda: _source("visible").pk).result(timeout=5)
+        self.assertTrue(Source.objects.filter(pk=pk).exists())
+
+    def test_error_goes_to_its_own_future_only(self):
+        def fail():
+            _source("rolled-back")
+            raise ValueError("boom")
+
+        before = self.writer.submit(_source, "before")
+        failing = self.writer.submit(fail)
+        after = self.writer.submit(_source, "after")
+
+        with self.assertRaisesMessage(ValueError, "boom"):
+            failing.result(timeout=5)
+        before.result(timeout=5)
+        after.result(timeout=5)
+        # the failing job's savepoint was rolled back, its neighbours committed
+        names = set(Source.objects.values_list("name", flat=True))
+        self.assertEqual(names, {"before", "after"})
+
+    def test_cancelled_caller_doesnt_fail_the_batch(self):
+        async def main():
+            calls = [asyncio.ensure_future(self.writer.run(_source, f"cancel{n}")) for n in range(3)]
+            await asyncio.sleep(0.05)  # queued, writer still collecting the batch
+            calls[1].cancel()
+            return await asyncio.gather(*calls, return_exceptions=True)
+
+        first, second, third = asyncio.run(main())
+        self.assertIsInstance(first, Source)
+        self.assertIsInstance(second, asyncio.CancelledError)
+        self.assertIsInstance(third, Source)
+        self.assertEqual(set(Source.objects.values_list("name", flat=True)), {"cancel0", "cancel2"})
+        self.assertEqual(self.writer.submit(lambda: 42).result(timeout=5), 42)
+
+    def test_writer_survives_a_failed_batch(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.writer.submit(lambda: 1 / 0).result(timeout=5)
+        self.assertEqual(self.writer.submit(lambda: 42).result(timeout=5), 42)
+
+
+class CrawlJobLeaseTests(TestCase):
+    """crawlers/workers.py: claim, expiry and steal of CrawlJob leases."""
+
+    def setUp(self):
+        from crawlers import workers
+
+        self.workers = workers
+        past = datetime.now(timezone.utc) - timedelta(minutes=1)
+        self.src = _source("leased")
+        Source.objects.filter(pk=self.src.pk).update(next_due=past)
+
+    def _job(self) -> CrawlJob:
+        return CrawlJob.objects.get(source=self.src)
+
+    def test_enqueue_is_idempotent(self):
+        self.assertEqual(self.workers.enqueue_due(), 1)
+        self.assertEqual(self.workers.enqueue_due(), 0)
+        self.assertEqual(CrawlJob.objects.count(), 1)
+
+    def test_claim_leases_to_one_owner(self):
+        self.workers.enqueue_due()
+        first = self.workers.claim("a", 5, lease_seconds=60)
+        self.assertEqual([j.source_id for j in first], [self.src.pk])
+        self.assertEqual(self.workers.claim("b", 5, lease_seconds=60), [])
+        job = self._job()
+        self.assertEqual((job.lease_owner, job.attempts), ("a", 1))
+
+    def test_expired_lease_is_stolen(self):
+        self.workers.enqueue_due()
+        self.workers.claim("a", 5, lease_seconds=60)
+        CrawlJob.objects.update(lease_expires=datetime.now(timezone.utc) - timedelta(seconds=1))
+
+        stolen = self.workers.claim("b", 5, lease_seconds=60)
+        self.assertEqual(len(stolen), 1)
+        job = self._job()
+        self.assertEqual((job.lease_owner, job.attempts), ("b", 2))
+
+        # the old owner finishing late doesn't delete the new owner's job
+        self.workers.finish(job.pk, "a")
+        self.assertTrue(CrawlJob.objects.filter(pk=job.pk).exists())
+        self.workers.finish(job.pk, "b")
+        self.assertFalse(CrawlJob.objects.filter(pk=job.pk).exists())
+
+    def test_release_hands_the_job_back_without_an_attempt(self):
+        self.workers.enqueue_due()
+        [job] = self.workers.claim("a", 5, lease_seconds=60)
+        self.workers.release([job.pk], "a")
+        job = self._job()
+        self.assertEqual((job.lease_owner, job.lease_expires, job.attempts), ("", None, 0))
+        self.assertEqual(len(self.workers.claim("b", 5, lease_seconds=60)), 1)
+
+
+class FilledTextTests(SimpleTestCase):
+    """crawlers/base.py is_filled_text: status phrases only, not the words on their own."""
+
+    FILLED = [
+        "Position filled",
+        "The role has been filled, thanks everyone",
+        "Applications are now closed",
+        "[FILLED] Go developer",
+        "CLOSED ❌",
+        "Closed: backend developer",
+        "Go developer\nfilled",
+        "This job is no longer available",
+        "ظرفیت تکمیل شد",
+        "آگهی بسته شد",
+    ]
+    LIVE = [
+        "We are hiring a Go developer for our closed beta product",
+        "Closed captioning specialist wanted",
+        "project manager for expired-domain marketplace",
+        "Filled with energy? Join our support team",
+        "Hiring: closed-source SDK engineer",
+        "استخدام برنامه نویس پایتون، تمام وقت",
+    ]
+
+    def test_status_phrases(self):
+        for text in self.FILLED:
+            with self.subTest(text=text):
+                self.assertTrue(is_filled_text(text))
+
+    def test_live_posts(self):
+        for text in self.LIVE:
+            with self.subTest(text=text):
+                self.assertFalse(is_filled_text(text))
+
+
+class SpamScoreTests(SimpleTestCase):
+    """crawlers/spam.py with the seed weights (no trained model)."""
+
+    JOB_ADS = [
+        "Join our team! Sales manager, commission + premium bonus, invest in your career",
+        "Accountant wanted for a small firm in Tehran",
+        "Golang needed ASAP",
+        "Senior Python developer (remote)\nSalary 3-5k USD, apply with your CV",
+        "طراح لوگو میخوام، بودجه ۲ میلیون",
+        "استخدام برنامه نویس پایتون، دورکاری، حقوق توافقی",
+    ]
+    ADS = [
+        "🔥 Join our VIP signals channel, 300% profit guaranteed!",
+        "Good morning everyone ☀️",
+        "Subscribe to our partner channel @somechannel",
+        "Earn money from home, click here t.me/a t.me/b",
+        "تبلیغات: خرید ممبر واقعی با تخفیف ویژه",
+    ]
+
+    def setUp(self):
+        self._saved = spam._model, spam._seeded
+        spam._model, spam._seeded = spam.seed_model(), True
+
+    def tearDown(self):
+        spam._model, spam._seeded = self._saved
+
+    def test_job_ads_pass(self):
+        for text in self.JOB_ADS:
+            with self.subTest(text=text):
+                self.assertLess(spam.score(text), spam.SPAM_THRESHOLD)
+
+    def test_ads_are_rejected(self):
+        for text in self.ADS:
+            with self.subTest(text=text):
+                self.assertGreaterEqual(spam.score(text), spam.SPAM_THRESHOLD)
+
+    def test_channel_threshold_override(self):
+        text = self.ADS[0]
+        with mock.patch.dict(spam._thresholds, {"lenient": 1.01}):
+            self.assertFalse(spam.is_spam(text, "Lenient"))
+            self.assertTrue(spam.is_spam(text, "other"))
+
+
+class CategorizeTests(SimpleTestCase):
+    """crawlers/categorize.py: the channel's category stands unless a trained model says otherwise."""
+
+    def setUp(self):
+        self._saved = categorize._model, categorize._loaded
+
+    def tearDown(self):
+        categorize._model, categorize._loaded = self._saved
+
+    def _items(self, *texts):
+        return [ChannelItem(f"https://t.me/c/{n}", t.partition("\n")[0], t, Category.JOB, n)
+                for n, t in enumerate(texts, 1)]
+
+    def test_no_model_keeps_channel_category(self):
+        categorize._model, categorize._loaded = None, True
+        items = self._items(
+            "Remote role\nOwn the payments project and each task, hard deadline",
+            "Data scientist\nOur lead won the Kaggle competition last year",
+        )
+        self.assertEqual(categorize.classify_items(items, Category.JOB), {})
+        self.assertEqual([it.category for it in items], [Category.JOB, Category.JOB])
+
+    def test_trained_model_needs_strong_evidence(self):
+        train = [(categorize.features(t, b), str(c)) for t, b, c in [
+            ("Backend developer", "full time position, salary and benefits", Category.JOB),
+            ("Hiring QA engineer", "permanent role, monthly salary, insurance", Category.JOB),
+            ("Logo design", "freelance project, fixed budget, deadline next week", Category.PROJECT),
+            ("Landing page", "one time gig, budget 200 USD, send your proposal", Category.PROJECT),
+            ("AI hackathon", "prizes for the winners, registration open, submit by Friday", Category.COMPETITION),
+            ("Kaggle contest", "leaderboard, prize pool, team submission", Category.COMPETITION),
+        ]] * 20
+        categorize._model, categorize._loaded = categorize.seed_model().fit(train), True
+
+        hackathon = "Global AI hackathon\nprizes for the winners, registration open, team submission by Friday"
+        label, _ = categorize.classify(hackathon.partition("\n")[0], hackathon, Category.JOB)
+        self.assertEqual(label, Category.COMPETITION)
+        job = "Python developer\nfull time position, salary and benefits"
+        self.assertEqual(categorize.classify("Python developer", job, Category.JOB)[0], Category.JOB)
+
+    def test_disabled(self):
+        categorize._model, categorize._loaded = categorize.seed_model(), True
+        items = self._items("AI hackathon\nprizes for the winners")
+        with mock.patch.dict(os.environ, {"CATEGORY_CLASSIFIER": "0"}):
+            self.assertEqual(categorize.classify_items(items, Category.JOB), {})
+        self.assertEqual(items[0].category, Category.JOB)
+
+
+class BackpressureTests(TestCase):
+    """crawlers/backpressure.py: measured by the loop, read from the cache, shedding opt-in."""
+
+    def setUp(self):
+        self._saved = backpressure._current
+        self.src = _source("busy")
+
+    def tearDown(self):
+        backpressure._current = self._saved
+
+    def _queue(self, n: int, age: timedelta = timedelta(0)):
+        start = Post.objects.count()
+        posts = Post.objects.bulk_create(
+            Post(source=self.src, title=f"t{i}", link=f"https://busy.example/{i}", category=Category.JOB)
+            for i in range(start, start + n)
+        )
+        Post.objects.filter(pk__in=[p.pk for p in posts]).update(created_at=datetime.now(timezone.utc) - age)
+
+    def test_interval_factor_reads_the_cache_only(self):
+        backpressure._current = None
+        with self.assertNumQueries(0):
+            self.assertEqual(backpressure.interval_factor(self.src.pk), 1.0)
+        backpressure._current = backpressure.Pressure(backpressure.BACKLOG_TARGET * 3, 0, {self.src.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(backpressure.interval_factor(self.src.pk), 3.0)
+            self.assertEqual(backpressure.interval_factor(self.src.pk + 1), 1.0)
+
+    def test_measure_flags_low_value_sources_under_pressure(self):
+        self._queue(12)
+        Post.objects.filter(pk__in=Post.objects.values_list("pk", flat=True)[:8]).update(is_duplicate=True)
+        with mock.patch.object(backpressure, "BACKLOG_TARGET", 2):
+            p = backpressure.measure()
+        self.assertEqual(p.size, 4)
+        self.assertEqual(p.low_value, {self.src.pk})
+        self.assertIs(backpressure.current(), p)
+
+    def test_shedding_is_opt_in(self):
+        self.assertFalse(backpressure.shedding_enabled())
+        with mock.patch.dict(os.environ, {"BACKLOG_SHED": "1"}):
+            self.assertTrue(backpressure.shedding_enabled())
+
+    def test_shed_backlog(self):
+        self._queue(2, age=timedelta(seconds=backpressure.BACKLOG_MAX_AGE + 60))
+        self._queue(5)
+        with mock.patch.object(backpressure, "BACKLOG_MAX", 3):
+            self.assertEqual(backpressure.shed_backlog(), {"stale": 2, "overflow": 2})
+        self.assertEqual(Post.objects.unposted().count(), 3)
+        self.assertEqual(Post.objects.filter(skip_reason=SkipReason.STALE).count(), 2)
+
+
+class ClientPoolTests(SimpleTestCase):
+    """crawlers/client_pool.py: consistent-hash home accounts, failover, per-account slots."""
+
+    KEYS = [f"channel{n}" for n in range(200)]
+
+    def _pool(self, n: int, concurrency: int = 1):
+        from crawlers.client_pool import ClientPool
+        from crawlers.tg_fake import FakeBackend
+
+        return ClientPool([FakeBackend(account=f"acct{i}") for i in range(n)], rate=1, burst=1,
+                          concurrency=concurrency)
+
+    def test_adding_an_account_only_moves_its_share(self):
+        before = {k: self._pool(3).home(k).name for k in self.KEYS}
+        after = {k: self._pool(4).home(k).name for k in self.KEYS}
+        moved = [k for k in self.KEYS if before[k] != after[k]]
+        self.assertTrue(moved)
+        self.assertTrue(all(after[k] == "acct3" for k in moved))
+        self.assertEqual(len(set(before.values())), 3)
+
+    def test_flooded_account_fails_over_and_comes_back(self):
+        pool = self._pool(3)
+        key = self.KEYS[0]
+        home = pool.home(key)
+        self.assertIs(pool.pick(key), home)
+
+        pool.flood(home, 60)
+        other = pool.pick(key)
+        self.assertIsNotNone(other)
+        self.assertIsNot(other, home)
+        self.assertEqual(pool.next_free_in(), 0.0)
+
+        for acct in pool.accounts:
+            pool.flood(acct, 60)
+        self.assertIsNone(pool.pick(key))
+        self.assertGreater(pool.next_free_in(), 0)
+
+        for acct in pool.accounts:
+            acct.limited_until = 0.0
+        self.assertIs(pool.pick(key), home)
+
+    def test_each_account_has_its_own_slots(self):
+        pool = self._pool(2, concurrency=2)
+        busy, free = pool.accounts
+
+        async def main():
+            for _ in range(2):
+                await busy.slots.acquire()
+            self.assertTrue(busy.slots.locked())
+            async with free.slots:  # a full account doesn't hold up the other
+                return True
+
+        self.assertTrue(asyncio.run(main()))
+
+
+class DedupeTests(TestCase):
+    """crawlers/dedupe.py: reposts cluster, different roles under shared boilerplate don't."""
+
+    ABOUT = (
+        "Acme is a fast-growing fintech company building payment infrastructure for millions of users. "
+        "We offer competitive salary, stock options, remote-friendly culture, health insurance, learning "
+        "budget and flexible hours. We value diversity and are an equal opportunity employer. Join our team "
+        "of passionate engineers and help us shape the future of finance. Apply now! "
+    ) + (
+        "Our benefits include paid parental leave, home office stipend, annual team retreats, mental health "
+        "days, a generous vacation policy, conference tickets and the latest hardware. We are backed by "
+        "top-tier investors and have offices in Berlin, London and Lisbon. "
+    ) * 2
+
+    def _distance(self, a, b) -> int:
+        return dedupe.hamming(dedupe.simhash(*a), dedupe.simhash(*b))
+
+    def test_reposts_are_near(self):
+        post = ("Senior Backend Engineer", "Acme Inc", self.ABOUT)
+        for other in [
+            ("Senior Backend Engineer (Remote)", "Acme", self.ABOUT),
+            ("Senior Backend Engineer", "Acme", self.ABOUT + " Found on RemoteOK, mention it when applying."),
+            ("Senior Backend Engineer", "Acme LLC", " ".join(reversed(self.ABOUT.split(". ")))),
+        ]:
+            with self.subTest(other=other[0]):
+                self.assertLessEqual(self._distance(post, other), dedupe.DEDUPE_MAX_DISTANCE)
+
+    def test_different_roles_under_shared_boilerplate_are_far(self):
+        backend = ("Senior Backend Engineer", "Acme Inc", self.ABOUT)
+        for other in [
+            ("Frontend Engineer", "Acme Inc", self.ABOUT),
+            ("Machine Learning Engineer", "Acme Inc", self.ABOUT),
+            ("Senior Backend Engineer", "Globex", "Logistics software for shipping companies. Go, Kafka, Kubernetes."),
+        ]:
+            with self.subTest(other=other[:2]):
+                self.assertGreater(self._distance(backend, other), dedupe.DEDUPE_MAX_DISTANCE + 3)
+
+    def test_description_weight_is_capped(self):
+        feats = dedupe._features("Backend Engineer", "Acme", self.ABOUT)
+        title = sum(w for t, w in feats if t.startswith("t:"))
+        desc = sum(w for t, w in feats if t.startswith("d:"))
+        self.assertAlmostEqual(desc, dedupe.DEDUPE_DESC_WEIGHT * title)
+
+    def test_index_posts(self):
+        src, other = _source("board-a"), _source("board-b")
+
+        def post(source, n, title):
+            return Post.objects.create(source=source, title=title, company="Acme", description=self.ABOUT,
+                                       link=f"https://{source.name}.example/{n}", category=Category.JOB)
+
+        first = post(src, 1, "Senior Backend Engineer")
+        repost = post(other, 1, "Senior Backend Engineer")
+        frontend = post(other, 2, "Frontend Engineer")
+        self.assertEqual(dedupe.index_posts([first, repost, frontend]), 1)
+
+        repost.refresh_from_db()
+        self.assertEqual((repost.is_duplicate, repost.duplicate_of_id), (True, first.pk))
+        self.assertFalse(Post.objects.get(pk=frontend.pk).is_duplicate)
+        # canonicals are indexed (one row per band), duplicates aren't
+        self.assertEqual(NearDupBucket.objects.filter(post=first).count(), dedupe.BANDS)
+        self.assertFalse(NearDupBucket.objects.filter(post=repost).exists())
+
+
+@skipUnless(connection.vendor == "postgresql", "COPY ingest runs on PostgreSQL only")
+class CopyIngestTests(TestCase):
+    """crawlers/pg_ingest.py: COPY into the staging table, then one merge."""
+
+    def setUp(self):
+        from crawlers.pg_ingest import copy_ingest
+
+        self.ingest = copy_ingest
+        self.src = _source("copy")
+
+    def _row(self, n: int, title: str, extras=None, **defaults):
+        defaults = {"title": title, "description": f"about {title}", "category": Category.JOB, **defaults}
+        return (f"https://copy.example/{n}", defaults, extras or {}, "")
+
+    def _post(self, n: int) -> Post:
+        return Post.objects.get(source=self.src, link=f"https://copy.example/{n}")
+
+    def test_insert(self):
+        stats = {}
+        rows = [
+            self._row(1, 'Go, "senior"\nremote', extras={"k": "v"}, salary_min=1000, tags=["go", "ذخیره"]),
+            self._row(2, "QA", company="", tg_message_id=None),
+        ]
+        self.assertEqual(self.ingest(self.src, rows, stats=stats), 2)
+        self.assertEqual(stats, {"new": 2, "updated": 0, "unchanged": 0})
+        first = self._post(1)
+        self.assertEqual(first.title, 'Go, "senior"\nremote')
+        self.assertEqual((first.salary_min, first.tags), (1000, ["go", "ذخیره"]))
+        self.assertEqual(first.load_payload()["extras"], {"k": "v"})
+        second = self._post(2)
+        self.assertEqual((second.company, second.salary_min, second.tg_message_id), ("", None, None))
+
+    def test_update_merges_changed_rows_only(self):
+        self.ingest(self.src, [self._row(1, "Backend"), self._row(2, "Frontend")])
+        stats = {}
+        rows = [
+            self._row(1, "Backend (edited)"),
+            self._row(2, "Frontend", extras={"seen": 2}, skip_reason="SPAM"),
+            self._row(3, "Data"),
+        ]
+        self.assertEqual(self.ingest(self.src, rows, update=True, stats=stats), 1)
+        self.assertEqual(stats, {"new": 1, "updated": 1, "unchanged": 1})
+        self.assertEqual(self._post(1).title, "Backend (edited)")
+        unchanged = self._post(2)
+        # skip_reason is set on insert only; a changed payload is stored even for an unchanged row
+        self.assertEqual(unchanged.skip_reason, "")
+        self.assertEqual(unchanged.load_payload()["extras"], {"seen": 2})
+        self.assertEqual(Post.objects.filter(source=self.src).count(), 3)
+
+    def test_conflict_without_update_keeps_the_existing_row(self):
+        self.ingest(self.src, [self._row(1, "Backend")])
+        stats = {}
+        rows = [self._row(1, "Backend (edited)"), self._row(2, "QA"), self._row(2, "QA again")]
+        self.assertEqual(self.ingest(self.src, rows, update=False, stats=stats), 1)
+        self.assertEqual(stats, {"new": 1, "updated": 0, "unchanged": 1})
+        self.assertEqual(self._post(1).title, "Backend")
+        self.assertEqual(self._post(2).title, "QA again")  # the last copy of a link in the batch wins
+
+
+class PayloadTests(TestCase):
+    """core/payload.py: compressed side rows, written only when they change."""
+
+    def test_pack_round_trip(self):
+        extras = {"skills": ["Go", "SQL"], "عنوان": "برنامه نویس"}
+        blob = payload.pack(extras, "raw text", "description")
+        self.assertEqual(payload.unpack(blob), {"extras": extras, "raw_text": "raw text"})
+
+    def test_nothing_worth_storing(self):
+        self.assertIsNone(payload.pack({}, "", ""))
+        # raw_text that is just the description isn't stored twice
+        self.assertIsNone(payload.pack(None, " same text ", "same text"))
+        self.assertEqual(payload.unpack(payload.pack({"a": 1}, "same", "same")), {"extras": {"a": 1}})
+
+    def test_codec_is_recorded_per_blob(self):
+        with mock.patch.dict(os.environ, {"PAYLOAD_CODEC": "zlib"}):
+            blob = payload.pack({"a": 1})
+        self.assertEqual(blob[:1], payload.CODEC_ZLIB)
+        self.assertEqual(payload.unpack(blob), {"extras": {"a": 1}})
+        self.assertEqual(payload.unpack(b""), {})
+
+    def test_refresh_writes_only_changes(self):
+        src = _source("payload")
+        post = Post.objects.create(source=src, title="t", link="https://payload.example/1", category=Category.JOB)
+        row = (post.pk, {"a": 1}, "", "")
+        self.assertEqual(payload.store_payloads([row]), 1)
+        self.assertEqual(payload.refresh_payloads([row]), 0)
+        self.assertEqual(payload.refresh_payloads([(post.pk, {"a": 2}, "", "")]), 1)
+        self.assertEqual(Post.objects.get(pk=post.pk).load_payload()["extras"], {"a": 2})
+        # a payload that became empty is deleted; the description stands in for raw_text
+        self.assertEqual(payload.refresh_payloads([(post.pk, {}, "", "")]), 1)
+        self.assertFalse(PostPayload.objects.filter(post=post).exists())
+        self.assertEqual(Post.objects.get(pk=post.pk).load_payload(), {"extras": {}, "raw_text": ""})
+
+
+class RetentionTests(TestCase):
+    """core/retention.py: prune what the bot is done with, archive after commit, leave tombstones."""
+
+    def setUp(self):
+        self.src = _source("old")
+        old = datetime.now(timezone.utc) - timedelta(days=40)
+        self.posted = self._post(1, posted_to_channel=True)
+        self.skipped = self._post(2, skip_reason=SkipReason.STALE)
+        self.queued = self._post(3)
+        self.dupe = self._post(4, is_duplicate=True)
+        self.dupe.duplicate_of = self.queued
+        self.dupe.save()
+        Post.objects.update(created_at=old)
+        self.fresh = self._post(5, posted_to_channel=True)
+        self.later = self._post(6, is_duplicate=True, duplicate_of=self.posted)
+        payload.store_payloads([(self.posted.pk, {"k": "v"}, "", "")])
+
+    def _post(self, n: int, **fields) -> Post:
+        return Post.objects.create(source=self.src, title=f"t{n}", link=f"https://old.example/{n}",
+                                   category=Category.JOB, **fields)
+
+    def test_prune_batch(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "posts.jsonl.gz"
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(retention.prune_batch(30, path=path), 3)
+            with gzip.open(path, "rt", encoding="utf-8") as fh:
+                docs = [json.loads(line) for line in fh]
+
+        left = set(Post.objects.values_list("pk", flat=True))
+        self.assertEqual(left, {self.queued.pk, self.fresh.pk, self.later.pk})
+        self.assertEqual([doc["id"] for doc in docs], [self.posted.pk, self.skipped.pk, self.dupe.pk])
+        self.assertEqual(docs[0]["extras"], {"k": "v"})
+        self.assertIsNone(Post.objects.get(pk=self.later.pk).duplicate_of_id)
+        self.assertEqual(PrunedLink.objects.filter(source=self.src).count(), 3)
+        self.assertEqual(retention.prune_batch(30, path=None), 0)
+
+    def test_rolled_back_batch_isnt_archived(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = Path(d) / "posts.jsonl.gz"
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                retention.prune_batch(30, path=path)
+            self.assertEqual(len(callbacks), 1)
+            self.assertFalse(path.exists())  # written only once the batch commits
+
+    def test_tombstones_keep_pruned_links_out(self):
+        retention.prune_batch(30)
+        rows = [(f"https://old.example/{n}", {}) for n in (1, 2, 3, 7)]
+        kept = [link for link, _ in retention.drop_pruned(self.src, rows)]
+        self.assertEqual(kept, ["https://old.example/3", "https://old.example/7"])
+        self.assertEqual(retention.drop_pruned(_source("other"), rows), rows)
+
+        PrunedLink.objects.update(pruned_at=datetime.now(timezone.utc) - timedelta(days=400))
+        self.assertEqual(retention.prune_tombstones(365), 3)
+        self.assertEqual(retention.prune_tombstones(0), 0)
+
+
+@mock.patch.object(pacing, "CRAWL_JITTER", 0.0)
+class PacingTests(TestCase):
+    """crawlers/pacing.py: the interval follows each crawl's yield."""
+
+    def test_next_interval(self):
+        cases = [
+            ((600, 20, 15), 300),   # mostly new: poll faster
+            ((600, 20, 5), 450),
+            ((600, 20, 2), 600),
+            ((600, 100, 1), 750),
+            ((600, 20, 0), 900),    # nothing new: back off
+            ((600, 0, 0), 900),
+            ((40, 20, 20), pacing.CRAWL_INTERVAL_MIN),
+            ((3000, 20, 0), pacing.CRAWL_INTERVAL_MAX),
+        ]
+        for args, expected in cases:
+            with self.subTest(args=args):
+                self.assertEqual(pacing.next_interval(*args), expected)
+        self.assertEqual(pacing.next_interval(600, 20, 15, ok=False), 900)
+
+    def test_record_crawl_adapts_the_stored_interval(self):
+        src = _source("paced")
+        before = datetime.now(timezone.utc)
+        due = pacing.record_crawl(src.pk, 600, scraped=20, new=15)
+        src.refresh_from_db()
+        self.assertEqual(src.crawl_interval, 300)
+        self.assertAlmostEqual((due - before).total_seconds(), 300, delta=5)
+        self.assertEqual(src.next_due, due)
+        self.assertAlmostEqual(src.yield_ewma, pacing.YIELD_EWMA_ALPHA * 15)
+
+        # a caller holding a stale interval doesn't undo the previous step
+        pacing.record_crawl(src.pk, 600, scraped=20, new=15)
+        src.refresh_from_db()
+        self.assertEqual(src.crawl_interval, 150)
+
+    def test_current_interval(self):
+        src = Source(crawl_interval=0)
+        self.assertEqual(pacing.current_interval(src, 10), pacing.CRAWL_INTERVAL_MIN)
+        src.crawl_interval = 120
+        self.assertEqual(pacing.current_interval(src, 10), 120)
+
+
+class DueQueueTests(SimpleTestCase):
+    """crawlers/due_queue.py: persistent due times, restart spread, cycle priority."""
+
+    def _src(self, pk: int, next_due=None, yield_ewma=0.0) -> Source:
+        return Source(pk=pk, name=f"s{pk}", crawl_interval=600, next_due=next_due, yield_ewma=yield_ewma)
+
+    def test_restart_spreads_overdue_and_keeps_future_dues(self):
+        now = datetime.now(timezone.utc)
+        future = now + timedelta(seconds=due_queue.SCHEDULER_RESTART_SPREAD + 60)
+        q = due_queue.DueQueue()
+        changes = dict(q.sync([self._src(1), self._src(2, now - timedelta(hours=1)), self._src(3, future)],
+                              60, first=True))
+        self.assertEqual(set(changes), {1, 2})
+        for pk in (1, 2):
+            self.assertLessEqual(changes[pk], now + timedelta(seconds=due_queue.SCHEDULER_RESTART_SPREAD + 1))
+        self.assertEqual(len(q), 3)
+        self.assertEqual(q.pop_due(now - timedelta(days=1)), [])
+        popped = [s.pk for s in q.pop_due(future)]
+        self.assertEqual((sorted(popped[:2]), popped[2]), ([1, 2], 3))
+
+    def test_reschedule_and_removal(self):
+        now = datetime.now(timezone.utc)
+        q = due_queue.DueQueue()
+        a, b = self._src(1, now), self._src(2, now)
+        q.sync([a, b], 60)
+        [first, second] = q.pop_due(now)
+        q.done(first, now + timedelta(hours=1))
+        # a running source isn't re-added by a resync; a vanished one is dropped
+        q.sync([second], 60)
+        self.assertEqual(len(q), 0)
+        q.done(second, now)
+        self.assertEqual([s.pk for s in q.pop_due(now)], [2])
+        self.assertEqual(q.pop_due(now + timedelta(hours=2)), [])
+
+    def test_due_time_pulled_forward_in_the_db(self):
+        now = datetime.now(timezone.utc)
+        q = due_queue.DueQueue()
+        q.sync([self._src(1, now + timedelta(hours=1))], 60)
+        self.assertEqual(q.sync([self._src(1, None)], 60)[0][0], 1)  # e.g. admin breaker reset
+        self.assertEqual([s.pk for s in q.pop_due()], [1])
+
+    def test_carried_over_first_then_by_yield(self):
+        batch = [self._src(1, yield_ewma=1), self._src(2, yield_ewma=9), self._src(3, yield_ewma=0)]
+        self.assertEqual([s.pk for s in due_queue._by_priority(batch, carried={3})], [3, 2, 1])
+
+    def test_cycle_budget(self):
+        with mock.patch.dict(os.environ, {"CRAWL_CYCLE_BUDGET": ""}):
+            self.assertEqual(due_queue.cycle_budget(60, min_budget=90), 90)
+            self.assertEqual(due_queue.cycle_budget(120, min_budget=90), 120)
+        with mock.patch.dict(os.environ, {"CRAWL_CYCLE_BUDGET": "30"}):
+            self.assertEqual(due_queue.cycle_budget(120, min_budget=90), 30)
+
+
+@mock.patch.object(pacing, "CRAWL_JITTER", 0.0)
+class BreakerTests(TestCase):
+    """crawlers/breaker.py: quarantine after a failure streak, probe, close."""
+
+    def setUp(self):
+        self.src = _source("flaky")
+
+    def _crawl(self, ok: bool) -> datetime:
+        return pacing.record_crawl(self.src.pk, 600, scraped=10 if ok else 0, new=1 if ok else 0, ok=ok,
+                                   error="" if ok else "HTTP 503")
+
+    def test_cooldown_doubles_up_to_the_cap(self):
+        t = breaker.BREAKER_THRESHOLD
+        self.assertEqual(breaker.cooldown_seconds(t), breaker.BREAKER_COOLDOWN)
+        self.assertEqual(breaker.cooldown_seconds(t + 2), breaker.BREAKER_COOLDOWN * 4)
+        self.assertEqual(breaker.cooldown_seconds(t + 100), breaker.BREAKER_COOLDOWN_MAX)
+
+    def test_quarantine_probe_and_close(self):
+        for _ in range(breaker.BREAKER_THRESHOLD - 1):
+            self._crawl(ok=False)
+        self.src.refresh_from_db()
+        self.assertEqual((self.src.breaker_state, self.src.failure_streak),
+                         (BreakerState.CLOSED, breaker.BREAKER_THRESHOLD - 1))
+
+        due = self._crawl(ok=False)
+        self.src.refresh_from_db()
+        self.assertEqual(self.src.breaker_state, BreakerState.OPEN)
+        self.assertEqual(self.src.quarantined_until, due)
+        self.assertEqual(self.src.last_error, "HTTP 503")
+
+        breaker.begin_probe([self.src.pk])
+        self.assertEqual(Source.objects.get(pk=self.src.pk).breaker_state, BreakerState.HALF_OPEN)
+        # a failed probe re-opens with a longer cool-down
+        again = self._crawl(ok=False)
+        self.assertGreater(again - datetime.now(timezone.utc), timedelta(seconds=breaker.BREAKER_COOLDOWN * 1.5))
+        self.assertEqual(Source.objects.get(pk=self.src.pk).breaker_state, BreakerState.OPEN)
+
+        breaker.begin_probe([self.src.pk])
+        self._crawl(ok=True)
+        self.src.refresh_from_db()
+        self.assertEqual((self.src.breaker_state, self.src.failure_streak, self.src.quarantined_until),
+                         (BreakerState.CLOSED, 0, None))
+
+    def test_reset(self):
+        Source.objects.filter(pk=self.src.pk).update(breaker_state=BreakerState.OPEN, failure_streak=9,
+                                                     next_due=datetime.now(timezone.utc) + timedelta(days=1))
+        self.assertEqual(breaker.reset(Source.objects.filter(pk=self.src.pk)), 1)
+        self.src.refresh_from_db()
+        self.assertEqual((self.src.breaker_state, self.src.failure_streak, self.src.next_due),
+                         (BreakerState.CLOSED, 0, None))
+
+
+class SandboxTests(SimpleTestCase):
+    """crawlers/sandbox.py: results capped, errors and timeouts surfaced, workers recycled."""
+
+    def setUp(self):
+        self.pool = sandbox.SandboxPool(1, max_tasks=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+
+    def test_bounded_json_drops_the_tail(self):
+        items = [{"title": "x" * 10, "n": n} for n in range(10)]
+        blob, dropped = sandbox._bounded_json(items, 100)
+        kept = json.loads(blob)
+        self.assertLessEqual(len(blob), 100)
+        self.assertEqual(kept, items[:len(kept)])
+        self.assertEqual(dropped, 10 - len(kept))
+        blob, dropped = sandbox._bounded_json(items, 10_000)
+        self.assertEqual((json.loads(blob), dropped), (items, 0))
+
+    def test_task_error_and_recycling(self):
+        for n in range(3):
+            with self.subTest(task=n), self.assertRaises(sandbox.SandboxTaskError) as ctx:
+                self.pool.run("no_such_parser", timeout=30)
+            self.assertEqual(ctx.exception.kind, "LookupError")
+        # two tasks per worker: the first is recycled, the second still serving
+        self.assertEqual((self.pool.started, self.pool.recycled, self.pool.killed), (2, 1, 0))
+
+    def test_overdue_worker_is_killed(self):
+        with mock.patch.object(sandbox, "SANDBOX_KILL_GRACE", 0):
+            with self.assertRaises(sandbox.SandboxTimeout):
+                self.pool.run("no_such_parser", timeout=0)  # no worker answers within 0s
+        self.assertEqual(self.pool.killed, 1)
+        with self.assertRaises(sandbox.SandboxTaskError):
+            self.pool.run("no_such_parser", timeout=30)  # a fresh worker takes over
+
+
+class ChannelHighWaterTests(TransactionTestCase):
+    """crawlers/pyro_channels.py crawl_one_channel against the fake backend: read only past the mark."""
+
+    def setUp(self):
+        from crawlers.tg_fake import FakeBackend
+
+        self.backend = FakeBackend(account="hw", rate=0, backlog=30, latency_ms=0)
+        self.src = Source.objects.create(name="hw", type=SourceType.TELEGRAM_CHANNEL, url="https://t.me/hwchan",
+                                         category=Category.JOB)
+
+    def _crawl(self, **kwargs):
+        from crawlers.pyro_channels import crawl_one_channel
+
+        return asyncio.run(crawl_one_channel(self.backend, self.src, **kwargs))
+
+    def _message_ids(self):
+        return set(Post.objects.filter(source=self.src).values_list("tg_message_id", flat=True))
+
+    def test_first_sync_then_only_newer_messages(self):
+        fetched, saved = self._crawl()
+        self.assertEqual(Source.objects.get(pk=self.src.pk).last_message_id, 30)
+        self.assertEqual(self.src.last_message_id, 30)  # the scheduler's copy moves too
+        self.assertEqual(saved, len(self._message_ids()))
+        self.assertLessEqual(saved, fetched)
+        self.assertGreater(saved, 20)
+
+        before = self._message_ids()
+        self.backend.backlog = 35
+        stats = {}
+        fetched, saved = self._crawl(stats=stats)
+        new = self._message_ids() - before
+        self.assertEqual(Source.objects.get(pk=self.src.pk).last_message_id, 35)
+        self.assertEqual((stats["attempts"], saved), (1, len(new)))
+        self.assertLessEqual(fetched, 5)
+        self.assertTrue(new and all(mid > 30 for mid in new))
+
+        # nothing new: no posts, the mark stays
+        self.assertEqual(self._crawl(), (0, 0))
+        self.assertEqual(Source.objects.get(pk=self.src.pk).last_message_id, 35)
+
+    def test_mark_moves_only_forward(self):
+        from crawlers.pyro_channels import _advance_high_water
+
+        _advance_high_water(self.src.pk, 40)
+        _advance_high_water(self.src.pk, 10)
+        self.assertEqual(Source.objects.get(pk=self.src.pk).last_message_id, 40)
+
+    def test_failed_save_keeps_the_mark(self):
+        with mock.patch("crawlers.scheduler.save_items", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                self._crawl()
+        self.assertIsNone(Source.objects.get(pk=self.src.pk).last_message_id)
+        self._crawl()
+        self.assertEqual(Source.objects.get(pk=self.src.pk).last_message_id, 30)
+
+
+class ChannelSyncTests(TransactionTestCase):
+    """crawlers/tg_sync.py against the fake backend: deletions and filled edits retire posts, edits rewrite."""
+
+    def setUp(self):
+        from crawlers.client_pool import ClientPool
+        from crawlers.pyro_channels import crawl_one_channel
+        from crawlers.tg_fake import FakeBackend
+
+        self.backend = FakeBackend(account="sync", rate=0, backlog=40, latency_ms=0)
+        self.pool = ClientPool([self.backend], rate=100, burst=100)
+        self.src = Source.objects.create(name="sync", type=SourceType.TELEGRAM_CHANNEL,
+                                         url="https://t.me/syncchan", category=Category.JOB)
+        asyncio.run(crawl_one_channel(self.backend, self.src))
+        # the fake repeats its texts, so some posts are near-duplicates: only the live ones are synced
+        self.posts = dict(Post.objects.unposted().filter(source=self.src).values_list("tg_message_id", "pk"))
+        # from now on a share of the messages is already deleted or edited to say "filled"
+        self.backend.delete_rate, self.backend.edit_rate, self.backend.change_after = 0.3, 0.3, 0
+
+    def _sync(self):
+        from crawlers.tg_sync import _load_posts, sync_posts
+
+        async def main():
+            return await sync_posts(self.pool, await _load_posts(since=datetime.now(timezone.utc) - timedelta(hours=1)))
+        return asyncio.run(main())
+
+    def test_deleted_and_filled_posts_are_retired(self):
+        gone = {mid for mid in self.posts if self.backend.message("syncchan", mid) is None}
+        filled = {mid for mid in self.posts if mid not in gone and self.backend.message("syncchan", mid).edit_date}
+        self.assertTrue(gone and filled)
+
+        changed = self._sync()
+        reasons = dict(Post.objects.filter(source=self.src).values_list("tg_message_id", "skip_reason"))
+        self.assertEqual({m for m, r in reasons.items() if r == SkipReason.DELETED}, gone)
+        self.assertEqual({m for m, r in reasons.items() if r == SkipReason.FILLED}, filled)
+        self.assertEqual(changed, {self.posts[m] for m in gone | filled})
+        # retired posts aren't re-read on the next pass
+        self.assertEqual(self._sync(), set())
+
+    def test_edit_rewrites_the_post(self):
+        from crawlers.tg_sync import verify
+
+        self.backend.delete_rate = self.backend.edit_rate = 0
+        mid = max(self.posts)
+        original = self.backend.message("syncchan", mid)
+        edited = original.__class__(mid, original.date, "Go developer\nRemote, salary 5000 USD per month",
+                                    edit_date=datetime.now(timezone.utc), chat_id=original.chat_id,
+                                    username="syncchan")
+        real = self.backend.get_messages
+
+        async def get_messages(chat, ids):
+            return [edited if m and m.id == mid else m for m in await real(chat, ids)]
+
+        with mock.patch.object(self.backend, "get_messages", get_messages):
+            held = asyncio.run(verify(self.pool, list(self.posts.values())))
+        self.assertEqual(held, {self.posts[mid]})
+        post = Post.objects.get(pk=self.posts[mid])
+        self.assertEqual((post.title, post.skip_reason, post.tg_edit_date), ("Go developer", "", edited.edit_date))
+        self.assertEqual(asyncio.run(verify(self.pool, [post.pk])), set())  # the edit was seen
+
+
+class ChannelItemTests(TestCase):
+    """crawlers/base.py ChannelItem: slots, lazy extras, salary from the text only, saved as a Post."""
+
+    def _item(self, n: int = 1, text: str = "Go developer\nRemote, $3k-$5k/month", link=None) -> ChannelItem:
+        date = datetime(2026, 1, 2, 3, 4, tzinfo=timezone.utc)
+        return ChannelItem(f"https://t.me/items/{n}" if link is None else link, text.partition("\n")[0], text,
+                           Category.JOB, n, chat_id=-1001, date=date, views=7)
+
+    def test_slots(self):
+        item = self._item()
+        self.assertFalse(hasattr(item, "__dict__"))
+        with self.assertRaises(AttributeError):
+            item.extra_field = 1
+        self.assertEqual(item.skip_reason, "")
+
+    def test_extras(self):
+        self.assertEqual(self._item(5).extras(), {
+            "chat_id": -1001, "message_id": 5, "date": "2026-01-02T03:04:00+00:00", "edit_date": None, "views": 7,
+        })
+
+    def test_normalize_parses_the_text_and_drops_linkless(self):
+        items = normalize_channel_items([self._item(1), self._item(2, link=""), self._item(3, text="Order 123456789012345")])
+        self.assertEqual([it.message_id for it in items], [1, 3])
+        self.assertEqual((items[0].salary_min, items[0].salary_max, items[0].currency, items[0].period),
+                         (3000.0, 5000.0, "USD", "MONTHLY"))
+        self.assertEqual((items[1].salary_min, items[1].salary_max), (None, None))  # ids aren't pay
+
+    def test_saved_as_post(self):
+        from crawlers.scheduler import _save_items_sync
+
+        src = Source.objects.create(name="items", type=SourceType.TELEGRAM_CHANNEL, url="https://t.me/items",
+                                    category=Category.JOB)
+        live, kept = self._item(1), self._item(2, text="Subscribe to our partner channel")
+        kept.skip_reason = SkipReason.SPAM
+        self.assertEqual(_save_items_sync(src, normalize_channel_items([live, kept])), 2)
+
+        post = Post.objects.get(link=live.link)
+        self.assertEqual((post.title, post.description, post.tg_message_id, post.salary_max),
+                         ("Go developer", live.text, 1, 5000))
+        self.assertEqual(post.load_payload(), {"extras": live.extras(), "raw_text": live.text})
+        self.assertEqual(Post.objects.get(link=kept.link).skip_reason, SkipReason.SPAM)
+        self.assertEqual(list(Post.objects.unposted().values_list("pk", flat=True)), [post.pk])
+        self.assertFalse(NearDupBucket.objects.filter(post__link=kept.link).exists())  # not indexed
@@ -0,0 +1,149 @@
+# core/writer.py
+from __future__ import annotations
+
+import os
+import queue
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+
+# =========================================================
+# In-process single-writer queue
+# =========================================================
+#
+# The bot job, the website loop (threads) and the Pyrogram loop all write to
+# the same database. SQLite allows one writer at a time, so instead of letting
+# them fight over the lock we hand every write to one thread, which drains the
+# queue and commits whatever has accumulated in a single transaction. Each job
+# runs in its own savepoint, so one failing job doesn't roll back the batch.
+# A job whose caller was cancelled before it started is skipped; once
+# started it runs to the end and only its own caller misses the result.
+#
+# Tunables:
+#   DB_WRITER            1/0 (default: on for SQLite, off otherwise)
+#   DB_WRITER_MAX_BATCH  jobs per transaction (default 50)
+#   DB_WRITER_MAX_WAIT   seconds to wait for more jobs after the first (default 0.05)
+
+Job = Tuple[Callable[..., Any], tuple, dict, Future]
+
+def _resolve(fut: Future, result: Any, err: Optional[BaseException]):
+    """
+    Settle one job's future. A caller that was cancelled meanwhile (its
+    `await write(...)` cancelled the wrapped future) has nobody waiting:
+    skip it, so it can't make the rest of the batch look failed.
+    """
+    if fut.done():
+        return
+    try:
+        if err is not None:
+            fut.set_exception(err)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass  # cancelled between the check and the set
+
+def _enabled_by_default() -> bool:
+    return connection.vendor == "sqlite"
+
+class SingleWriter:
+    def __init__(self, max_batch: int = 50, max_wait: float = 0.05):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._q: "queue.Queue[Job]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # counters (read by /stats-style reporting)
+        self.batches = 0
+        self.jobs = 0
+
+    def _ensure_started(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue a write; the returned Future resolves after its batch commits."""
+        fut: Future = Future()
+        self._ensure_started()
+        self._q.put((fn, args, kwargs, fut))
+        return fut
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    # ----------------- writer thread -----------------
+
+    def _collect(self) -> List[Job]:
+        batch = [self._q.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, batch: List[Job]):
+        outcomes: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        try:
+            with transaction.atomic():
+                for fn, args, kwargs, fut in batch:
+                    if not fut.set_running_or_notify_cancel():
+                        continue  # cancelled before it started: skip it
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((fut, fn(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((fut, None, e))
+        except Exception as e:
+            # COMMIT itself failed: nothing in the batch was persisted
+            outcomes = [(fut, None, e) for *_, fut in batch]
+            connection.close_if_unusable_or_obsolete()
+
+        # Resolve only after COMMIT so callers never observe uncommitted rows
+        for fut, result, err in outcomes:
+            _resolve(fut, result, err)
+        self.batches += 1
+        self.jobs += len(batch)
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._commit(batch)
+            except Exception as e:  # never let the writer thread die
+                print(f"[writer] batch error: {e}")
+                for *_, fut in batch:
+                    _resolve(fut, None, e)
+
+writer = SingleWriter(
+    max_batch=int(os.getenv("DB_WRITER_MAX_BATCH", "50")),
+    max_wait=float(os.getenv("DB_WRITER_MAX_WAIT", "0.05")),
+)
+
+def writer_enabled() -> bool:
+    flag = os.getenv("DB_WRITER")
+    if flag is None:
+        return _enabled_by_default()
+    return flag == "1"
+
+async def write(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a synchronous DB write from async code: through the single-writer
+    queue when enabled, otherwise in a worker thread like sync_to_async.
+    """
+    if writer_enabled():
+        return await writer.run(fn, *args, **kwargs)
+    return await sync_to_async(fn)(*args, **kwargs)
@@ -0,0 +1,163 @@
+# crawlers/backpressure.py
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Set
+
+from django.db.models import Count, Min, Q
+
+from core.dbexec import run_db
+from core.models import Post, SkipReason
+from core.writer import write
+from . import metrics
+
+# =========================================================
+# Backpressure between ingestion and the posting bot
+# =========================================================
+#
+# Crawlers can insert thousands of rows while the bot posts one per tick, so
+# the unposted queue is watched and kept near a target:
+#   level = max(size / BACKLOG_TARGET, oldest age / BACKLOG_TARGET_AGE)
+# Above 1 the controller
+#   - raises posting throughput: up to POSTS_PER_TICK_MAX posts per bot tick;
+#   - slows low-value sources (most of their recent posts were duplicates or
+#     shed): their next due time is stretched by up to BACKPRESSURE_MAX_SLOWDOWN
+#     (crawlers/pacing.py; the adaptive interval itself is left alone);
+# With BACKLOG_SHED=1 it also sheds what the bot will never get to: queued
+# posts older than BACKLOG_MAX_AGE (STALE) and the oldest posts beyond
+# BACKLOG_MAX (OVERFLOW). Shed rows keep a Post.skip_reason and are pruned by
+# retention; off by default, since they are never posted.
+#
+# The queries run in backpressure_loop, every BACKPRESSURE_REFRESH seconds in
+# each process that crawls (main.py, crawl_worker); everything else --
+# the bot tick, interval_factor() inside the writer's transaction -- only
+# reads the cached measurement. Shedding runs from main.py only.
+#
+# Tunables:
+#   BACKPRESSURE               1/0 (default 1)
+#   BACKLOG_SHED               1/0: shed STALE/OVERFLOW posts (default 0)
+#   BACKLOG_TARGET             queued posts considered healthy (default 200)
+#   BACKLOG_TARGET_AGE         seconds the oldest queued post may wait (default 21600)
+#   BACKLOG_MAX_AGE            queued posts older than this are shed (default 172800)
+#   BACKLOG_MAX                hard cap on the queue; the oldest beyond are shed (default 2000)
+#   POSTS_PER_TICK_MAX         posts per bot tick under pressure (default 5)
+#   BACKPRESSURE_MAX_SLOWDOWN  max stretch of a low-value source's next crawl (default 4)
+#   BACKPRESSURE_LOW_VALUE     share of duplicate/shed posts marking a source low-value (default 0.5)
+#   BACKPRESSURE_REFRESH       seconds between measurements (default 60)
+
+BACKLOG_TARGET = int(os.getenv("BACKLOG_TARGET", "200"))
+BACKLOG_TARGET_AGE = int(os.getenv("BACKLOG_TARGET_AGE", "21600"))
+BACKLOG_MAX_AGE = int(os.getenv("BACKLOG_MAX_AGE", "172800"))
+BACKLOG_MAX = int(os.getenv("BACKLOG_MAX", "2000"))
+POSTS_PER_TICK_MAX = int(os.getenv("POSTS_PER_TICK_MAX", "5"))
+BACKPRESSURE_MAX_SLOWDOWN = float(os.getenv("BACKPRESSURE_MAX_SLOWDOWN", "4"))
+BACKPRESSURE_LOW_VALUE = float(os.getenv("BACKPRESSURE_LOW_VALUE", "0.5"))
+BACKPRESSURE_REFRESH = int(os.getenv("BACKPRESSURE_REFRESH", "60"))
+
+_VALUE_WINDOW_DAYS = 7
+_VALUE_MIN_POSTS = 10  # don't judge a source on a handful of posts
+
+def backpressure_enabled() -> bool:
+    return os.getenv("BACKPRESSURE", "1") == "1"
+
+def shedding_enabled() -> bool:
+    return os.getenv("BACKLOG_SHED", "0") == "1"
+
+class Pressure:
+    def __init__(self, size: int, oldest_age: float, low_value: Set[int]):
+        self.size = size
+        self.oldest_age = oldest_age
+        self.low_value = low_value
+        self.level = max(size / max(BACKLOG_TARGET, 1), oldest_age / max(BACKLOG_TARGET_AGE, 1))
+        self.measured_at = time.monotonic()
+
+    def __repr__(self):
+        return f"<Pressure level={self.level:.2f} size={self.size} oldest={self.oldest_age / 3600:.1f}h>"
+
+_current: Optional[Pressure] = None
+_lock = threading.Lock()
+
+def _low_value_sources() -> Set[int]:
+    since = datetime.now(timezone.utc) - timedelta(days=_VALUE_WINDOW_DAYS)
+    rows = (
+        Post.objects.filter(created_at__gte=since)
+        .values("source_id")
+        .annotate(total=Count("id"), wasted=Count("id", filter=Q(is_duplicate=True) | ~Q(skip_reason="")))
+    )
+    return {
+        r["source_id"] for r in rows
+        if r["total"] >= _VALUE_MIN_POSTS and r["wasted"] / r["total"] >= BACKPRESSURE_LOW_VALUE
+    }
+
+def measure() -> Pressure:
+    """Measure the unposted queue now (two small queries, three under pressure)."""
+    global _current
+    agg = Post.objects.unposted().aggregate(n=Count("id"), oldest=Min("created_at"))
+    oldest = agg["oldest"]
+    age = (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0.0
+    p = Pressure(agg["n"], age, set())
+    if p.level > 1:
+        p.low_value = _low_value_sources()
+    with _lock:
+        _current = p
+    return p
+
+def current() -> Optional[Pressure]:
+    """Last measurement from backpressure_loop, None before the first (never touches the DB)."""
+    return _current
+
+def posts_per_tick(p: Optional[Pressure]) -> int:
+    if p is None or p.level <= 1:
+        return 1
+    return max(1, min(POSTS_PER_TICK_MAX, math.ceil(p.level)))
+
+def interval_factor(source_id: int) -> float:
+    """How much to stretch a source's next crawl (1.0 = not at all)."""
+    if not backpressure_enabled():
+        return 1.0
+    p = current()
+    if p is None or p.level <= 1 or source_id not in p.low_value:
+        return 1.0
+    return min(BACKPRESSURE_MAX_SLOWDOWN, p.level)
+
+def shed_backlog() -> dict:
+    """Mark queued posts the bot will never reach as skipped. Returns counts per reason."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=BACKLOG_MAX_AGE)
+    stale = Post.objects.unposted().filter(created_at__lt=cutoff).update(skip_reason=SkipReason.STALE)
+    overflow = 0
+    excess = Post.objects.unposted().count() - BACKLOG_MAX
+    if excess > 0:
+        ids = list(Post.objects.unposted().order_by("created_at").values_list("pk", flat=True)[:excess])
+        overflow = Post.objects.filter(pk__in=ids).update(skip_reason=SkipReason.OVERFLOW)
+    return {"stale": stale, "overflow": overflow}
+
+async def backpressure_loop(interval: int = BACKPRESSURE_REFRESH, shed: Optional[bool] = None):
+    """
+    Measure and export the queue state, and shed when shed (default:
+    BACKLOG_SHED) is on. main.py sheds; crawl_worker only measures.
+    """
+    if shed is None:
+        shed = shedding_enabled()
+    was_pressured = False
+    while True:
+        try:
+            counts = await write(shed_backlog) if shed else {"stale": 0, "overflow": 0}
+            p = await run_db(measure)
+            metrics.record_backpressure(p.size, p.oldest_age, p.level, posts_per_tick(p),
+                                        len(p.low_value), counts["stale"] + counts["overflow"])
+            if counts["stale"] or counts["overflow"]:
+                print(f"[backpressure] shed {counts['stale']} stale + {counts['overflow']} overflow posts")
+            if (p.level > 1) != was_pressured:
+                was_pressured = p.level > 1
+                state = "ON" if was_pressured else "off"
+                print(f"[backpressure] {state}: queue {p.size}, oldest {p.oldest_age / 3600:.1f}h, "
+                      f"level {p.level:.2f}, {posts_per_tick(p)} posts/tick, "
+                      f"{len(p.low_value)} low-value source(s) slowed")
+        except Exception as e:
+            print(f"[backpressure] ERROR: {e}")
+        await asyncio.sleep(interval)
@@ -6,6 +6,8 @@ import re
 import time
 import random
 import json
+import threading
+import functools
 from typing import List, Dict, Tuple, Optional, Callable, Any
 from urllib.parse import urljoin, urlparse
 
@@ -30,6 +32,26 @@ REMOTE_PATTERNS = re.compile(
 def is_remote_text(text: str) -> bool:
     return bool(REMOTE_PATTERNS.search(text or ""))
 
+# =========================================================
+# "Filled / closed" detector for edited posts (EN + FA)
+# =========================================================
+# Only status phrases count, not the words on their own: "closed beta",
+# "Closed captioning specialist" or "expired-domain marketplace" are live posts.
+_STATUS = r"(?:filled|closed|expired)"
+FILLED_PATTERNS = re.compile(
+    # "position filled", "the role has been filled", "applications are now closed"
+    rf"\b(?:position|role|job|vacancy|opening|application)s?\s+(?:(?:has|have)\s+been\s+|is\s+|are\s+|was\s+|were\s+)?"
+    rf"(?:now\s+)?{_STATUS}\b(?!-)|"
+    r"\bno\s+longer\s+(?:available|open|hiring|accepting)\b|"
+    # a status marker on a line of its own or before a separator: "[FILLED] Go developer", "CLOSED ❌"
+    rf"^\W*{_STATUS}(?:\W*$|\s*[\]):!|]|\s+[-–—])|"
+    r"ظرفیت\s*تکمیل\s*شد|(?:آگهی|موقعیت|پروژه)\s*(?:بسته|منقضی|تکمیل)\s*شد|^\W*(?:تکمیل|بسته)\s*شد\W*$",
+    re.I | re.U | re.M,
+)
+
+def is_filled_text(text: str) -> bool:
+    return bool(FILLED_PATTERNS.search(text or ""))
+
 # =========================================================
 # HTTP fetch (robust)
 # =========================================================
@@ -91,7 +113,40 @@ def _origin_referer(url: str) -> str:
     p = urlparse(url)
     return f"{p.scheme}://{p.netloc}/"
 
-def fetch(
+# Per-thread crawl deadline (time.monotonic()), set by the scheduler around a
+# scraper call. fetch() clamps its timeout/backoff to it and stops retrying once
+# it has passed, so a per-source timeout actually frees the worker thread.
+_ctx = threading.local()
+
+def set_deadline(deadline: Optional[float]) -> None:
+    _ctx.deadline = deadline
+
+def deadline_remaining() -> Optional[float]:
+    d = getattr(_ctx, "deadline", None)
+    return None if d is None else d - time.monotonic()
+
+class DeadlineExceeded(RuntimeError):
+    pass
+
+# Per-thread fetch counters for crawl-run history (core.models.CrawlRun):
+# HTTP attempts (every request incl. fallbacks), bytes received and seconds
+# spent inside fetch() (incl. backoff). Reset by the scheduler per scraper call.
+def reset_fetch_stats() -> None:
+    _ctx.stats = {"attempts": 0, "bytes": 0, "seconds": 0.0}
+
+def fetch_stats() -> dict:
+    return dict(getattr(_ctx, "stats", None) or {"attempts": 0, "bytes": 0, "seconds": 0.0})
+
+def _get(client, url: str, **kw):
+    stats = getattr(_ctx, "stats", None)
+    if stats is not None:
+        stats["attempts"] += 1
+    r = client.get(url, **kw)
+    if stats is not None:
+        stats["bytes"] += len(r.content or b"")
+    return r
+
+def _fetch(
     url: str,
     *,
     timeout: int | None = None,
@@ -126,13 +181,19 @@ def fetch(
     last_status, last_err, last_text = None, None, ""
 
     for i in range(max(1, n_try)):
+        remaining = deadline_remaining()
+        if remaining is not None:
+            if remaining <= 0:
+                raise DeadlineExceeded(f"fetch({url}) deadline exceeded: status={last_status} err={last_err}")
+            t_out = min(t_out, max(1.0, remaining))
+
         # Change UA each attempt to reduce sticky blocking
         sess.headers["User-Agent"] = random.choice(_UA_POOL)
         if SCRAPER_DEBUG:
             print(f"[fetch] try={i+1}/{n_try} GET {url}")
 
         try:
-            r = sess.get(url, timeout=t_out, allow_redirects=True)
+            r = _get(sess, url, timeout=t_out, allow_redirects=True)
             last_status = r.status_code
             last_text = r.text or ""
 
@@ -148,7 +209,7 @@ def fetch(
                 else:
                     # Try with explicit JSON Accept
                     try:
-                        r2 = sess.get(url, timeout=t_out, headers={**hdrs, "Accept": "application/json,*/*;q=0.8"})
+                        r2 = _get(sess, url, timeout=t_out, headers={**hdrs, "Accept": "application/json,*/*;q=0.8"})
                         last_status = r2.status_code
                         last_text = r2.text or last_text
                         if r2.status_code == 200 and len(last_text) >= SCRAPER_MIN_LEN and not _looks_like_blockpage(last_text):
@@ -159,7 +220,7 @@ def fetch(
                 # Cloudflare / WAF fallback
                 if cf is not None:
                     try:
-                        r3 = cf.get(url, timeout=t_out, headers=hdrs, allow_redirects=True)
+                        r3 = _get(cf, url, timeout=t_out, headers=hdrs, allow_redirects=True)
                         last_status = r3.status_code
                         last_text = r3.text or last_text
                         if r3.status_code == 200 and len(last_text) >= SCRAPER_MIN_LEN:
@@ -171,11 +232,25 @@ def fetch(
         except Exception as e:
             last_err = e
 
-        # backoff + jitter
-        time.sleep(s_base * (2 ** i) + random.random() * 0.75)
+        # backoff + jitter (never past the deadline)
+        pause = s_base * (2 ** i) + random.random() * 0.75
+        remaining = deadline_remaining()
+        if remaining is not None:
+            pause = min(pause, max(0.0, remaining))
+        time.sleep(pause)
 
     raise RuntimeError(f"fetch({url}) failed: status={last_status} err={last_err}")
 
+@functools.wraps(_fetch)
+def fetch(*args, **kwargs) -> str:
+    started = time.monotonic()
+    try:
+        return _fetch(*args, **kwargs)
+    finally:
+        stats = getattr(_ctx, "stats", None)
+        if stats is not None:
+            stats["seconds"] += time.monotonic() - started
+
 def fetch_json(url: str, **kw) -> Any:
     txt = fetch(url, headers={"Accept": "application/json, */*;q=0.8"}, **kw)
     try:
@@ -250,15 +325,25 @@ def abs_url(base: str, href: str) -> str:
     return urljoin(base, href or "")
 
 # Non-crashing wrapper for scrapers (use as decorator @no_fail)
+# The swallowed exception is kept per thread so the scheduler can still tell
+# "broken" from "nothing posted" (see last_swallowed_error()).
 def no_fail(fn: Callable[..., list[dict]]) -> Callable[..., list[dict]]:
     def wrapper(*a, **kw) -> list[dict]:
         try:
             return fn(*a, **kw) or []
         except Exception as e:
+            _ctx.last_error = e
             print(f"[scraper:{fn.__name__}] swallowed error: {e}")
             return []
+    wrapper.__name__ = fn.__name__
     return wrapper
 
+def last_swallowed_error(clear: bool = True) -> Optional[Exception]:
+    e = getattr(_ctx, "last_error", None)
+    if clear:
+        _ctx.last_error = None
+    return e
+
 # =========================================================
 # Salary parsing (robust)
 # =========================================================
@@ -275,6 +360,7 @@ SALARY_RE = re.compile(
 )
 
 CURRENCY_MAP = {"$": "USD", "€": "EUR", "£": "GBP"}
+SALARY_LIMIT = 1e10  # Post.salary_min/max are Decimal(12, 2); larger "amounts" are ids, not pay
 
 def _amount_to_number(tok: str | None) -> Optional[float]:
     if not tok:
@@ -286,9 +372,10 @@ def _amount_to_number(tok: str | None) -> Optional[float]:
     elif t.endswith("m"):
         mult, t = 1_000_000.0, t[:-1]
     try:
-        return float(t) * mult
+        value = float(t) * mult
     except ValueError:
         return None
+    return value if value < SALARY_LIMIT else None
 
 def _period_to_enum(per: str) -> str:
     s = (per or "").lower()
@@ -363,3 +450,52 @@ def normalize_items(items: List[Dict]) -> List[Dict]:
             "raw_text": it.get("raw_text") or "",
         })
     return normalized
+
+class ChannelItem:
+    """
+    A channel post on its way to the DB (crawlers/pyro_channels.py): the
+    message fields a Post needs in slots, instead of an item dict with a
+    nested extras dict that normalize_items() then copies. The text is
+    both description and raw_text; extras() builds the payload dict only
+    when the post is written. skip_reason is set for a message the spam
+    filter rejected that is kept anyway (SPAM_KEEP): stored, never queued.
+    """
+    __slots__ = ("link", "title", "text", "category", "message_id", "chat_id", "date", "edit_date", "views",
+                 "salary_min", "salary_max", "currency", "period", "skip_reason")
+
+    def __init__(self, link: str, title: str, text: str, category: str, message_id: int,
+                 chat_id: Optional[int] = None, date=None, edit_date=None, views: Optional[int] = None):
+        self.link = link
+        self.title = title
+        self.text = text
+        self.category = category
+        self.message_id = message_id
+        self.chat_id = chat_id
+        self.date = date            # aware datetimes
+        self.edit_date = edit_date
+        self.views = views
+        self.salary_min: Optional[float] = None
+        self.salary_max: Optional[float] = None
+        self.currency = ""
+        self.period = ""
+        self.skip_reason = ""
+
+    def extras(self) -> Dict[str, Any]:
+        return {
+            "chat_id": self.chat_id,
+            "message_id": self.message_id,
+            "date": self.date.isoformat() if self.date else None,
+            "edit_date": self.edit_date.isoformat() if self.edit_date else None,
+            "views": self.views,
+        }
+
+def normalize_channel_items(items: List[ChannelItem]) -> List[ChannelItem]:
+    """
+    normalize_items() for a batch of ChannelItems, in place: drops the ones
+    without a link and parses the salary from the message text only (the
+    title is its first line; ids and dates in extras aren't text).
+    """
+    out = [it for it in items if it.link]
+    for it in out:
+        it.salary_min, it.salary_max, it.currency, it.period = parse_salary(it.text)
+    return out
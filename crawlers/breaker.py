@@ -0,0 +1,54 @@
+# crawlers/breaker.py
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from core.models import BreakerState, Source
+
+# =========================================================
+# Per-source circuit breaker
+# =========================================================
+#
+# CLOSED     normal crawling; failures (exceptions, timeouts and, for
+#            websites, empty results) count up Source.failure_streak.
+# OPEN       after BREAKER_THRESHOLD consecutive failures the source is
+#            quarantined: next_due = quarantined_until, with a cool-down
+#            that doubles with every further failure.
+# HALF_OPEN  the cool-down is over and one probe crawl is running. Success
+#            closes the breaker, failure re-opens it with a longer cool-down.
+#
+# Tunables:
+#   BREAKER_THRESHOLD     consecutive failures before quarantine (default 5)
+#   BREAKER_COOLDOWN      first cool-down in seconds (default 900)
+#   BREAKER_COOLDOWN_MAX  cap in seconds (default 86400)
+
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = int(os.getenv("BREAKER_COOLDOWN", "900"))
+BREAKER_COOLDOWN_MAX = int(os.getenv("BREAKER_COOLDOWN_MAX", "86400"))
+
+def cooldown_seconds(streak: int) -> int:
+    trips = max(0, streak - BREAKER_THRESHOLD)
+    return min(BREAKER_COOLDOWN_MAX, BREAKER_COOLDOWN * (2 ** min(trips, 20)))
+
+def transition(state: str, streak: int, failed: bool, now: datetime) -> Tuple[str, Optional[datetime]]:
+    """Return (new state, quarantined_until) after a crawl outcome."""
+    if not failed:
+        return BreakerState.CLOSED, None
+    if state in (BreakerState.OPEN, BreakerState.HALF_OPEN) or streak >= BREAKER_THRESHOLD:
+        return BreakerState.OPEN, now + timedelta(seconds=cooldown_seconds(streak))
+    return BreakerState.CLOSED, None
+
+def begin_probe(source_ids: list[int]) -> None:
+    """Mark quarantined sources whose cool-down elapsed as probing."""
+    Source.objects.filter(pk__in=source_ids, breaker_state=BreakerState.OPEN).update(
+        breaker_state=BreakerState.HALF_OPEN,
+    )
+
+def reset(queryset) -> int:
+    """Close the breaker and make the sources due again (admin action)."""
+    return queryset.update(
+        breaker_state=BreakerState.CLOSED, failure_streak=0,
+        quarantined_until=None, next_due=None, last_error="",
+    )
@@ -0,0 +1,132 @@
+# crawlers/categorize.py
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+from core.models import Category
+from .base import ChannelItem
+from .textclf import Features, LinearModel, MulticlassModel, hashed_features, words
+
+# =========================================================
+# Per-message category (JOB / PROJECT / COMPETITION)
+# =========================================================
+#
+# A channel Source has one category, but many channels mix full-time jobs,
+# freelance projects and hackathons. Each batch of new channel items (crawl,
+# push and edit sync) is classified before it is saved: a one-vs-rest
+# linear model over hashed title and body words (crawlers/textclf.py). The
+# channel's own category gets CATEGORY_SOURCE_PRIOR added to its margin, and
+# the model only overrides it with at least CATEGORY_MIN_CONFIDENCE.
+#
+# Without a trained model every post keeps its channel's category: the few
+# hand-set cue words per category (seed_model) are only the starting point
+# for `manage.py train_category`, which learns the model from the labeled
+# website posts and writes CATEGORY_MODEL, a small JSON file to ship with
+# the app. A single cue word ("project", "competition") is no evidence that
+# a JOB channel's post is something else.
+#
+# Tunables:
+#   CATEGORY_CLASSIFIER      1/0 (default 1)
+#   CATEGORY_MODEL           model file (default <BASE_DIR>/category_model.json; without it nothing is reclassified)
+#   CATEGORY_SOURCE_PRIOR    margin bonus for the channel's own category (default 1.0)
+#   CATEGORY_MIN_CONFIDENCE  probability needed to override it (default 0.6)
+#   CATEGORY_MAX_CHARS       characters of a body that are looked at (default 1500)
+
+CATEGORY_SOURCE_PRIOR = float(os.getenv("CATEGORY_SOURCE_PRIOR", "1.0"))
+CATEGORY_MIN_CONFIDENCE = float(os.getenv("CATEGORY_MIN_CONFIDENCE", "0.6"))
+CATEGORY_MAX_CHARS = int(os.getenv("CATEGORY_MAX_CHARS", "1500"))
+
+SEED_CUES: Dict[str, List[str]] = {
+    Category.JOB: [
+        "salary", "hiring", "position", "vacancy", "full time", "part time", "employee", "benefits",
+        "resume", "cv", "career", "permanent", "monthly", "yearly", "annual",
+        "استخدام", "حقوق", "تمام وقت", "پاره وقت", "بیمه", "رزومه", "نیازمندیم",
+    ],
+    Category.PROJECT: [
+        "freelance", "freelancer", "project", "budget", "fixed price", "gig", "task", "deadline",
+        "upwork", "fiverr", "proposal", "bid", "milestone", "one time",
+        "پروژه", "فریلنسر", "فریلنسری", "بودجه", "انجام پروژه", "سفارش", "قیمت توافقی",
+    ],
+    Category.COMPETITION: [
+        "hackathon", "competition", "contest", "prize", "prizes", "challenge", "bounty", "bounties",
+        "registration", "kaggle", "leaderboard", "winners", "submission",
+        "هکاتون", "مسابقه", "جایزه", "جوایز", "ثبت نام", "رقابت",
+    ],
+}
+SEED_WEIGHT = 1.0
+
+_TAG_RE = re.compile(r"<[^>]+>")  # website descriptions (training data) may be HTML
+
+def classifier_enabled() -> bool:
+    return os.getenv("CATEGORY_CLASSIFIER", "1") == "1"
+
+def model_path() -> Path:
+    return Path(os.getenv("CATEGORY_MODEL") or Path(settings.BASE_DIR) / "category_model.json")
+
+def features(title: str, body: str) -> Features:
+    """Body words/bigrams (title included, as in channel posts) plus t:<word> for the title."""
+    title = title or ""
+    toks = words(f"{title}\n{_TAG_RE.sub(' ', (body or '')[:CATEGORY_MAX_CHARS])}")
+    return hashed_features(toks, [f"t:{w}" for w in words(title)])
+
+def seed_model() -> MulticlassModel:
+    models = {}
+    for label, cues in SEED_CUES.items():
+        named: Dict[str, float] = {}
+        for cue in cues:
+            toks = words(cue)
+            key = f"w:{toks[0]}" if len(toks) == 1 else f"b:{toks[0]} {toks[1]}"
+            named[key] = SEED_WEIGHT
+        models[str(label)] = LinearModel.from_named(named, bias=-0.5)
+    return MulticlassModel(models)
+
+_model: Optional[MulticlassModel] = None
+_loaded = False
+
+def model() -> Optional[MulticlassModel]:
+    """The trained model, or None when CATEGORY_MODEL is missing or unreadable."""
+    global _model, _loaded
+    if not _loaded:
+        _loaded = True
+        path = model_path()
+        if path.exists():
+            try:
+                _model = MulticlassModel.load(path)
+                print(f"[CATEGORY] model loaded from {path} ({', '.join(_model.models)})")
+            except Exception as e:
+                print(f"[CATEGORY] can't load {path}: {e}; keeping channel categories")
+    return _model
+
+def active() -> bool:
+    return classifier_enabled() and model() is not None
+
+def classify(title: str, body: str, default: str) -> Tuple[str, float]:
+    """(category, probability); `default` (the channel's category) unless the text says otherwise."""
+    m = model()
+    if m is None:
+        return default, 1.0
+    label, p = m.predict(features(title, body), {default: CATEGORY_SOURCE_PRIOR})
+    if label != default and p < CATEGORY_MIN_CONFIDENCE:
+        return default, p
+    return label, p
+
+def classify_items(items: List[ChannelItem], default: str) -> Dict[str, int]:
+    """
+    Set the category of a batch of channel items in place (spam rejects
+    keep the channel's). Returns how many went to each category other than `default`.
+    """
+    moved: Dict[str, int] = {}
+    if not active():
+        return moved
+    for it in items:
+        if it.skip_reason:
+            continue  # spam: never posted
+        label, _ = classify(it.title, it.text, default)
+        it.category = label
+        if label != default:
+            moved[label] = moved.get(label, 0) + 1
+    return moved
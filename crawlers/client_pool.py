@@ -0,0 +1,130 @@
+# crawlers/client_pool.py
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from . import metrics
+from .ratelimit import TokenBucket
+from .tg_backend import TelegramBackend
+
+# =========================================================
+# Multi-account Telegram client pool
+# =========================================================
+#
+# Channel reads are spread over several user accounts; flood limits are per
+# account, so channel throughput grows with the number of accounts.
+#   - each channel has a home account, picked by consistent hashing of its
+#     username (CHANNEL_ACCOUNT_VNODES points per account on the ring):
+#     adding or removing an account only moves that account's share;
+#   - an account that gets a FloodWait is limited until the wait is over;
+#     meanwhile its channels go to the next healthy account on the ring and
+#     come back once it recovers;
+#   - every account has its own request budget (CHANNEL_RPS / CHANNEL_BURST)
+#     and its own concurrency slots (CHANNEL_CONCURRENCY, crawlers/pyro_channels.py),
+#     so a busy or flood-limited account doesn't hold up the others.
+# Per-account health (crawls, errors, flood waits, limited until) is shown
+# in /stats.
+#
+# Accounts are TelegramBackends (crawlers/tg_backend.py), one per session.
+#
+# Tunables:
+#   CHANNEL_ACCOUNT_VNODES  ring points per account (default 64)
+
+CHANNEL_ACCOUNT_VNODES = int(os.getenv("CHANNEL_ACCOUNT_VNODES", "64"))
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class Account:
+    def __init__(self, backend: TelegramBackend, rate: float, burst: int, concurrency: int = 1):
+        self.backend = backend
+        self.name = backend.account
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = asyncio.Semaphore(max(1, concurrency))  # channels crawled at once on this account
+        self.limited_until = 0.0  # monotonic
+        self.crawls = 0
+        self.errors = 0
+        self.flood_waits = 0
+        self.flood_seconds = 0.0
+        self.last_error = ""
+
+    def limited(self, now: Optional[float] = None) -> bool:
+        return self.limited_until > (now or time.monotonic())
+
+    def report(self):
+        metrics.record_account(
+            self.name, crawls=self.crawls, errors=self.errors, flood_waits=self.flood_waits,
+            flood_seconds=self.flood_seconds, limited_for=max(0.0, self.limited_until - time.monotonic()),
+            last_error=self.last_error,
+        )
+
+class ClientPool:
+    def __init__(self, backends: List[TelegramBackend], rate: float, burst: int, concurrency: int = 1,
+                 vnodes: int = CHANNEL_ACCOUNT_VNODES):
+        if not backends:
+            raise ValueError("ClientPool needs at least one backend")
+        self.accounts = [Account(b, rate, burst, concurrency) for b in backends]
+        self._ring: List[Tuple[int, int]] = sorted(
+            (_hash(f"{acct.name}#{i}"), n) for n, acct in enumerate(self.accounts) for i in range(max(1, vnodes))
+        )
+        self._points = [h for h, _ in self._ring]
+        for acct in self.accounts:
+            acct.report()
+
+    @property
+    def backends(self) -> List[TelegramBackend]:
+        return [a.backend for a in self.accounts]
+
+    def _walk(self, key: str) -> Iterator[Account]:
+        """Accounts in ring order from the key's position, each once."""
+        start = bisect.bisect(self._points, _hash(key))
+        seen = set()
+        for i in range(len(self._ring)):
+            n = self._ring[(start + i) % len(self._ring)][1]
+            if n not in seen:
+                seen.add(n)
+                yield self.accounts[n]
+                if len(seen) == len(self.accounts):
+                    return
+
+    def home(self, key: str) -> Account:
+        return next(self._walk(key))
+
+    def pick(self, key: str) -> Optional[Account]:
+        """The first account on the ring that isn't flood-limited, or None if all are."""
+        now = time.monotonic()
+        return next((a for a in self._walk(key) if not a.limited(now)), None)
+
+    def next_free_in(self) -> float:
+        """Seconds until some account is no longer limited (0 if one is free now)."""
+        now = time.monotonic()
+        return max(0.0, min(a.limited_until for a in self.accounts) - now)
+
+    def ok(self, acct: Account):
+        acct.crawls += 1
+        acct.report()
+
+    def failed(self, acct: Account, error: str):
+        acct.crawls += 1
+        acct.errors += 1
+        acct.last_error = error[:80]
+        acct.report()
+
+    def flood(self, acct: Account, wait: float):
+        acct.flood_waits += 1
+        acct.flood_seconds += wait
+        acct.limited_until = max(acct.limited_until, time.monotonic() + wait)
+        acct.last_error = f"FloodWait {wait:.0f}s"
+        acct.report()
+
+    async def stop(self):
+        for backend in self.backends:
+            try:
+                await backend.stop()
+            except Exception as e:
+                print(f"[PYRO] error stopping {backend.kind} account {backend.account}: {e}")
@@ -0,0 +1,89 @@
+# crawlers/crawl_runs.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from core.models import CrawlRun
+from core.writer import write
+
+# =========================================================
+# Crawl-run history (core.models.CrawlRun)
+# =========================================================
+#
+# Crawlers hand finished runs to an in-memory buffer; the buffer goes to the
+# DB in one bulk INSERT (through the single writer) once it holds
+# CRAWL_RUN_BATCH rows or CRAWL_RUN_FLUSH seconds have passed, and at the end
+# of every crawl cycle. A crash loses at most the unflushed tail.
+#
+# Tunables:
+#   CRAWL_RUN_HISTORY  1/0 (default 1)
+#   CRAWL_RUN_BATCH    rows per flush (default 50)
+#   CRAWL_RUN_FLUSH    max seconds a run waits in the buffer (default 30)
+
+CRAWL_RUN_BATCH = int(os.getenv("CRAWL_RUN_BATCH", "50"))
+CRAWL_RUN_FLUSH = float(os.getenv("CRAWL_RUN_FLUSH", "30"))
+
+def history_enabled() -> bool:
+    return os.getenv("CRAWL_RUN_HISTORY", "1") == "1"
+
+_buffer: List[CrawlRun] = []
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+def _ms(seconds: float) -> int:
+    return max(0, int(round(seconds * 1000)))
+
+def record_run(source_id: int, started: datetime, duration: float, *, fetch: float = 0.0, parse: float = 0.0,
+               persist: float = 0.0, bytes_downloaded: int = 0, http_attempts: int = 0, scraped: int = 0,
+               new: int = 0, updated: int = 0, unchanged: int = 0, error: str = "") -> None:
+    """Buffer one run (durations in seconds). Thread-safe, no DB access."""
+    if not history_enabled():
+        return
+    run = CrawlRun(
+        source_id=source_id,
+        started_at=started,
+        finished_at=started + timedelta(seconds=duration),
+        duration_ms=_ms(duration),
+        fetch_ms=_ms(fetch),
+        parse_ms=_ms(parse),
+        persist_ms=_ms(persist),
+        bytes_downloaded=bytes_downloaded,
+        http_attempts=http_attempts,
+        scraped=scraped,
+        new=new,
+        updated=updated,
+        unchanged=unchanged,
+        error=error[:60],
+    )
+    with _lock:
+        _buffer.append(run)
+
+def _take(force: bool) -> List[CrawlRun]:
+    global _buffer, _last_flush
+    with _lock:
+        if not _buffer:
+            return []
+        if not force and len(_buffer) < CRAWL_RUN_BATCH and time.monotonic() - _last_flush < CRAWL_RUN_FLUSH:
+            return []
+        runs, _buffer = _buffer, []
+        _last_flush = time.monotonic()
+    return runs
+
+def _save(runs: List[CrawlRun]) -> None:
+    CrawlRun.objects.bulk_create(runs, batch_size=500)
+
+async def flush_runs(force: bool = False) -> int:
+    """Write buffered runs if the batch is full or old enough (or force). Returns rows written."""
+    runs = _take(force)
+    if not runs:
+        return 0
+    try:
+        await write(_save, runs)
+    except Exception as e:
+        print(f"[crawl_runs] dropped {len(runs)} run(s): {e}")
+        return 0
+    return len(runs)
@@ -0,0 +1,162 @@
+# crawlers/dedupe.py
+from __future__ import annotations
+
+import os
+import re
+import hashlib
+from typing import Iterable, List, Optional, Tuple
+
+from django.db.models import Q
+from core.models import Post, NearDupBucket
+
+# =========================================================
+# Cross-source near-duplicate detection (SimHash + LSH bands)
+# =========================================================
+#
+# Every canonical post gets a 64-bit SimHash over its normalised
+# title + company + description, the description's total weight capped at
+# DEDUPE_DESC_WEIGHT times the title's (see _features). The fingerprint is
+# split into 4 bands of 16 bits; each band is stored as a row in NearDupBucket, indexed on
+# (band, key). Two fingerprints within Hamming distance <= 3 must share at
+# least one band exactly (pigeonhole), so a lookup is one indexed query
+# followed by a popcount on a handful of candidates.
+# After changing the weights, re-index with `manage.py dedupe_posts --rebuild`.
+
+DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "1") == "1"
+# Bands are fixed at 4, so anything above 3 would silently miss matches.
+DEDUPE_MAX_DISTANCE = min(3, int(os.getenv("DEDUPE_MAX_DISTANCE", "3")))
+DEDUPE_DESC_CHARS = int(os.getenv("DEDUPE_DESC_CHARS", "2000"))
+DEDUPE_DESC_WEIGHT = float(os.getenv("DEDUPE_DESC_WEIGHT", "2"))
+
+BANDS = 4
+BAND_BITS = 64 // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+_URL_RE = re.compile(r"https?://\S+|www\.\S+|t\.me/\S+", re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+_WORD_RE = re.compile(r"\w+", re.U)
+
+# ----------------- Fingerprinting -----------------
+
+def normalize_text(text: str) -> List[str]:
+    """Lowercase, drop URLs/HTML/punctuation, return word tokens."""
+    s = _TAG_RE.sub(" ", text or "")
+    s = _URL_RE.sub(" ", s)
+    return _WORD_RE.findall(s.lower())
+
+_COMPANY_SUFFIXES = {"inc", "llc", "ltd", "co", "corp", "company", "gmbh", "bv", "sa", "ag"}
+# Qualifiers boards tack onto titles ("(Remote)", "- Full time", "(m/f/d)")
+_TITLE_NOISE = {
+    "remote", "hybrid", "onsite", "on", "site", "full", "part", "time", "fulltime", "parttime",
+    "contract", "freelance", "urgent", "hiring", "m", "f", "d", "w", "x",
+    "دورکاری", "حضوری", "تمام", "پاره", "وقت", "فوری", "استخدام",
+}
+
+def _features(title: str, company: str, description: str) -> List[Tuple[str, float]]:
+    """
+    Weighted word features: title words count triple (board qualifiers like
+    "remote" dropped), company words double (legal suffixes dropped),
+    description words once -- but all description words together weigh at
+    most DEDUPE_DESC_WEIGHT times the title, so a company's shared
+    boilerplate can't outvote the title ("Senior Backend Engineer" vs
+    "Frontend Engineer" under the same About-us text). Unigrams keep the
+    fingerprint stable when boards add boilerplate or reorder sentences.
+    """
+    feats: List[Tuple[str, float]] = []
+    for w in normalize_text(title):
+        if w not in _TITLE_NOISE:
+            feats.append(("t:" + w, 3))
+    for w in normalize_text(company):
+        if w not in _COMPANY_SUFFIXES:
+            feats.append(("c:" + w, 2))
+    words = normalize_text((description or "")[:DEDUPE_DESC_CHARS])
+    if words:
+        title_weight = 3 * sum(1 for t, _ in feats if t.startswith("t:"))
+        weight = min(1.0, DEDUPE_DESC_WEIGHT * max(title_weight, 3) / len(words))
+        feats.extend(("d:" + w, weight) for w in words)
+    return feats
+
+def _hash64(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(title: str, company: str = "", description: str = "") -> Optional[int]:
+    """Unsigned 64-bit SimHash, or None when there's nothing to hash."""
+    feats = _features(title, company, description)
+    if not feats:
+        return None
+    acc = [0.0] * 64
+    for token, weight in feats:
+        h = _hash64(token)
+        for bit in range(64):
+            if (h >> bit) & 1:
+                acc[bit] += weight
+            else:
+                acc[bit] -= weight
+    out = 0
+    for bit in range(64):
+        if acc[bit] > 0:
+            out |= 1 << bit
+    return out
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+def bands(fp: int) -> List[Tuple[int, int]]:
+    return [(i, (fp >> (i * BAND_BITS)) & BAND_MASK) for i in range(BANDS)]
+
+# SQLite/Postgres BIGINT is signed; store the unsigned fingerprint as two's complement.
+def to_signed(fp: int) -> int:
+    return fp - (1 << 64) if fp >= (1 << 63) else fp
+
+def to_unsigned(v: int) -> int:
+    return v + (1 << 64) if v < 0 else v
+
+# ----------------- Index lookups -----------------
+
+def find_canonical(fp: int, exclude_post_id: Optional[int] = None) -> Optional[int]:
+    """Return the id of the closest indexed canonical post, or None."""
+    q = Q()
+    for band, key in bands(fp):
+        q |= Q(band=band, key=key)
+    rows = NearDupBucket.objects.filter(q).values_list("post_id", "fingerprint")
+    best: Optional[Tuple[int, int]] = None
+    for post_id, fingerprint in rows:
+        if post_id == exclude_post_id:
+            continue
+        d = hamming(fp, to_unsigned(fingerprint))
+        if d > DEDUPE_MAX_DISTANCE:
+            continue
+        if best is None or (d, post_id) < best:
+            best = (d, post_id)
+    return best[1] if best else None
+
+def index_post(post: Post) -> Optional[int]:
+    """
+    Cluster one freshly created post. Returns the canonical post id if the
+    post is a near-duplicate (and marks it), otherwise indexes it as a new
+    canonical and returns None. Call inside the ingest transaction.
+    """
+    fp = simhash(post.title, post.company, post.description)
+    if fp is None:
+        return None
+    canonical_id = find_canonical(fp, exclude_post_id=post.pk)
+    if canonical_id is not None:
+        Post.objects.filter(pk=post.pk).update(is_duplicate=True, duplicate_of_id=canonical_id)
+        post.is_duplicate, post.duplicate_of_id = True, canonical_id
+        return canonical_id
+    signed = to_signed(fp)
+    NearDupBucket.objects.bulk_create([
+        NearDupBucket(post_id=post.pk, band=band, key=key, fingerprint=signed)
+        for band, key in bands(fp)
+    ])
+    return None
+
+def index_posts(posts: Iterable[Post]) -> int:
+    """Cluster a batch of new posts; returns how many were marked duplicates."""
+    if not DEDUPE_ENABLED:
+        return 0
+    dupes = 0
+    for p in posts:
+        if index_post(p) is not None:
+            dupes += 1
+    return dupes
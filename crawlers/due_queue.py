@@ -0,0 +1,207 @@
+# crawlers/due_queue.py
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.models import BreakerState, Source
+from core.writer import write
+from . import metrics
+from .breaker import begin_probe
+from .pacing import current_interval, jittered
+
+# =========================================================
+# Persistent priority-queue scheduler
+# =========================================================
+#
+# A min-heap of (next_due, seq, source_id). Due times live on Source.next_due,
+# so a restart resumes where it left off instead of crawling everything at
+# once: sources never scheduled, or overdue by the time we start, are spread
+# over a window with random jitter. Every reschedule also gets +/- jitter so
+# sources that happen to share an interval drift apart.
+#
+# Each batch of due sources is a cycle with a time budget: sources go in
+# order of expected yield (Source.yield_ewma), the crawler gets the cycle
+# deadline, and whatever it didn't reach is carried over -- due again at once
+# and first in line next cycle -- instead of pushing every later cycle back.
+# Lag and overruns are exported through crawlers/metrics.py.
+#
+# Tunables:
+#   CRAWL_JITTER              +/- fraction applied to each interval (default 0.1, crawlers/pacing.py)
+#   SCHEDULER_RESTART_SPREAD  seconds to spread overdue sources over at startup (default 300)
+#   SCHEDULER_RESYNC          seconds between re-reading the Source table (default 300)
+#   CRAWL_CYCLE_BUDGET        seconds per cycle (default: the loop's crawl interval, but at least
+#                             the loop's per-source timeout)
+
+SCHEDULER_RESTART_SPREAD = int(os.getenv("SCHEDULER_RESTART_SPREAD", "300"))
+SCHEDULER_RESYNC = int(os.getenv("SCHEDULER_RESYNC", "300"))
+
+class DueQueue:
+    """Heap of due times with lazy deletion; _due holds the authoritative time per source."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, int, int]] = []
+        self._seq = itertools.count()
+        self._due: Dict[int, float] = {}
+        self._sources: Dict[int, Source] = {}
+        self._running: set[int] = set()
+        self.oldest_popped: Optional[float] = None  # earliest due time in the last pop_due()
+
+    def __len__(self):
+        return len(self._due)
+
+    def push(self, src: Source, due: datetime):
+        ts = due.timestamp()
+        self._sources[src.pk] = src
+        self._due[src.pk] = ts
+        heapq.heappush(self._heap, (ts, next(self._seq), src.pk))
+
+    def sync(self, sources: Iterable[Source], default_interval: int, first: bool = False) -> List[Tuple[int, datetime]]:
+        """
+        Merge a fresh Source snapshot: add new sources, drop vanished ones,
+        keep due times for the rest. Returns (source_id, next_due) pairs that
+        were (re)assigned and should be persisted.
+        """
+        now = datetime.now(timezone.utc)
+        seen = set()
+        changes: List[Tuple[int, datetime]] = []
+        for src in sources:
+            seen.add(src.pk)
+            if src.pk in self._running:
+                self._sources[src.pk] = src
+                continue
+            if src.pk in self._due:
+                self._sources[src.pk] = src
+                # honour a due time pulled forward in the DB (e.g. admin breaker reset)
+                if src.next_due is None or src.next_due.timestamp() < self._due[src.pk] - 1:
+                    due = src.next_due or now
+                    self.push(src, due)
+                    if src.next_due is None:
+                        changes.append((src.pk, due))
+                continue
+            due = src.next_due
+            window = min(current_interval(src, default_interval), SCHEDULER_RESTART_SPREAD)
+            if due is None or (first and due < now):
+                # never crawled, or overdue across a restart: spread the herd
+                due = now + timedelta(seconds=random.uniform(0, window))
+                changes.append((src.pk, due))
+            self.push(src, due)
+        for pk in list(self._due):
+            if pk not in seen:
+                del self._due[pk]
+                self._sources.pop(pk, None)
+        return changes
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[Source]:
+        ts_now = (now or datetime.now(timezone.utc)).timestamp()
+        out: List[Source] = []
+        self.oldest_popped = None
+        while self._heap and self._heap[0][0] <= ts_now:
+            ts, _, pk = heapq.heappop(self._heap)
+            if self._due.get(pk) != ts:
+                continue  # stale entry (rescheduled or removed)
+            if self.oldest_popped is None:
+                self.oldest_popped = ts
+            del self._due[pk]
+            self._running.add(pk)
+            out.append(self._sources[pk])
+        return out
+
+    def done(self, src: Source, next_due: datetime):
+        self._running.discard(src.pk)
+        self.push(src, next_due)
+
+    def seconds_until_next(self) -> Optional[float]:
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return None
+        return self._heap[0][0] - datetime.now(timezone.utc).timestamp()
+
+def cycle_budget(default_interval: int, min_budget: float = 0.0) -> float:
+    """A default budget shorter than one source's timeout would cut the same slow source off every cycle."""
+    return float(os.getenv("CRAWL_CYCLE_BUDGET") or max(default_interval, min_budget))
+
+def _by_priority(batch: List[Source], carried: Set[int]) -> List[Source]:
+    """Carried-over sources first, then highest expected yield."""
+    return sorted(batch, key=lambda s: (s.pk not in carried, -(s.yield_ewma or 0.0)))
+
+def _persist_due(changes: List[Tuple[int, datetime]]):
+    for pk, due in changes:
+        Source.objects.filter(pk=pk).update(next_due=due)
+
+async def run_due_loop(
+    name: str,
+    load_sources: Callable[[], Awaitable[List[Source]]],
+    crawl_due: Callable[[List[Source], float], Awaitable[Dict[int, Optional[datetime]]]],
+    default_interval: int,
+    max_sleep: float = 60.0,
+    min_budget: float = 0.0,
+):
+    """
+    Drive crawl_due(batch, deadline) whenever sources fall due. The batch is
+    in priority order and deadline is a loop.time() by which the cycle should
+    be over. crawl_due returns {source_id: next_due} for what it crawled and
+    {source_id: None} for what it didn't reach (carried over to the next
+    cycle); sources missing from the result are retried after their default
+    interval. min_budget (the crawler's per-source timeout) is the least
+    default cycle budget.
+    """
+    q = DueQueue()
+    first = True
+    last_sync = 0.0
+    loop = asyncio.get_running_loop()
+    budget = cycle_budget(default_interval, min_budget)
+    carried: Set[int] = set()
+
+    while True:
+        try:
+            if first or loop.time() - last_sync >= SCHEDULER_RESYNC:
+                changes = q.sync(await load_sources(), default_interval, first=first)
+                if changes:
+                    await write(_persist_due, changes)
+                if first:
+                    print(f"[{name}] scheduler: {len(q)} sources, {len(changes)} (re)spread over "
+                          f"{SCHEDULER_RESTART_SPREAD}s")
+                first, last_sync = False, loop.time()
+
+            batch = q.pop_due()
+            if batch:
+                started, now = loop.time(), datetime.now(timezone.utc)
+                lag = max(0.0, now.timestamp() - (q.oldest_popped or now.timestamp()))
+                batch = _by_priority(batch, carried)
+                probing = [s.pk for s in batch if s.breaker_state == BreakerState.OPEN]
+                if probing:
+                    await write(begin_probe, probing)
+                    print(f"[{name}] breaker: probing {len(probing)} quarantined source(s)")
+                try:
+                    next_dues = await crawl_due(batch, started + budget)
+                except Exception as e:
+                    print(f"[{name}] crawl batch error: {e}")
+                    next_dues = {}
+                now = datetime.now(timezone.utc)
+                fallback = now + timedelta(seconds=jittered(default_interval))
+                for src in batch:
+                    if src.pk in next_dues and next_dues[src.pk] is None:
+                        carried.add(src.pk)
+                        q.done(src, now)
+                    else:
+                        carried.discard(src.pk)
+                        q.done(src, next_dues.get(src.pk) or fallback)
+                n_carried = sum(1 for src in batch if src.pk in carried)
+                wall = loop.time() - started
+                metrics.record_cycle(name, sources=len(batch), crawled=len(batch) - n_carried,
+                                     carried=n_carried, lag=lag, wall=wall, budget=budget)
+                if n_carried or wall > budget:
+                    print(f"[{name}] cycle over budget: {wall:.1f}s of {budget:.0f}s, "
+                          f"{n_carried} source(s) carried over, lag {lag:.1f}s")
+        except Exception as e:
+            print(f"[{name}] scheduler error: {e}")
+
+        wait = q.seconds_until_next()
+        await asyncio.sleep(max(1.0, min(max_sleep, wait if wait is not None else max_sleep)))
@@ -0,0 +1,228 @@
+# crawlers/metrics.py
+from __future__ import annotations
+
+import time
+from typing import Dict, List
+
+# =========================================================
+# In-process crawl-cycle metrics
+# =========================================================
+#
+# run_due_loop (crawlers/due_queue.py) records one entry per cycle:
+#   lag       how late the cycle started vs. its most overdue source
+#   wall      how long the cycle took vs. its time budget
+#   carried   sources not reached before the deadline (first in line next cycle)
+# crawlers/backpressure.py the state of the bot's unposted queue, and the
+# channel crawler (crawlers/pyro_channels.py) Telegram flood waits, time
+# spent waiting on its request budget and peer-cache hits (crawlers/peers.py), and push mode (crawlers/pyro_push.py)
+# its batches and post-to-DB latency.
+# Read by the bot's /stats command; nothing is persisted.
+
+_LAG_ALPHA = 0.2  # smoothing for the lag average
+
+class LoopStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.cycles = 0
+        self.sources = 0
+        self.crawled = 0
+        self.carried = 0
+        self.overruns = 0
+        self.last_lag = 0.0
+        self.avg_lag = 0.0
+        self.max_lag = 0.0
+        self.last_wall = 0.0
+        self.last_budget = 0.0
+        self.last_cycle_at = 0.0
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+_loops: Dict[str, LoopStats] = {}
+
+def record_cycle(name: str, *, sources: int, crawled: int, carried: int, lag: float, wall: float,
+                 budget: float):
+    st = _loops.get(name)
+    if st is None:
+        st = _loops[name] = LoopStats(name)
+    st.avg_lag = lag if st.cycles == 0 else _LAG_ALPHA * lag + (1 - _LAG_ALPHA) * st.avg_lag
+    st.cycles += 1
+    st.sources += sources
+    st.crawled += crawled
+    st.carried += carried
+    st.overruns += wall > budget
+    st.last_lag = lag
+    st.max_lag = max(st.max_lag, lag)
+    st.last_wall = wall
+    st.last_budget = budget
+    st.last_cycle_at = time.time()
+
+_backlog: Dict[str, float] = {}
+
+def record_backpressure(size: int, oldest_age: float, level: float, per_tick: int, slowed: int, shed: int):
+    _backlog.update(size=size, oldest_age=oldest_age, level=level, per_tick=per_tick, slowed=slowed,
+                    shed_total=_backlog.get("shed_total", 0) + shed, measured_at=time.time())
+
+_telegram: Dict[str, float] = {}
+
+def record_flood_wait(seconds: float, outcome: str):
+    """
+    One FloodWait and what became of the channel: "moved" to another account
+    (crawlers/client_pool.py), slept off "inline" in the cycle, or "parked"
+    until the wait is over.
+    """
+    key = outcome
+    _telegram[key] = _telegram.get(key, 0) + 1
+    _telegram[f"{key}_seconds"] = _telegram.get(f"{key}_seconds", 0.0) + seconds
+    _telegram["last_flood_wait"] = seconds
+    _telegram["last_flood_at"] = time.time()
+
+_accounts: Dict[str, dict] = {}
+
+def record_account(name: str, **health):
+    """Per-account health of the Telegram client pool."""
+    _accounts[name] = dict(health, updated_at=time.time())
+
+def record_throttle(seconds: float):
+    """Time a crawl spent waiting for a request token (crawlers/ratelimit.py)."""
+    _telegram["throttled_seconds"] = _telegram.get("throttled_seconds", 0.0) + seconds
+
+_push: Dict[str, float] = {}
+
+def record_push(received: int, saved: int, latency: float):
+    """One push-mode flush; latency is from the oldest message's post/edit time to saved."""
+    n = _push.get("batches", 0)
+    _push.update(
+        batches=n + 1,
+        received=_push.get("received", 0) + received,
+        saved=_push.get("saved", 0) + saved,
+        last_latency=latency,
+        avg_latency=latency if n == 0 else _LAG_ALPHA * latency + (1 - _LAG_ALPHA) * _push["avg_latency"],
+        last_batch_at=time.time(),
+    )
+
+def record_resolve(hit: bool):
+    """A channel username served from the peer cache, or resolved through the API."""
+    key = "peer_cache_hits" if hit else "resolves"
+    _telegram[key] = _telegram.get(key, 0) + 1
+
+_sync: Dict[str, float] = {}
+
+def record_sync(checked: int, edited: int, deleted: int, filled: int):
+    """One edit/delete sync pass over channel posts (crawlers/tg_sync.py)."""
+    for key, n in (("checked", checked), ("edited", edited), ("deleted", deleted), ("filled", filled)):
+        _sync[key] = _sync.get(key, 0) + n
+    _sync["passes"] = _sync.get("passes", 0) + 1
+    _sync["last_pass_at"] = time.time()
+
+_spam: Dict[str, List[int]] = {}  # channel -> [messages scored, rejected]
+
+def record_spam(channel: str, seen: int, rejected: int):
+    """Channel messages scored by the spam filter (crawlers/spam.py) and how many it rejected."""
+    counts = _spam.setdefault(channel, [0, 0])
+    counts[0] += seen
+    counts[1] += rejected
+
+def spam_rates() -> Dict[str, float]:
+    """Per-channel reject rate."""
+    return {name: rejected / seen for name, (seen, rejected) in _spam.items() if seen}
+
+_categories: Dict[str, int] = {}
+
+def record_categories(classified: int, moved: Dict[str, int]):
+    """Channel items classified per message (crawlers/categorize.py); `moved` = label -> count
+    that didn't keep their channel's category."""
+    _categories["classified"] = _categories.get("classified", 0) + classified
+    for label, n in moved.items():
+        _categories[label] = _categories.get(label, 0) + n
+
+def snapshot() -> Dict[str, dict]:
+    out = {name: st.as_dict() for name, st in _loops.items()}
+    if _backlog:
+        out["backlog"] = dict(_backlog)
+    if _telegram:
+        out["telegram"] = dict(_telegram)
+    if _push:
+        out["push"] = dict(_push)
+    if _sync:
+        out["sync"] = dict(_sync)
+    if _categories:
+        out["categories"] = dict(_categories)
+    if _spam:
+        out["spam"] = {name: {"seen": seen, "rejected": rejected} for name, (seen, rejected) in _spam.items()}
+    if _accounts:
+        out["accounts"] = {name: dict(a) for name, a in _accounts.items()}
+    return out
+
+def format_stats() -> str:
+    """Plain-text summary for /stats."""
+    from core.writer import writer, writer_enabled
+
+    lines: List[str] = []
+    for st in _loops.values():
+        ago = time.time() - st.last_cycle_at
+        lines.append(
+            f"{st.name}: {st.cycles} cycles, {st.crawled}/{st.sources} crawled, "
+            f"{st.carried} carried over, {st.overruns} overruns\n"
+            f"  lag last {st.last_lag:.1f}s / avg {st.avg_lag:.1f}s / max {st.max_lag:.1f}s; "
+            f"last cycle {st.last_wall:.1f}s of {st.last_budget:.0f}s budget, {ago:.0f}s ago"
+        )
+    if not lines:
+        lines.append("no crawl cycles yet")
+    if _backlog:
+        b = _backlog
+        lines.append(
+            f"queue: {b['size']:.0f} unposted, oldest {b['oldest_age'] / 3600:.1f}h, "
+            f"pressure {b['level']:.2f} -> {b['per_tick']:.0f} posts/tick, "
+            f"{b['slowed']:.0f} sources slowed, {b['shed_total']:.0f} shed"
+        )
+    if _telegram:
+        t = _telegram
+        waits = t.get("moved", 0) + t.get("inline", 0) + t.get("parked", 0)
+        line = (f"telegram: {waits:.0f} flood waits ({t.get('moved', 0):.0f} moved, "
+                f"{t.get('parked', 0):.0f} parked), "
+                f"{t.get('inline_seconds', 0.0) + t.get('parked_seconds', 0.0):.0f}s blocked, "
+                f"{t.get('throttled_seconds', 0.0):.0f}s throttled, "
+                f"{t.get('resolves', 0):.0f} username resolves / {t.get('peer_cache_hits', 0):.0f} cached")
+        if waits:
+            line += f"; last {t['last_flood_wait']:.0f}s, {time.time() - t['last_flood_at']:.0f}s ago"
+        lines.append(line)
+    for name, a in _accounts.items():
+        limited = a["limited_for"] - (time.time() - a["updated_at"])
+        state = f"limited for {limited:.0f}s" if limited > 0 else "ok"
+        lines.append(
+            f"  account {name}: {state}, {a['crawls']} crawls, {a['errors']} errors, "
+            f"{a['flood_waits']} flood waits ({a['flood_seconds']:.0f}s)"
+            + (f", last error: {a['last_error']}" if a["last_error"] else "")
+        )
+    if _push:
+        p = _push
+        lines.append(
+            f"push: {p['received']:.0f} messages, {p['saved']:.0f} new posts in {p['batches']:.0f} batches; "
+            f"latency last {p['last_latency']:.1f}s / avg {p['avg_latency']:.1f}s"
+        )
+    if _sync:
+        s = _sync
+        lines.append(
+            f"sync: {s['checked']:.0f} channel posts re-checked in {s['passes']:.0f} passes, "
+            f"{s['edited']:.0f} edited, {s['deleted']:.0f} deleted, {s['filled']:.0f} filled; "
+            f"last {time.time() - s['last_pass_at']:.0f}s ago"
+        )
+    if _categories:
+        moved = {k: v for k, v in _categories.items() if k != "classified"}
+        lines.append(
+            f"categories: {_categories['classified']} channel posts classified, "
+            f"{sum(moved.values())} moved off their channel's category"
+            + "".join(f", {n} -> {label}" for label, n in sorted(moved.items()))
+        )
+    if _spam:
+        seen = sum(c[0] for c in _spam.values())
+        rejected = sum(c[1] for c in _spam.values())
+        worst = sorted(_spam.items(), key=lambda kv: (kv[1][1] / max(1, kv[1][0]), kv[1][1]), reverse=True)[:3]
+        lines.append(
+            f"spam filter: {rejected}/{seen} channel messages rejected ({rejected / max(1, seen):.0%}); "
+            + ", ".join(f"{name} {r / max(1, s):.0%} ({r}/{s})" for name, (s, r) in worst if r)
+        )
+    if writer_enabled():
+        lines.append(f"db writer: {writer.jobs} jobs in {writer.batches} batches")
+    return "\n".join(lines)
@@ -0,0 +1,96 @@
+# crawlers/pacing.py
+from __future__ import annotations
+
+import os
+import random
+from datetime import datetime, timedelta, timezone
+
+from core.models import BreakerState, Source
+from .backpressure import interval_factor
+from .breaker import transition
+
+# =========================================================
+# Per-source adaptive crawl intervals
+# =========================================================
+#
+# After every crawl the source's interval moves with its yield (new / scraped):
+# a page that is mostly new means we're polling too slowly, a page with
+# nothing new means we can back off. Intervals stay within
+# [CRAWL_INTERVAL_MIN, CRAWL_INTERVAL_MAX]; a source starts at the global
+# CRAWL_INTERVAL_SECONDS.
+#
+# Tunables:
+#   CRAWL_INTERVAL_MIN  seconds (default 30)
+#   CRAWL_INTERVAL_MAX  seconds (default 3600)
+#   CRAWL_JITTER        +/- fraction applied to each next due time (default 0.1)
+#   YIELD_EWMA_ALPHA    weight of the latest crawl in Source.yield_ewma (default 0.3)
+
+CRAWL_INTERVAL_MIN = int(os.getenv("CRAWL_INTERVAL_MIN", "30"))
+CRAWL_INTERVAL_MAX = int(os.getenv("CRAWL_INTERVAL_MAX", "3600"))
+CRAWL_JITTER = float(os.getenv("CRAWL_JITTER", "0.1"))
+YIELD_EWMA_ALPHA = float(os.getenv("YIELD_EWMA_ALPHA", "0.3"))
+
+def jittered(seconds: float) -> float:
+    """Spread sources that share an interval so they don't fire together."""
+    return seconds * (1 + random.uniform(-CRAWL_JITTER, CRAWL_JITTER))
+
+def clamp_interval(seconds: float) -> int:
+    return int(min(CRAWL_INTERVAL_MAX, max(CRAWL_INTERVAL_MIN, seconds)))
+
+def next_interval(current: int, scraped: int, new: int, ok: bool = True) -> int:
+    """New interval (seconds) from the last crawl's outcome."""
+    if not ok or scraped <= 0 or new <= 0:
+        factor = 1.5          # quiet or failing: back off
+    else:
+        ratio = new / scraped
+        if ratio >= 0.5:
+            factor = 0.5      # most of the page was new: we're missing items
+        elif ratio >= 0.2:
+            factor = 0.75
+        elif ratio >= 0.05:
+            factor = 1.0
+        else:
+            factor = 1.25
+    return clamp_interval(current * factor)
+
+def current_interval(src: Source, default: int) -> int:
+    return src.crawl_interval or clamp_interval(default)
+
+def record_crawl(source_id: int, interval: int, scraped: int, new: int, ok: bool = True,
+                 error: str = "", empty_is_failure: bool = False) -> datetime:
+    """
+    Persist the adapted interval, the (jittered) next due time, the failure
+    streak, the yield EWMA (crawl ordering, crawlers/due_queue.py) and the
+    circuit-breaker state (crawlers/breaker.py). Returns the
+    next due time: the end of the quarantine when the breaker is open, and
+    stretched for low-value sources under backpressure (crawlers/backpressure.py).
+    `interval` is only the starting point for a source without one yet.
+    """
+    failed = not ok or (empty_is_failure and scraped <= 0)
+    if failed and not error:
+        error = "empty result" if ok else "error"
+    src = Source.objects.only("crawl_interval", "failure_streak", "breaker_state", "yield_ewma").get(pk=source_id)
+    # the stored interval, not the caller's: schedulers keep Source objects
+    # between resyncs, and adapting a stale copy would undo every other step
+    interval = src.crawl_interval or interval
+    streak = src.failure_streak + 1 if failed else 0
+    now = datetime.now(timezone.utc)
+    state, quarantined_until = transition(src.breaker_state, streak, failed, now)
+
+    nxt = next_interval(interval, scraped, new, not failed)
+    next_due = quarantined_until or now + timedelta(seconds=jittered(nxt * interval_factor(source_id)))
+    fields = dict(
+        crawl_interval=nxt,
+        next_due=next_due,
+        failure_streak=streak,
+        yield_ewma=YIELD_EWMA_ALPHA * max(new, 0) + (1 - YIELD_EWMA_ALPHA) * src.yield_ewma,
+        breaker_state=state,
+        quarantined_until=quarantined_until,
+    )
+    if failed:
+        fields["last_error"] = error[:300]
+    Source.objects.filter(pk=source_id).update(**fields)
+    if state == BreakerState.OPEN and src.breaker_state != BreakerState.OPEN:
+        print(f"[breaker] source #{source_id} quarantined until {quarantined_until:%Y-%m-%d %H:%M} "
+              f"after {streak} failures ({error[:80]})")
+    return next_due
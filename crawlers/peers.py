@@ -0,0 +1,146 @@
+# crawlers/peers.py
+from __future__ import annotations
+
+from typing import Dict, Optional, Tuple
+
+from core.dbexec import db_read
+from core.models import ResolvedPeer
+from core.writer import write
+from . import metrics
+
+# =========================================================
+# Persistent username -> peer cache
+# =========================================================
+#
+# Fetching history by username makes the client resolve it first
+# (contacts.ResolveUsername), one of Telegram's most flood-limited methods.
+# Pyrogram keeps usernames for 8 hours in its session storage (and not at
+# all across restarts with an in-memory string session), Telethon for as long
+# as its session file lives. Resolutions are kept in ResolvedPeer instead,
+# per account, and crawls address channels by peer id + access hash:
+#   - a username is resolved once, then served from memory / the DB;
+#   - an error that says the peer is gone or unusable (see INVALIDATING)
+#     drops the entry, so the next crawl resolves the username again.
+# Resolve calls and cache hits are counted in /stats (crawlers/metrics.py).
+
+# Error class names (Pyrogram and Telethon) that mean a cached peer is stale
+INVALIDATING = {
+    "ChannelInvalid", "ChannelPrivate", "PeerIdInvalid", "UsernameInvalid", "UsernameNotOccupied",
+    "ChannelInvalidError", "ChannelPrivateError", "PeerIdInvalidError", "UsernameInvalidError",
+    "UsernameNotOccupiedError",
+}
+
+PeerKey = Tuple[str, str]  # (account, username)
+
+# (peer_id, access_hash, peer_type) per key, so a crawl doesn't hit the DB either
+_memo: Dict[PeerKey, Tuple[int, int, str]] = {}
+
+def normalize_username(username: str) -> str:
+    return username.strip().lstrip("@").lower()
+
+@db_read
+def _load(account: str, username: str) -> Optional[Tuple[int, int, str]]:
+    row = (ResolvedPeer.objects.filter(account=account, username=username)
+           .values_list("peer_id", "access_hash", "peer_type").first())
+    return tuple(row) if row else None
+
+def _store(account: str, username: str, peer_id: int, access_hash: int, peer_type: str) -> None:
+    ResolvedPeer.objects.update_or_create(
+        account=account, username=username,
+        defaults=dict(peer_id=peer_id, access_hash=access_hash, peer_type=peer_type),
+    )
+
+def _delete(account: str, username: str) -> None:
+    ResolvedPeer.objects.filter(account=account, username=username).delete()
+
+async def cached_peer(account: str, username: str) -> Optional[Tuple[int, int, str]]:
+    key = (account, normalize_username(username))
+    peer = _memo.get(key)
+    if peer is None:
+        peer = await _load(*key)
+        if peer is not None:
+            _memo[key] = peer
+    return peer
+
+async def remember(account: str, username: str, peer_id: int, access_hash: int, peer_type: str = "channel"):
+    key = (account, normalize_username(username))
+    _memo[key] = (peer_id, access_hash, peer_type)
+    await write(_store, *key, peer_id, access_hash, peer_type)
+
+async def forget(account: str, username: str):
+    key = (account, normalize_username(username))
+    _memo.pop(key, None)
+    await write(_delete, *key)
+
+def invalidates(exc: BaseException) -> bool:
+    return type(exc).__name__ in INVALIDATING
+
+# ----------------- Pyrogram -----------------
+
+def pyrogram_account(app) -> str:
+    me = getattr(app, "me", None)  # set by Client.start()
+    return str(me.id) if me else "default"
+
+async def pyrogram_chat_id(app, username: str) -> int:
+    """
+    Chat id to pass to Pyrogram methods instead of the username. A cached
+    peer is put back into the client's session storage, where lookups by id
+    don't expire, so Pyrogram never resolves the username itself.
+    """
+    from pyrogram import utils
+
+    account = pyrogram_account(app)
+    name = normalize_username(username)
+    peer = await cached_peer(account, name)
+    if peer is not None:
+        metrics.record_resolve(hit=True)
+        peer_id, access_hash, peer_type = peer
+        await app.storage.update_peers([(peer_id, access_hash, peer_type, name, None)])
+        return peer_id
+
+    metrics.record_resolve(hit=False)
+    input_peer = await app.resolve_peer(name)
+    channel_id = getattr(input_peer, "channel_id", None)
+    if channel_id is not None:
+        peer_id, peer_type = utils.get_channel_id(channel_id), "channel"
+    elif getattr(input_peer, "user_id", None) is not None:
+        peer_id, peer_type = input_peer.user_id, "user"
+    else:
+        return utils.get_peer_id(input_peer)  # basic group: no access hash to keep
+    await remember(account, name, peer_id, input_peer.access_hash, peer_type)
+    return peer_id
+
+# ----------------- Telethon -----------------
+
+_telethon_accounts: Dict[int, str] = {}
+
+async def telethon_account(client) -> str:
+    account = _telethon_accounts.get(id(client))
+    if account is None:
+        me = await client.get_me()
+        account = _telethon_accounts[id(client)] = str(me.id) if me else "default"
+    return account
+
+async def telethon_input_peer(client, username: str):
+    """InputPeer to pass to Telethon methods instead of the username."""
+    from telethon import utils
+    from telethon.tl.types import InputPeerChannel, InputPeerUser
+
+    account = await telethon_account(client)
+    name = normalize_username(username)
+    peer = await cached_peer(account, name)
+    if peer is not None:
+        metrics.record_resolve(hit=True)
+        peer_id, access_hash, peer_type = peer
+        real_id, _ = utils.resolve_id(peer_id)
+        if peer_type == "user":
+            return InputPeerUser(real_id, access_hash)
+        return InputPeerChannel(real_id, access_hash)
+
+    metrics.record_resolve(hit=False)
+    input_peer = await client.get_input_entity(name)
+    if isinstance(input_peer, InputPeerChannel):
+        await remember(account, name, utils.get_peer_id(input_peer), input_peer.access_hash, "channel")
+    elif isinstance(input_peer, InputPeerUser):
+        await remember(account, name, input_peer.user_id, input_peer.access_hash, "user")
+    return input_peer
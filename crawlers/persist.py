@@ -1,10 +1,14 @@
 # crawlers/persist.py
 from __future__ import annotations
 
-from typing import Iterable, Dict, Any
+from typing import Iterable, Dict, Any, Optional, Tuple
 from django.db import transaction
 from django.utils.text import Truncator
 from core.models import Post, Source
+from .dedupe import index_posts
+from .pg_ingest import copy_ingest, copy_ingest_enabled
+from core.payload import refresh_payloads
+from core.retention import drop_pruned
 
 # Map incoming scraper keys -> Post model field names
 # (only applied if those fields actually exist on your Post model)
@@ -20,8 +24,8 @@ KEY_MAP = {
     "currency": "currency",
     "period": "period",
     "tags": "tags",          # ArrayField or CharField (we'll coerce below)
-    "extras": "extras",      # JSONField (optional)
 }
+# extras/raw_text are not Post columns: they go to the compressed PostPayload side table
 
 def _model_fields(model) -> set[str]:
     return {f.name for f in model._meta.get_fields()}
@@ -41,54 +45,86 @@ def _coerce(value: Any, field: str) -> Any:
         return []
     return value
 
-@transaction.atomic
-def persist_items(source: Source, items: Iterable[Dict[str, Any]]) -> int:
+IngestRow = Tuple[str, Dict[str, Any], Dict[str, Any], str]
+
+def _defaults_for(source: Source, it: Dict[str, Any]) -> Optional[IngestRow]:
     """
-    Save a batch of scraped items for a given Source.
-    - De-dupe by (source, link) primarily; if link missing, skip.
-    - Update existing row if found; otherwise create new.
-    - Leaves posted_to_channel as default (False) so bot can pick it up.
-    Returns how many **new** rows were created.
+    Return (link, model defaults, extras, raw_text) for one scraped item,
+    or None if unusable.
     """
-    created_count = 0
+    link = (it.get("link") or "").strip()
+    title = (it.get("title") or "").strip()
+    if not link or not title:
+        return None  # must have both
 
-    for it in items:
-        link = (it.get("link") or "").strip()
-        title = (it.get("title") or "").strip()
-        if not link or not title:
-            continue  # must have both
+    # Truncate long fields safely
+    title = Truncator(title).chars(255)
+    description = (it.get("description") or "")
+    if isinstance(description, str):
+        # keep DB friendly (adjust if your model allows more)
+        description = description[:8000]
 
-        # Truncate long fields safely
-        title = Truncator(title).chars(255)
-        description = (it.get("description") or "")
-        if isinstance(description, str):
-            # keep DB friendly (adjust if your model allows more)
-            description = description[:8000]
+    # Build defaults only with fields that exist on Post
+    defaults: Dict[str, Any] = {"title": title, "description": description}
+    # if category missing from item, fallback to source.category
+    defaults["category"] = it.get("category") or getattr(source, "category", None)
 
-        # Build defaults only with fields that exist on Post
-        defaults: Dict[str, Any] = {"title": title, "description": description}
-        # if category missing from item, fallback to source.category
-        defaults["category"] = it.get("category") or getattr(source, "category", None)
+    for in_key, model_key in KEY_MAP.items():
+        if model_key in ("title", "description", "category", "link"):
+            # already handled or key field
+            continue
+        if model_key not in POST_FIELDS:
+            continue
+        if in_key in it:
+            defaults[model_key] = _coerce(it[in_key], model_key)
+    return link, defaults, it.get("extras") or {}, it.get("raw_text") or ""
 
-        for in_key, model_key in KEY_MAP.items():
-            if model_key in ("title", "description", "category", "link"):
-                # already handled or key field
-                continue
-            if model_key not in POST_FIELDS:
-                continue
-            if in_key in it:
-                defaults[model_key] = _coerce(it[in_key], model_key)
+@transaction.atomic
+def persist_items(source: Source, items: Iterable[Dict[str, Any]], stats: Optional[Dict[str, int]] = None) -> int:
+    """
+    Save a batch of scraped items for a given Source.
+    - De-dupe by (source, link) primarily; if link missing, skip.
+    - Update an existing row only when a field changed; otherwise create new.
+      Payloads (extras/raw_text) are refreshed whenever they changed, even
+      if the Post columns didn't.
+    - Leaves posted_to_channel as default (False) so bot can pick it up.
+    - New rows are clustered against the near-duplicate index (crawlers/dedupe.py).
+    - Links whose post retention already deleted are skipped (core/retention.py).
+    - On PostgreSQL the batch goes through COPY + INSERT ... ON CONFLICT
+      (crawlers/pg_ingest.py) instead of one round-trip per item.
+    Returns how many **new** rows were created; `stats`, if given, also
+    gets the updated/unchanged counts (crawl-run history).
+    """
+    rows = drop_pruned(source, [r for r in (_defaults_for(source, it) for it in items) if r])
+    if copy_ingest_enabled():
+        return copy_ingest(source, rows, update=True, stats=stats)
 
-        # Always associate the source
-        defaults["source"] = source
+    created_count = updated = unchanged = 0
+    created_posts = []
+    payloads = []
+    # One query for the rows we already have instead of one per item
+    existing = {p.link: p for p in Post.objects.filter(source=source, link__in=[r[0] for r in rows])}
 
-        # Upsert by (source, link)
-        obj, created = Post.objects.update_or_create(
-            source=source,
-            link=link,
-            defaults=defaults,
-        )
-        if created:
+    for link, defaults, extras, raw_text in rows:
+        obj = existing.get(link)
+        if obj is None:
+            obj = Post.objects.create(source=source, link=link, **defaults)
+            existing[link] = obj
             created_count += 1
+            created_posts.append(obj)
+        else:
+            changed = [k for k, v in defaults.items() if getattr(obj, k) != v]
+            if changed:
+                for k in changed:
+                    setattr(obj, k, defaults[k])
+                obj.save(update_fields=changed)
+                updated += 1
+            else:
+                unchanged += 1
+        payloads.append((obj.pk, extras, raw_text, obj.description))
 
+    refresh_payloads(payloads)
+    index_posts(created_posts)
+    if stats is not None:
+        stats.update(new=created_count, updated=updated, unchanged=unchanged)
     return created_count
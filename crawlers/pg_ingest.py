@@ -0,0 +1,160 @@
+# crawlers/pg_ingest.py
+from __future__ import annotations
+
+import io
+import os
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db import connection, transaction
+from core.models import Post, Source
+from core.payload import refresh_payloads
+from .dedupe import index_posts
+
+# =========================================================
+# PostgreSQL bulk ingestion: COPY into a temp table, then merge
+# =========================================================
+#
+# One scraped batch = one COPY + one INSERT ... SELECT ... ON CONFLICT, instead
+# of a SELECT + INSERT/UPDATE round-trip per item. The staging table is a
+# per-connection TEMP table cleared on commit, so concurrent workers don't see
+# each other's rows. Works with psycopg 3 (cursor.copy) and psycopg2
+# (copy_expert).
+#
+# Tunables:
+#   PG_COPY_INGEST  1/0 (default 1; only used when the DB is PostgreSQL)
+
+STAGE_TABLE = "post_ingest_stage"
+
+# (model field, staging column type, default when the item lacks it)
+STAGE_FIELDS: List[Tuple[str, str, Any]] = [
+    ("link", "text", ""),
+    ("title", "text", ""),
+    ("description", "text", ""),
+    ("category", "text", ""),
+    ("company", "text", ""),
+    ("location", "text", ""),
+    ("salary_min", "numeric", None),
+    ("salary_max", "numeric", None),
+    ("currency", "text", ""),
+    ("period", "text", ""),
+    ("tags", "jsonb", []),
+    ("tg_message_id", "bigint", None),
+    ("tg_edit_date", "timestamptz", None),
+    ("skip_reason", "text", ""),
+]
+# set on insert only: an edit never un-skips a post
+INSERT_ONLY = {"link", "skip_reason"}
+JSON_FIELDS = {"tags"}
+
+def copy_ingest_enabled() -> bool:
+    return connection.vendor == "postgresql" and os.getenv("PG_COPY_INGEST", "1") == "1"
+
+def _col(field: str) -> str:
+    return connection.ops.quote_name(Post._meta.get_field(field).column)
+
+def _ensure_stage(cur):
+    cols = ", ".join(f"{f} {t}" for f, t, _ in STAGE_FIELDS)
+    cur.execute(f"CREATE TEMP TABLE IF NOT EXISTS {STAGE_TABLE} ({cols}) ON COMMIT DELETE ROWS")
+    cur.execute(f"TRUNCATE {STAGE_TABLE}")
+
+def _stage_row(link: str, defaults: Dict[str, Any]) -> List[Any]:
+    row: List[Any] = []
+    for field, _, default in STAGE_FIELDS:
+        value = link if field == "link" else defaults.get(field, default)
+        if field in JSON_FIELDS:
+            value = json.dumps(value if value is not None else default, ensure_ascii=False)
+        elif value is not None and not isinstance(value, str):
+            value = str(value)
+        row.append(value)
+    return row
+
+def _copy(cur, rows: Sequence[List[Any]]):
+    cols = ", ".join(f for f, _, _ in STAGE_FIELDS)
+    raw = getattr(cur, "cursor", cur)
+    if hasattr(raw, "copy"):  # psycopg 3
+        with raw.copy(f"COPY {STAGE_TABLE} ({cols}) FROM STDIN") as cp:
+            for r in rows:
+                cp.write_row(r)
+        return
+    # psycopg2: CSV where every value is quoted and NULL is the bare empty
+    # field, so '' and NULL stay distinct whatever the text contains
+    buf = io.StringIO()
+    for r in rows:
+        buf.write(",".join("" if v is None else '"' + v.replace('"', '""') + '"' for v in r))
+        buf.write("\n")
+    buf.seek(0)
+    raw.copy_expert(f"COPY {STAGE_TABLE} ({cols}) FROM STDIN WITH (FORMAT csv)", buf)
+
+def _merge_sql(update: bool) -> str:
+    table = connection.ops.quote_name(Post._meta.db_table)
+    fields = [f for f, _, _ in STAGE_FIELDS]
+    target = [_col("source")] + [_col(f) for f in fields] + [
+        _col("created_at"), _col("posted_to_channel"), _col("is_duplicate"),
+    ]
+    select = ["%s"] + fields + ["now()", "false", "false"]
+    conflict = f"({_col('source')}, {_col('link')})"
+    sql = (
+        f"INSERT INTO {table} ({', '.join(target)}) "
+        f"SELECT {', '.join(select)} FROM {STAGE_TABLE} "
+    )
+    if not update:
+        return sql + f"ON CONFLICT {conflict} DO NOTHING RETURNING {_col('id')}, {_col('link')}, true"
+
+    updatable = [f for f in fields if f not in INSERT_ONLY]
+    sets = ", ".join(f"{_col(f)} = EXCLUDED.{_col(f)}" for f in updatable)
+    # Skip no-op updates so unchanged rows don't produce dead tuples
+    changed = (
+        f"({', '.join(f'{table}.{_col(f)}' for f in updatable)}) IS DISTINCT FROM "
+        f"({', '.join(f'EXCLUDED.{_col(f)}' for f in updatable)})"
+    )
+    # xmax = 0 only for freshly inserted tuples
+    return sql + (
+        f"ON CONFLICT {conflict} DO UPDATE SET {sets} WHERE {changed} "
+        f"RETURNING {_col('id')}, {_col('link')}, (xmax = 0)"
+    )
+
+def copy_ingest(source: Source, rows: Sequence[Tuple[str, Dict[str, Any], Dict[str, Any], str]], update: bool = True,
+                stats: Optional[Dict[str, int]] = None) -> int:
+    """
+    Bulk upsert (link, defaults, extras, raw_text) rows for one source. With
+    update=False existing rows are left alone (get_or_create semantics).
+    Payloads are written for every inserted row and, with update=True, for
+    every existing row whose payload changed, even if its Post columns
+    didn't (as crawlers/persist.py does on SQLite). Returns how many
+    rows were newly inserted; `stats`, if given, gets new/updated/unchanged.
+    """
+    if not rows:
+        if stats is not None:
+            stats.update(new=0, updated=0, unchanged=0)
+        return 0
+    by_link = {link: (d, extras, raw_text) for link, d, extras, raw_text in rows}
+    # The staging table is cleared ON COMMIT, so COPY and merge share one transaction
+    with transaction.atomic(), connection.cursor() as cur:
+        _ensure_stage(cur)
+        _copy(cur, [_stage_row(link, d) for link, (d, _, _) in by_link.items()])
+        cur.execute(_merge_sql(update), [source.pk])
+        touched = cur.fetchall()
+
+        ids = {link: pk for pk, link, _ in touched}
+        if update and len(ids) < len(by_link):
+            # rows the merge skipped as unchanged may still carry new extras/raw_text
+            untouched = [link for link in by_link if link not in ids]
+            ids.update(
+                (link, pk) for pk, link in
+                Post.objects.filter(source=source, link__in=untouched).values_list("pk", "link")
+            )
+        refresh_payloads(
+            (pk, by_link[link][1], by_link[link][2], by_link[link][0].get("description", ""))
+            for link, pk in ids.items()
+        )
+        new_ids = [pk for pk, _, inserted in touched if inserted]
+        if new_ids:
+            index_posts(
+                Post.objects.filter(pk__in=new_ids, skip_reason="")
+                .only("id", "title", "company", "description")
+                .order_by("id")
+            )
+    if stats is not None:
+        stats.update(new=len(new_ids), updated=len(touched) - len(new_ids), unchanged=len(by_link) - len(touched))
+    return len(new_ids)
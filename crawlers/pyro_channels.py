@@ -1,51 +1,105 @@
 # crawlers/pyro_channels.py
 import os
+import time
 import asyncio
 from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional
 from urllib.parse import urlparse
 
-from pyrogram import Client
-from pyrogram.types import Message
-
-from core.models import Source, SourceType
-from asgiref.sync import sync_to_async
-from .base import normalize_items
+from django.db.models import Q
+from core.models import SkipReason, Source, SourceType
+from . import metrics, peers
+from .base import ChannelItem, is_filled_text, normalize_channel_items
+from . import spam
+from .spam import is_spam
+from .pacing import current_interval, record_crawl
+from .client_pool import ClientPool
+from .ratelimit import TokenBucket
+from .tg_backend import ChannelMessage, FloodWait, TelegramBackend, make_backends
+from .due_queue import run_due_loop
+from .crawl_runs import flush_runs, record_run
+from core.dbexec import db_read
+from core.writer import write
 
 REMOTE_LINK_FMT = "https://t.me/{username}/{msg_id}"
 
+# =========================================================
+# Concurrency and flood waits
+# =========================================================
+#
+# Channels are read through a pool of user accounts (crawlers/client_pool.py),
+# each a TelegramBackend (Pyrogram, Telethon or fake, crawlers/tg_backend.py);
+# up to CHANNEL_CONCURRENCY channels per account are crawled at once, in
+# slots of their own taken once the account is picked. Every API page
+# (get_chat_history fetches 100 messages per request) first takes a token
+# from its account's bucket, so each account stays under CHANNEL_RPS
+# requests/s however many channels run.
+#
+# Backends never sleep through a FloodWait themselves (Pyrogram's
+# sleep_threshold / Telethon's flood_sleep_threshold are 0): it reaches us as
+# tg_backend.FloodWait and only that account is marked limited. The channel moves on to the next healthy account right away; if
+# every account is limited, only that channel is parked:
+#   - a short wait (<= CHANNEL_FLOOD_INLINE_MAX, and inside the cycle
+#     budget) is slept off without holding an account slot, then the
+#     channel is retried (up to CHANNEL_FLOOD_RETRIES times);
+#   - a longer one reschedules the channel for when the wait is over. A
+#     flood wait is not the channel's fault: it doesn't touch the failure
+#     streak or the adaptive interval.
+# Counts and seconds spent waiting show up in /stats (crawlers/metrics.py).
+#
+# Tunables:
+#   CHANNEL_CONCURRENCY       channels crawled at once, per account (default 4)
+#   CHANNEL_RPS               API requests per second, per account (default 1)
+#   CHANNEL_BURST             requests allowed back to back, per account (default 5)
+#   CHANNEL_FLOOD_INLINE_MAX  longest flood wait slept off in the cycle, seconds (default 30)
+#   CHANNEL_FLOOD_RETRIES     retries after a flood wait (default 3)
+
+CHANNEL_CONCURRENCY = int(os.getenv("CHANNEL_CONCURRENCY", "4"))
+CHANNEL_RPS = float(os.getenv("CHANNEL_RPS", "1"))
+CHANNEL_BURST = int(os.getenv("CHANNEL_BURST", "5"))
+CHANNEL_FLOOD_INLINE_MAX = float(os.getenv("CHANNEL_FLOOD_INLINE_MAX", "30"))
+CHANNEL_FLOOD_RETRIES = int(os.getenv("CHANNEL_FLOOD_RETRIES", "3"))
+
 # ----------------- DB helpers -----------------
 
-@sync_to_async
+@db_read
 def _get_active_channel_sources() -> List[Source]:
     return list(
         Source.objects.filter(is_active=True, type=SourceType.TELEGRAM_CHANNEL)
-        .only("id", "name", "url", "category")
+        .only("id", "name", "url", "category", "crawl_interval", "next_due", "failure_streak",
+              "breaker_state", "yield_ewma", "last_message_id")
     )
 
-# ----------------- Pyrogram client -----------------
+def _advance_high_water(source_id: int, message_id: int) -> None:
+    """Move Source.last_message_id forward (never back, if two crawls overlap)."""
+    Source.objects.filter(pk=source_id).filter(
+        Q(last_message_id__isnull=True) | Q(last_message_id__lt=message_id)
+    ).update(last_message_id=message_id)
+
+def _defer(source_id: int, until: datetime) -> None:
+    """Push next_due out (flood wait, push-mode gap filling) so a resync doesn't pull it forward."""
+    Source.objects.filter(pk=source_id).update(next_due=until)
+
+# ----------------- Telegram accounts -----------------
 
-async def build_pyro_client(
-    api_id: int,
-    api_hash: str,
-    session_string: Optional[str] = None,
-    proxy: Optional[dict] = None,
-) -> Client:
+async def build_channel_pool(api_id: int = 0, api_hash: str = "", proxy: Optional[dict] = None,
+                             backends: Optional[List[TelegramBackend]] = None) -> Optional[ClientPool]:
     """
-    Start a Pyrogram user client (v2 API).
-    - If session_string is provided, it's used (best for headless servers).
-    - Otherwise it will create/use a local session file named 'pyrogram'.
+    Start one backend per configured account (TG_BACKEND and its sessions,
+    see crawlers/tg_backend.py). Accounts that fail to start are skipped;
+    returns None if none did.
     """
-    app = Client(
-        name="pyrogram",
-        api_id=api_id,
-        api_hash=api_hash,
-        session_string=session_string,  # <-- v2 way
-        proxy=proxy,
-        workdir=".",  # keep session locally if file-based
-    )
-    await app.start()
-    return app
+    started = []
+    for i, backend in enumerate(backends or make_backends(api_id, api_hash, proxy)):
+        try:
+            await backend.start()
+            started.append(backend)
+        except Exception as e:
+            print(f"[PYRO] {backend.kind} account #{i} failed to start: {e}")
+    if not started:
+        return None
+    print(f"[PYRO] client pool: {len(started)} {started[0].kind} account(s)")
+    return ClientPool(started, CHANNEL_RPS, CHANNEL_BURST, CHANNEL_CONCURRENCY)
 
 # ----------------- Utilities -----------------
 
@@ -61,101 +115,239 @@ def _username_from_url(url: str) -> Optional[str]:
         return parts[0] if parts else None
     return u
 
-def _msg_to_item(msg: Message, source_category: str, username: Optional[str]) -> Optional[Dict]:
+def _msg_to_item(msg: ChannelMessage, source_category: str, username: Optional[str]) -> Optional[ChannelItem]:
     """
-    Convert a Telegram message into our normalized item dict.
-    We ingest all text/caption messages (no keyword filter).
+    Convert a Telegram message into a ChannelItem (crawlers/base.py).
+    We ingest all text/caption messages (no keyword filter; the callers run
+    the spam filter, crawlers/spam.py); service and
+    media-only posts come with empty text and are skipped, as are posts
+    edited to say the position is filled.
     """
-    # Skip service/system messages
-    if getattr(msg, "service", False):
-        return None
-
-    text = (getattr(msg, "text", None) or getattr(msg, "caption", None) or "").strip()
+    text = msg.text.strip()
     if not text:
         return None
+    if msg.edit_date and is_filled_text(text):
+        return None  # edited to say it's filled/closed (crawlers/tg_sync.py)
 
-    # Title = first non-empty line, clipped
-    first_line = next((ln.strip() for ln in text.splitlines() if ln.strip()), "")
-    title = first_line[:160] if first_line else "Opportunity"
-
-    link = f"https://t.me/{username}/{msg.id}" if username else ""
-
-    return {
-        "title": title,
-        "description": text,
-        "link": link or (f"tg://resolve?domain={username}&post={msg.id}" if username else ""),
-        "category": source_category,
-        "company": "",
-        "location": "Remote",
-        "tags": [],
-        "extras": {
-            "chat_id": msg.chat.id if msg.chat else None,
-            "message_id": msg.id,
-            "date": msg.date.isoformat() if msg.date else None,
-            "views": getattr(msg, "views", None),
-        },
-        "raw_text": text,
-    }
+    # Title = first line (the text is stripped, so it isn't blank), clipped
+    title = text.partition("\n")[0].strip()[:160] or "Opportunity"
+    link = REMOTE_LINK_FMT.format(username=username, msg_id=msg.id) if username else ""
+    return ChannelItem(link, title, text, source_category, msg.id, msg.chat_id, msg.date, msg.edit_date, msg.views)
 
 # ----------------- Crawl & loop -----------------
 
-async def crawl_one_channel(app: Client, source: Source, since_days: int = 7, max_msgs: int = 300) -> int:
+async def crawl_one_channel(backend: TelegramBackend, source: Source, since_days: int = 7, max_msgs: int = 300,
+                            stats: Optional[Dict[str, float]] = None,
+                            bucket: Optional[TokenBucket] = None) -> tuple[int, int]:
     """
-    Fetch messages from the past `since_days` days (default 7) and save them.
-    No keyword filtering — we take any message that has text/caption.
+    Fetch messages newer than the channel's high-water mark
+    (Source.last_message_id) and save them. On the first sync (no mark yet)
+    this reads back `since_days` days (default 7); the lookback and
+    `max_msgs` also bound the read after a long gap. The mark only moves
+    forward once the batch is saved, so a failed save is retried next time.
+    No keyword filtering — we take any message that has text/caption,
+    unless the spam filter (crawlers/spam.py) rejects it (with SPAM_KEEP=1
+    rejects are stored as skipped, SkipReason.SPAM).
+    Returns (messages fetched, new posts saved); `stats`, if given, gets
+    fetch/parse/persist seconds and API page count (crawl-run history).
+    With a `bucket`, every API page waits for a token first. FloodWait is
+    raised to the caller. The backend resolves the channel through the
+    peer cache (crawlers/peers.py), not on every call.
     """
+    stats = stats if stats is not None else {}
+    stats.update(fetch=0.0, parse=0.0, persist=0.0, attempts=0)
     username = _username_from_url(source.url)
     if not username:
-        return 0
+        return 0, 0
 
     cutoff = datetime.now(timezone.utc) - timedelta(days=since_days)
 
-    new_items: List[Dict] = []
+    high_water = source.last_message_id
+    newest_id: Optional[int] = None
+    scanned = 0
+    reached_mark = high_water is None
+    scored = rejected = 0
 
-    async for msg in app.get_chat_history(username, limit=max_msgs):
-        # Stop at older content
-        msg_dt = msg.date
-        if msg_dt and msg_dt.tzinfo is None:
-            msg_dt = msg_dt.replace(tzinfo=timezone.utc)
-        if msg_dt and msg_dt < cutoff:
-            break
+    new_items: List[ChannelItem] = []
+    spam_items: List[ChannelItem] = []
+    t_fetch = time.monotonic()
+    throttled = 0.0
 
-        item = _msg_to_item(msg, source.category, username)
-        if item:
-            new_items.append(item)
+    try:
+        chat = await backend.resolve(username)
+        # History comes newest first: stop at the mark, or at older content
+        if bucket:
+            throttled += await bucket.acquire()
+        async for msg in backend.history(chat, limit=max_msgs):
+            scanned += 1
+            if bucket and scanned % 100 == 0:
+                throttled += await bucket.acquire()  # the next message comes from a new page
+            if high_water is not None and msg.id <= high_water:
+                reached_mark = True
+                break
+            if newest_id is None:
+                newest_id = msg.id
+            if msg.date and msg.date < cutoff:
+                break
 
-    if not new_items:
-        return 0
+            t_parse = time.monotonic()
+            item = _msg_to_item(msg, source.category, username)
+            if item:
+                scored += 1
+                if is_spam(item.text, source.name):
+                    rejected += 1
+                    if spam.SPAM_KEEP:
+                        item.skip_reason = SkipReason.SPAM
+                        spam_items.append(item)
+                else:
+                    new_items.append(item)
+            stats["parse"] += time.monotonic() - t_parse
+    except Exception as e:
+        if peers.invalidates(e):
+            await backend.forget(username)
+        raise
 
-    norm = normalize_items(new_items)
+    # get_chat_history pages through the API 100 messages per request
+    stats["attempts"] = 1 + scanned // 100
+    stats["fetch"] = time.monotonic() - t_fetch - stats["parse"]
+    if throttled:
+        metrics.record_throttle(throttled)
+    if scored:
+        metrics.record_spam(source.name, scored, rejected)
+    if not reached_mark:
+        print(f"[PYRO] {source.name}: high-water mark {high_water} not reached "
+              f"(gap longer than {max_msgs} messages / {since_days}d)")
+    if not new_items and not spam_items:
+        if newest_id is not None:
+            await write(_advance_high_water, source.pk, newest_id)
+            source.last_message_id = newest_id  # the scheduler reuses this object
+        return 0, 0
 
-    # Save via scheduler's async saver (de-dupes by (source, link))
+    t_parse = time.monotonic()
+    norm = normalize_channel_items(new_items)
+    spam_norm = normalize_channel_items(spam_items)
+    stats["parse"] += time.monotonic() - t_parse
+
+    # Save via scheduler's async saver (de-dupes by (source, link)); kept
+    # rejects (SPAM_KEEP) don't count as the channel's yield
     from .scheduler import save_items  # local import to avoid cycles
-    saved = await save_items(source, norm)
-    return saved
+    t_persist = time.monotonic()
+    saved = await save_items(source, norm) if norm else 0
+    if spam_norm:
+        await save_items(source, spam_norm)
+    if newest_id is not None:
+        await write(_advance_high_water, source.pk, newest_id)
+        source.last_message_id = newest_id
+    stats["persist"] = time.monotonic() - t_persist
+    return len(new_items), saved
 
-async def telegram_channels_loop(interval_seconds: int, app: Client):
+async def telegram_channels_loop(interval_seconds: int, pool: ClientPool, gap_fill_interval: int = 0,
+                                 list_sources=_get_active_channel_sources):
     """
-    Background loop: poll all active channel sources every N seconds,
-    ingest past-week content + any new posts.
+    Background loop: crawl channel sources as they fall due (each has its own
+    adaptive interval, starting at N seconds; see crawlers/due_queue.py),
+    ingest past-week content on first sync, then only posts newer than the
+    channel's high-water mark.
     Tunables:
       CHANNEL_LOOKBACK_DAYS (default 7)
       CHANNEL_FETCH_LIMIT  (default 300)
+      CHANNEL_PACE_WINDOW  (default 20) messages one crawl is judged against
+                           by the adaptive pacing, since an incremental crawl
+                           only returns new messages
+    Concurrency, request rate and flood waits: see the header of this module.
+    With push mode on (crawlers/pyro_push.py) polling only fills gaps:
+    `gap_fill_interval` is the minimum time between polls of a channel.
+    `list_sources` (async) picks the channels, all active ones by default.
     """
-    while True:
-        try:
-            lookback_days = int(os.getenv("CHANNEL_LOOKBACK_DAYS", "7"))
-            fetch_limit = int(os.getenv("CHANNEL_FETCH_LIMIT", "300"))
-
-            sources = await _get_active_channel_sources()
-            for src in sources:
-                try:
-                    saved = await crawl_one_channel(app, src, since_days=lookback_days, max_msgs=fetch_limit)
-                    if saved:
-                        print(f"[PYRO] {src.name}: saved {saved} items")
-                except Exception as e:
-                    print(f"[PYRO] Error crawling {src.name}: {e}")
-        except Exception as e:
-            print(f"[PYRO] Loop error: {e}")
+    lookback_days = int(os.getenv("CHANNEL_LOOKBACK_DAYS", "7"))
+    fetch_limit = int(os.getenv("CHANNEL_FETCH_LIMIT", "300"))
+    pace_window = int(os.getenv("CHANNEL_PACE_WINDOW", "20"))
+
+    async def crawl_channel(src: Source, deadline: float) -> Optional[datetime]:
+        loop = asyncio.get_running_loop()
+        fetched, saved, error = 0, 0, ""
+        parked: Optional[datetime] = None
+        started, started_at, stats = time.monotonic(), datetime.now(timezone.utc), {}
+        key = (_username_from_url(src.url) or str(src.pk)).lower()
+        for attempt in range(CHANNEL_FLOOD_RETRIES + 1):
+            acct, flooded, finished = pool.pick(key), 0.0, False
+            while acct is not None:
+                async with acct.slots:
+                    if loop.time() >= deadline:
+                        return None  # out of cycle budget: carried over
+                    if not acct.limited():
+                        try:
+                            fetched, saved = await crawl_one_channel(acct.backend, src, since_days=lookback_days,
+                                                                     max_msgs=fetch_limit, stats=stats,
+                                                                     bucket=acct.bucket)
+                            pool.ok(acct)
+                            if saved:
+                                print(f"[PYRO] {src.name}: saved {saved} items")
+                            finished = True
+                        except FloodWait as e:
+                            flooded = float(e.value or 1)
+                            pool.flood(acct, flooded)
+                        except Exception as e:
+                            error = f"{type(e).__name__}: {e}"
+                            pool.failed(acct, error)
+                            print(f"[PYRO] Error crawling {src.name}: {e}")
+                            finished = True
+                        break
+                # limited while we queued for its slot: pick again
+                acct = pool.pick(key)
+            if finished:
+                break
+            # outside the account's slot: the other channels keep going meanwhile
+            wait = pool.next_free_in()
+            if flooded and not wait and attempt < CHANNEL_FLOOD_RETRIES:
+                metrics.record_flood_wait(flooded, "moved")
+                print(f"[PYRO] {src.name}: flood wait {flooded:.0f}s on account {acct.name}, "
+                      f"moving to {pool.pick(key).name}")
+                continue
+            if (wait <= CHANNEL_FLOOD_INLINE_MAX and attempt < CHANNEL_FLOOD_RETRIES
+                    and loop.time() + wait < deadline):
+                if flooded:
+                    metrics.record_flood_wait(flooded, "inline")
+                print(f"[PYRO] {src.name}: all accounts flood-limited, retrying in {wait:.0f}s")
+                await asyncio.sleep(wait)
+                continue
+            if flooded:
+                metrics.record_flood_wait(flooded, "parked")
+            parked = datetime.now(timezone.utc) + timedelta(seconds=wait + 1)
+            print(f"[PYRO] {src.name}: all accounts flood-limited, parked until {parked:%H:%M:%S}")
+            error = "FloodWait"
+            break
+        record_run(
+            src.pk, started_at, time.monotonic() - started,
+            fetch=stats.get("fetch", 0.0), parse=stats.get("parse", 0.0), persist=stats.get("persist", 0.0),
+            http_attempts=int(stats.get("attempts", 0)), scraped=fetched, new=saved,
+            unchanged=max(0, fetched - saved), error=error.split(":", 1)[0],
+        )
+        if parked:
+            await write(_defer, src.pk, parked)
+            return parked
+        next_due = await write(
+            record_crawl, src.pk, current_interval(src, interval_seconds), max(fetched, pace_window), saved,
+            not error, error,
+        )
+        if gap_fill_interval and not error:
+            floor = datetime.now(timezone.utc) + timedelta(seconds=gap_fill_interval)
+            if next_due < floor:
+                await write(_defer, src.pk, floor)
+                next_due = floor
+        return next_due
+
+    async def crawl_due(batch: List[Source], deadline: float) -> Dict[int, Optional[datetime]]:
+        # batch comes in priority order; each account's slots are handed out in that order
+        results = await asyncio.gather(*(crawl_channel(src, deadline) for src in batch),
+                                       return_exceptions=True)
+        next_dues: Dict[int, Optional[datetime]] = {}
+        for src, res in zip(batch, results):
+            if isinstance(res, BaseException):
+                print(f"[PYRO] Error crawling {src.name}: {res}")
+                continue  # run_due_loop falls back to the current interval
+            next_dues[src.pk] = res
+        await flush_runs(force=True)
+        return next_dues
 
-        await asyncio.sleep(interval_seconds)
+    await run_due_loop("PYRO", list_sources, crawl_due, interval_seconds)
@@ -0,0 +1,143 @@
+# crawlers/pyro_push.py
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from typing import Dict, List, Tuple
+
+from core.models import SkipReason, Source
+from . import metrics
+from .base import ChannelItem, normalize_channel_items
+from .pyro_channels import _get_active_channel_sources, _msg_to_item, _username_from_url
+from . import spam
+from .spam import is_spam
+from .tg_backend import ChannelMessage, TelegramBackend
+
+# =========================================================
+# Push mode: channel posts as they arrive
+# =========================================================
+#
+# With CHANNEL_PUSH=1 every account (TelegramBackend.subscribe) delivers new
+# and edited messages and hands the ones from channel Sources to a batcher, which
+# saves them every CHANNEL_PUSH_FLUSH_MS (one save_items() per channel per
+# flush, through the single DB writer). Edits keep the message link and are
+# saved with update=True, so they rewrite the existing Post.
+#
+# Updates only arrive for channels the account has joined, and not while
+# the client is disconnected, so polling (telegram_channels_loop) keeps
+# running as a gap filler, at most every CHANNEL_GAP_FILL_INTERVAL seconds
+# per channel. Push does not move the high-water mark: the next poll
+# re-reads from the last polled message and picks up whatever push missed
+# (already saved posts come back unchanged).
+#
+# Tunables:
+#   CHANNEL_PUSH               1/0 (default 0)
+#   CHANNEL_PUSH_FLUSH_MS      batching window (default 500)
+#   CHANNEL_PUSH_BATCH         max messages per flush (default 200)
+#   CHANNEL_PUSH_REFRESH       seconds between re-reading channel Sources (default 300)
+#   CHANNEL_GAP_FILL_INTERVAL  min seconds between polls of a channel in push mode (default 1800)
+
+CHANNEL_PUSH_FLUSH_MS = int(os.getenv("CHANNEL_PUSH_FLUSH_MS", "500"))
+CHANNEL_PUSH_BATCH = int(os.getenv("CHANNEL_PUSH_BATCH", "200"))
+CHANNEL_PUSH_REFRESH = float(os.getenv("CHANNEL_PUSH_REFRESH", "300"))
+CHANNEL_GAP_FILL_INTERVAL = int(os.getenv("CHANNEL_GAP_FILL_INTERVAL", "1800"))
+
+def push_enabled() -> bool:
+    return os.getenv("CHANNEL_PUSH", "0") == "1"
+
+class PushIngest:
+    """Update subscription + batcher for one account."""
+
+    def __init__(self, backend: TelegramBackend, list_sources=_get_active_channel_sources):
+        self.backend = backend
+        self.list_sources = list_sources
+        # (source, username, message, edited)
+        self._queue: "asyncio.Queue[Tuple[Source, str, ChannelMessage, bool]]" = asyncio.Queue()
+        # lower-cased username -> (Source, username as written in Source.url)
+        self._channels: Dict[str, Tuple[Source, str]] = {}
+
+    async def refresh(self):
+        channels = {}
+        for src in await self.list_sources():
+            username = _username_from_url(src.url)
+            if username:
+                channels[username.lower()] = (src, username)
+        self._channels = channels
+
+    def _enqueue(self, msg: ChannelMessage, edited: bool):
+        hit = self._channels.get((msg.username or "").lower())
+        if hit:
+            self._queue.put_nowait((hit[0], hit[1], msg, edited))
+
+    def _drain(self, first) -> List[Tuple[Source, str, ChannelMessage, bool]]:
+        batch = [first]
+        while len(batch) < CHANNEL_PUSH_BATCH:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _flush(self, batch: List[Tuple[Source, str, ChannelMessage, bool]]):
+        from .scheduler import save_items  # local import to avoid cycles
+
+        # (source id, edited, spam) -> items: new posts, edits and kept
+        # rejects (SPAM_KEEP; skipped, not counted as saved) are saved separately
+        groups: Dict[Tuple[int, bool, bool], Tuple[Source, List[ChannelItem]]] = {}
+        oldest = time.time()
+        scored: Dict[str, List[int]] = {}  # channel -> [scored, rejected]
+        for src, username, msg, edited in batch:
+            # the poller's username spelling, so both produce the same Post.link
+            item = _msg_to_item(msg, src.category, username)
+            if not item:
+                continue
+            counts = scored.setdefault(src.name, [0, 0])
+            counts[0] += 1
+            if is_spam(item.text, src.name):
+                counts[1] += 1
+                if edited or not spam.SPAM_KEEP:
+                    continue  # dropped (an edit never skips a stored post)
+                item.skip_reason = SkipReason.SPAM
+            groups.setdefault((src.pk, edited, bool(item.skip_reason)), (src, []))[1].append(item)
+            posted = msg.edit_date or msg.date
+            if posted:
+                oldest = min(oldest, posted.timestamp())
+        saved = 0
+        for (_, edited, rejected), (src, items) in groups.items():
+            try:
+                n = await save_items(src, normalize_channel_items(items), update=edited)
+                saved += 0 if rejected else n
+            except Exception as e:
+                # not lost for good: the next gap-fill poll reads these messages again
+                print(f"[PUSH] {src.name}: save failed: {e}")
+        metrics.record_push(len(batch), saved, time.time() - oldest)
+        for name, (seen, rejected) in scored.items():
+            metrics.record_spam(name, seen, rejected)
+        if saved:
+            print(f"[PUSH] saved {saved} new post(s) from {len({key[0] for key in groups})} channel(s)")
+
+    async def run(self):
+        await self.refresh()
+        self.backend.subscribe(self._enqueue)
+        print(f"[PUSH] listening to {len(self._channels)} channel(s)")
+        refreshed = time.monotonic()
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), timeout=CHANNEL_PUSH_REFRESH)
+            except asyncio.TimeoutError:
+                first = None
+            if time.monotonic() - refreshed >= CHANNEL_PUSH_REFRESH:
+                try:
+                    await self.refresh()
+                except Exception as e:
+                    print(f"[PUSH] refresh failed: {e}")
+                refreshed = time.monotonic()
+            if first is None:
+                continue
+            # let the rest of a burst (album, several channels posting) join the batch
+            await asyncio.sleep(CHANNEL_PUSH_FLUSH_MS / 1000)
+            await self._flush(self._drain(first))
+
+async def push_loop(backend: TelegramBackend, list_sources=_get_active_channel_sources):
+    await PushIngest(backend, list_sources).run()
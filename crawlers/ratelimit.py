@@ -0,0 +1,37 @@
+# crawlers/ratelimit.py
+from __future__ import annotations
+
+import asyncio
+import time
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, up to `burst` banked.
+    acquire() waits for a token and returns the seconds it spent waiting.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        waited = 0.0
+        # the lock keeps waiters FIFO instead of all waking on the same refill
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited = delay
+                self._refill()
+            self._tokens -= 1
+        return waited
+
@@ -0,0 +1,237 @@
+# crawlers/sandbox.py
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+# =========================================================
+# Scraper sandbox: pooled worker subprocesses
+# =========================================================
+#
+# With SCRAPER_SANDBOX=1 website scrapers don't run in the main process (which
+# also hosts the bot) but in a small pool of worker processes:
+#   - memory is capped with RLIMIT_AS (a huge DOM fails with MemoryError in the
+#     worker instead of bloating the bot), CPU per worker with RLIMIT_CPU;
+#   - a task that outlives its timeout (+ SANDBOX_KILL_GRACE) is killed with
+#     its worker, e.g. a regex blowup that never reaches a fetch() deadline;
+#   - results travel back as JSON capped at SANDBOX_MAX_RESULT_KB; items past
+#     the cap are dropped;
+#   - a worker is replaced after SANDBOX_MAX_TASKS tasks, so whatever the
+#     parsers leak (BeautifulSoup trees, caches) goes away with it.
+# Workers import crawlers.websites only (no Django), so they start quickly.
+#
+# Tunables:
+#   SCRAPER_SANDBOX        1/0 (default 0)
+#   SANDBOX_WORKERS        worker processes (default WEBSITE_CONCURRENCY)
+#   SANDBOX_MEMORY_MB      address-space cap per worker (default 1024, 0 = none)
+#   SANDBOX_CPU_SECONDS    CPU seconds per worker lifetime (default 600, 0 = none)
+#   SANDBOX_MAX_TASKS      tasks before a worker is recycled (default 50)
+#   SANDBOX_MAX_RESULT_KB  max result size (default 4096)
+#   SANDBOX_KILL_GRACE     seconds past the task timeout before the kill (default 5)
+
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))
+SANDBOX_CPU_SECONDS = int(os.getenv("SANDBOX_CPU_SECONDS", "600"))
+SANDBOX_MAX_TASKS = int(os.getenv("SANDBOX_MAX_TASKS", "50"))
+SANDBOX_MAX_RESULT_KB = int(os.getenv("SANDBOX_MAX_RESULT_KB", "4096"))
+SANDBOX_KILL_GRACE = float(os.getenv("SANDBOX_KILL_GRACE", "5"))
+
+def sandbox_enabled() -> bool:
+    return os.getenv("SCRAPER_SANDBOX", "0") == "1"
+
+class SandboxError(RuntimeError):
+    pass
+
+class SandboxTimeout(SandboxError):
+    pass
+
+class SandboxCrashed(SandboxError):
+    pass
+
+class SandboxTaskError(SandboxError):
+    """The scraper raised inside the worker; .kind is the original exception class name."""
+    def __init__(self, kind: str, message: str):
+        super().__init__(f"{kind}: {message}")
+        self.kind = kind
+
+# ----------------- worker process -----------------
+
+def _apply_limits(memory_mb: int, cpu_seconds: int):
+    try:
+        import resource
+    except ImportError:  # not on POSIX: run without limits
+        return
+    if memory_mb > 0:
+        cap = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (cap, cap))
+    if cpu_seconds > 0:
+        # soft limit sends SIGXCPU -> the worker dies and gets replaced
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+
+def _bounded_json(items: List[dict], max_bytes: int) -> Tuple[bytes, int]:
+    """Encode items as a JSON list, dropping the tail past max_bytes. Returns (blob, dropped)."""
+    parts: List[bytes] = []
+    size = 2
+    for i, it in enumerate(items):
+        enc = json.dumps(it, ensure_ascii=False, default=str).encode("utf-8")
+        if size + len(enc) + 1 > max_bytes:
+            return b"[" + b",".join(parts) + b"]", len(items) - i
+        parts.append(enc)
+        size += len(enc) + 1
+    return b"[" + b",".join(parts) + b"]", 0
+
+def _worker_main(conn, memory_mb: int, cpu_seconds: int, max_result: int):
+    _apply_limits(memory_mb, cpu_seconds)
+    from . import websites
+    from .base import fetch_stats, last_swallowed_error, reset_fetch_stats, set_deadline
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        parser, timeout = task
+        try:
+            fn = getattr(websites, parser, None)
+            if fn is None:
+                raise LookupError(f"parser not found: {parser}")
+            set_deadline(time.monotonic() + timeout)
+            last_swallowed_error()
+            reset_fetch_stats()
+            started = time.monotonic()
+            items = fn() or []
+            stats = fetch_stats()
+            stats["total"] = time.monotonic() - started
+            swallowed = last_swallowed_error()
+            blob, dropped = _bounded_json(items, max_result)
+            stats["dropped"] = dropped
+            err = (type(swallowed).__name__, str(swallowed)[:500]) if swallowed else None
+            conn.send(("ok", blob, err, stats))
+        except BaseException as e:  # MemoryError included: report, the worker is recycled
+            try:
+                conn.send(("error", type(e).__name__, str(e)[:500]))
+            except Exception:
+                return
+            if isinstance(e, (MemoryError, KeyboardInterrupt, SystemExit)):
+                return
+        finally:
+            set_deadline(None)
+
+# ----------------- parent side -----------------
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(
+            target=_worker_main,
+            args=(child, SANDBOX_MEMORY_MB, SANDBOX_CPU_SECONDS, SANDBOX_MAX_RESULT_KB * 1024),
+            name="scraper-sandbox",
+            daemon=True,
+        )
+        self.proc.start()
+        child.close()
+        self.tasks = 0
+
+    def alive(self) -> bool:
+        return self.proc.is_alive()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.proc.join(2)
+        if self.proc.is_alive():
+            self.kill()
+        self.conn.close()
+
+    def kill(self):
+        self.proc.kill()
+        self.proc.join(2)
+        self.conn.close()
+
+class SandboxPool:
+    def __init__(self, size: int, max_tasks: int = SANDBOX_MAX_TASKS):
+        # spawn: the parent runs threads (writer, asyncio executors), which fork doesn't mix with
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self.max_tasks = max(1, max_tasks)
+        # counters
+        self.started = 0
+        self.killed = 0
+        self.recycled = 0
+
+    def _checkout(self) -> _Worker:
+        while True:
+            try:
+                w = self._idle.get_nowait()
+            except queue.Empty:
+                self.started += 1
+                return _Worker(self._ctx)
+            if w.alive():
+                return w
+            w.kill()
+
+    def run(self, parser: str, timeout: float) -> Tuple[List[dict], Optional[Tuple[str, str]], dict]:
+        """
+        Run crawlers.websites.<parser>() in a worker. Blocking; call from a
+        thread. Returns (items, (class, message) swallowed by @no_fail or None,
+        fetch stats). Raises SandboxTimeout / SandboxCrashed / SandboxTaskError.
+        """
+        with self._slots:
+            w = self._checkout()
+            try:
+                w.conn.send((parser, timeout))
+                if not w.conn.poll(timeout + SANDBOX_KILL_GRACE):
+                    w.kill()
+                    self.killed += 1
+                    raise SandboxTimeout(f"{parser}: killed after {timeout + SANDBOX_KILL_GRACE:.0f}s")
+                msg = w.conn.recv()
+            except (EOFError, OSError, BrokenPipeError):
+                code = w.proc.exitcode
+                w.kill()
+                self.killed += 1
+                raise SandboxCrashed(f"{parser}: worker died (exit code {code})")
+
+            w.tasks += 1
+            if msg[0] == "error" and msg[1] == "MemoryError":
+                w.kill()  # the worker exits on MemoryError
+            elif w.tasks >= self.max_tasks:
+                w.stop()
+                self.recycled += 1
+            else:
+                self._idle.put(w)
+
+        if msg[0] == "error":
+            raise SandboxTaskError(msg[1], msg[2])
+        _, blob, err, stats = msg
+        if stats.get("dropped"):
+            print(f"[sandbox] {parser}: result over {SANDBOX_MAX_RESULT_KB}KB, dropped {stats['dropped']} items")
+        return json.loads(blob), err, stats
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                return
+
+_pool: Optional[SandboxPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool(size: int) -> SandboxPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool(int(os.getenv("SANDBOX_WORKERS", str(size))))
+        return _pool
+
+def run_sandboxed(parser: str, timeout: float, size: int) -> Tuple[List[dict], Optional[Any], dict]:
+    return get_pool(size).run(parser, timeout)
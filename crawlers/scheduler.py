@@ -1,11 +1,25 @@
 import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Callable, Dict, List
-from asgiref.sync import sync_to_async
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from django.db import IntegrityError
 from core.models import Source, Post, SourceType
-from . import websites
-from .telegram_channels import fetch_new_from_channel, username_from_url
+from core.dbexec import db_read, run_db
+from core.writer import write
+from . import categorize, metrics, websites
+from .base import ChannelItem, fetch_stats, last_swallowed_error, reset_fetch_stats, set_deadline
+from .crawl_runs import flush_runs, record_run
+from .sandbox import SandboxTaskError, run_sandboxed, sandbox_enabled
+from .persist import persist_items
+from .pacing import current_interval, record_crawl
+from .due_queue import run_due_loop
+from .dedupe import index_posts
+from .pg_ingest import copy_ingest, copy_ingest_enabled
+from core.payload import refresh_payloads
+from core.retention import drop_pruned
 # crawlers/scheduler.py (only the save_items function needs updating)
 
 Scraper = Callable[[], List[dict]]
@@ -24,84 +38,285 @@ SCRAPERS: Dict[str, Scraper] = {
     "scrape_gitcoin_placeholder": websites.scrape_gitcoin_placeholder,
 }
 
-@sync_to_async
+@db_read
 def list_active_sources() -> List[Source]:
     return list(Source.objects.filter(is_active=True))
 
 
 
-@sync_to_async
-def save_items(source: Source, items: list[dict]) -> int:
+def _channel_defaults(source: Source, it: ChannelItem) -> dict:
+    return dict(
+        title=it.title,
+        description=it.text,
+        category=it.category or source.category,
+        company="",
+        location="Remote",
+        salary_min=it.salary_min,
+        salary_max=it.salary_max,
+        currency=it.currency,
+        period=it.period,
+        tags=[],
+        tg_message_id=it.message_id,
+        tg_edit_date=it.edit_date,
+        skip_reason=it.skip_reason,
+    )
+
+def _channel_row(source: Source, it: ChannelItem):
+    return it.link, _channel_defaults(source, it), it.extras(), it.text
+
+def _save_items_sync(source: Source, items: List[ChannelItem], update: bool = False) -> int:
+    rows = drop_pruned(source, [_channel_row(source, it) for it in items])
+    if copy_ingest_enabled():
+        saved = copy_ingest(source, rows, update=update)
+        Source.objects.filter(pk=source.pk).update(last_crawled=datetime.now(timezone.utc))
+        return saved
+
     saved = 0
-    for it in items:
+    created_posts = []
+    payloads = []
+    for link, defaults, extras, raw_text in rows:
         try:
-            Post.objects.get_or_create(
+            obj, created = Post.objects.get_or_create(
                 source=source,
-                link=it["link"],
-                defaults=dict(
-                    title=it["title"],
-                    description=it.get("description",""),
-                    category=source.category,
-                    company=it.get("company",""),
-                    location=it.get("location",""),
-                    salary_min=it.get("salary_min"),
-                    salary_max=it.get("salary_max"),
-                    currency=it.get("currency",""),
-                    period=it.get("period",""),
-                    tags=it.get("tags") or [],
-                    extras=it.get("extras") or {},
-                    raw_text=it.get("raw_text",""),
-                )
+                link=link,
+                defaults=defaults,
             )
-            saved += 1
+            if created:
+                saved += 1
+                if not obj.skip_reason:
+                    created_posts.append(obj)
+                payloads.append((obj.pk, extras, raw_text, obj.description))
+            elif update:
+                # an edit never un-skips a post (or skips one)
+                changed = [k for k, v in defaults.items() if k != "skip_reason" and getattr(obj, k) != v]
+                if changed:
+                    for k in changed:
+                        setattr(obj, k, defaults[k])
+                    obj.save(update_fields=changed)
+                payloads.append((obj.pk, extras, raw_text, obj.description))
         except IntegrityError:
             pass
+    refresh_payloads(payloads)
+    index_posts(created_posts)
     Source.objects.filter(pk=source.pk).update(last_crawled=datetime.now(timezone.utc))
     return saved
 
+async def save_items(source: Source, items: List[ChannelItem], update: bool = False) -> int:
+    """
+    Queue a channel batch on the single DB writer (see core/writer.py).
+    Each item gets its own category first (crawlers/categorize.py), in a
+    worker thread so a long backfill doesn't stall the event loop (nor the
+    writer). update=True also rewrites posts that already exist (edited
+    messages). Returns how many new posts were created.
+    """
+    if items and categorize.active():
+        moved = await asyncio.to_thread(categorize.classify_items, items, source.category)
+        metrics.record_categories(len(items), moved)
+    return await write(_save_items_sync, source, items, update)
 
-# crawlers/scheduler.py (excerpt)
-async def websites_loop(interval_seconds: int = 60):
-    import asyncio, importlib
-    from datetime import datetime
-    from core.models import Source, SourceType
-    from crawlers.persist import persist_items
 
-    def get_scraper(name):
+# ----------------- Website crawl cycle -----------------
+#
+# Sources in a cycle run concurrently (bounded by WEBSITE_CONCURRENCY) on a
+# dedicated thread pool. Each gets WEBSITE_SOURCE_TIMEOUT seconds: the scraper
+# thread sees it as a fetch() deadline (crawlers/base.py) and the loop stops
+# waiting for it at the same time, so one slow site can't hold up the rest.
+# The timeout is also cut to what is left of the cycle budget; a source that
+# gets less than WEBSITE_MIN_BUDGET, or is cut off by the cycle deadline, is
+# carried over to the next cycle rather than counted as a failure. A source
+# cut off once gets its full timeout the next time, so a site slower than
+# the budget ends up as a success or a timeout (breaker, back-off) instead
+# of being carried forever.
+#
+# Tunables:
+#   WEBSITE_CONCURRENCY     sources crawled at once (default 8)
+#   WEBSITE_SOURCE_TIMEOUT  seconds per source incl. retries (default 90)
+#   WEBSITE_MIN_BUDGET      seconds a source needs to be started at all (default 5)
+
+WEBSITE_CONCURRENCY = int(os.getenv("WEBSITE_CONCURRENCY", "8"))
+WEBSITE_SOURCE_TIMEOUT = float(os.getenv("WEBSITE_SOURCE_TIMEOUT", "90"))
+WEBSITE_MIN_BUDGET = float(os.getenv("WEBSITE_MIN_BUDGET", "5"))
+
+# A couple of spare workers so a scraper stuck outside fetch() past its
+# timeout doesn't eat a slot from the next source.
+_scrape_pool = ThreadPoolExecutor(max_workers=WEBSITE_CONCURRENCY + 2, thread_name_prefix="scrape")
+
+# sources cut off by a cycle deadline on their last run
+_cut_off: Set[int] = set()
+
+def _get_scraper(name):
+    try:
+        m = importlib.import_module("crawlers.websites")
+        return getattr(m, name, None)
+    except Exception:
+        return None
+
+def _run_scraper(fn: Scraper, timeout: float) -> Tuple[List[dict], Optional[Exception], dict]:
+    """Returns (items, error swallowed by @no_fail if any, fetch stats + "total" seconds)."""
+    set_deadline(time.monotonic() + timeout)
+    last_swallowed_error()
+    reset_fetch_stats()
+    started = time.monotonic()
+    try:
+        items = fn()
+        stats = fetch_stats()
+        stats["total"] = time.monotonic() - started
+        return items, last_swallowed_error(), stats
+    finally:
+        set_deadline(None)
+
+def _scrape(parser: str, fn: Scraper, timeout: float) -> Tuple[List[dict], Optional[Exception], dict]:
+    """_run_scraper, or the same in a sandbox worker process (crawlers/sandbox.py)."""
+    if not sandbox_enabled():
+        return _run_scraper(fn, timeout)
+    items, swallowed, stats = run_sandboxed(parser, timeout, WEBSITE_CONCURRENCY)
+    return items, (SandboxTaskError(*swallowed) if swallowed else None), stats
+
+async def crawl_website_source(src: Source, fn: Scraper, sem: asyncio.Semaphore, timeout: float,
+                               base_interval: int, deadline: Optional[float] = None) -> dict:
+    """
+    Scrape + persist one source and adapt its interval (crawlers/pacing.py);
+    never raises. Errors, timeouts and empty results count towards the
+    source's circuit breaker (crawlers/breaker.py). deadline (loop.time())
+    caps the source's budget (unless it was cut off last time); res["carried"]
+    is set when it ran out.
+    Every started crawl is recorded in the crawl-run history
+    (crawlers/crawl_runs.py). Returns a small result record.
+    """
+    async with sem:
+        started = time.monotonic()
+        started_at = datetime.now(timezone.utc)
+        res = {"source_id": src.pk, "source": src.name, "scraped": 0, "new": 0, "error": "",
+               "elapsed": 0.0, "next_due": None, "carried": False}
+        fstats: dict = {}
+        pstats: dict = {}
+        persist_s = 0.0
+        loop = asyncio.get_running_loop()
+        own_timeout = timeout
+        if deadline is not None and src.pk not in _cut_off:
+            timeout = min(timeout, deadline - loop.time())
+            if timeout < WEBSITE_MIN_BUDGET:
+                res["carried"] = True
+                return res
         try:
-            m = importlib.import_module("crawlers.websites")
-            return getattr(m, name, None)
-        except Exception:
-            return None
+            items, swallowed, fstats = await asyncio.wait_for(
+                loop.run_in_executor(_scrape_pool, _scrape, src.parser, fn, timeout), timeout,
+            )
+            if swallowed is not None:
+                res["error"] = getattr(swallowed, "kind", type(swallowed).__name__)
+                res["detail"] = str(swallowed)
+            res["scraped"] = len(items)
+            t0 = time.monotonic()
+            res["new"] = await write(persist_items, src, items, pstats)
+            persist_s = time.monotonic() - t0
+            print(f"[{datetime.utcnow():%H:%M:%S}] {src.name}: scraped {len(items)}, new {res['new']}")
+        except asyncio.TimeoutError:
+            if timeout < own_timeout:
+                _cut_off.add(src.pk)
+                res["carried"] = True
+                res["elapsed"] = time.monotonic() - started
+                record_run(src.pk, started_at, res["elapsed"], error="deadline")
+                print(f"[{src.name}] cut off by the cycle deadline after {timeout:.0f}s, carried over")
+                return res
+            res["error"] = "timeout"
+            print(f"[{src.name}] TIMEOUT after {timeout:.0f}s")
+        except Exception as e:
+            res["error"] = getattr(e, "kind", type(e).__name__)
+            res["detail"] = str(e)
+            print(f"[{src.name}] ERROR: {e}")
+        _cut_off.discard(src.pk)
+        res["elapsed"] = time.monotonic() - started
+        record_run(
+            src.pk, started_at, res["elapsed"],
+            fetch=fstats.get("seconds", 0.0),
+            parse=max(0.0, fstats.get("total", 0.0) - fstats.get("seconds", 0.0)),
+            persist=persist_s,
+            bytes_downloaded=fstats.get("bytes", 0),
+            http_attempts=fstats.get("attempts", 0),
+            scraped=res["scraped"],
+            new=res["new"],
+            updated=pstats.get("updated", 0),
+            unchanged=pstats.get("unchanged", 0),
+            error=res["error"],
+        )
+        try:
+            res["next_due"] = await write(record_crawl, src.pk, current_interval(src, base_interval),
+                                          res["scraped"], res["new"], not res["error"],
+                                          f"{res['error']}: {res.get('detail', '')}".strip(": "),
+                                          empty_is_failure=True)
+        except Exception as e:
+            print(f"[{src.name}] pacing update failed: {e}")
+        await flush_runs()
+        return res
 
-    while True:
-        sources = list(Source.objects.filter(type=SourceType.WEBSITE, is_active=True))
-        for src in sources:
-            if not src.parser:
-                # print(f"[{src.name}] no parser")
-                continue
-            fn = get_scraper(src.parser)
+@db_read
+def _list_website_sources() -> List[Source]:
+    return list(Source.objects.filter(type=SourceType.WEBSITE, is_active=True).exclude(parser=""))
+
+async def websites_loop(interval_seconds: int = 60):
+    """
+    interval_seconds is the starting interval for each source; after that
+    every source keeps its own adaptive interval and due time on Source,
+    driven by the priority-queue scheduler (crawlers/due_queue.py).
+    """
+    sem = asyncio.Semaphore(WEBSITE_CONCURRENCY)
+
+    async def crawl_due(batch: List[Source], deadline: float) -> Dict[int, Optional[datetime]]:
+        # batch is in priority order and the semaphore hands out slots FIFO,
+        # so high-yield sources start first and the tail is what gets carried
+        jobs = []
+        for src in batch:
+            fn = _get_scraper(src.parser)
             if not fn:
                 print(f"[{src.name}] parser not found: {src.parser}")
                 continue
+            jobs.append(crawl_website_source(src, fn, sem, WEBSITE_SOURCE_TIMEOUT, interval_seconds, deadline))
+        if not jobs:
+            return {}
 
-            try:
-                items = await asyncio.to_thread(fn)
-                saved = await asyncio.to_thread(persist_items, src, items)
-                print(f"[{datetime.utcnow():%H:%M:%S}] {src.name}: scraped {len(items)}, new {saved}")
-            except Exception as e:
-                print(f"[{src.name}] ERROR: {e}")
+        cycle_started = time.monotonic()
+        results = await asyncio.gather(*jobs)
+        await flush_runs(force=True)
+        wall = time.monotonic() - cycle_started
+        busy = sum(r["elapsed"] for r in results)
+        print(
+            f"[websites] cycle: {len(results)} sources, wall {wall:.1f}s vs sum {busy:.1f}s "
+            f"(x{busy / wall if wall else 0:.1f}), new {sum(r['new'] for r in results)}, "
+            f"timeouts {sum(r['error'] == 'timeout' for r in results)}, "
+            f"errors {sum(bool(r['error']) and r['error'] != 'timeout' for r in results)}, "
+            f"carried {sum(r['carried'] for r in results)}"
+        )
+        return {r["source_id"]: (None if r["carried"] else r["next_due"])
+                for r in results if r["carried"] or r["next_due"]}
 
-        await asyncio.sleep(interval_seconds)
+    await run_due_loop("websites", _list_website_sources, crawl_due, interval_seconds,
+                       min_budget=WEBSITE_SOURCE_TIMEOUT + WEBSITE_MIN_BUDGET)
+
+async def retention_loop(days: int, interval_seconds: int = 6 * 3600):
+    """
+    Periodically archive + prune old posted/duplicate/skipped posts (core/retention.py).
+    Each batch is queued on the DB writer, so live writes interleave between batches.
+    """
+    from core.retention import (
+        RETENTION_BATCH, archive_path, default_archive_dir, min_retention_days, prune_batch, prune_tombstones,
+        vacuum_analyze,
+    )
 
-async def telegram_channels_loop(interval: int, telethon_client):
+    days = max(days, min_retention_days())
     while True:
-        sources = await list_active_sources()
-        for src in [s for s in sources if s.type == SourceType.TELEGRAM_CHANNEL]:
-            username = username_from_url(src.url or src.name)
-            try:
-                items = await fetch_new_from_channel(telethon_client, username)
-                added = await save_items(src, items)
-            except Exception:
-                pass
-        await asyncio.sleep(interval)
+        try:
+            path = archive_path(default_archive_dir())
+            total = 0
+            while True:
+                n = await write(prune_batch, days, RETENTION_BATCH, path)
+                if not n:
+                    break
+                total += n
+                await asyncio.sleep(0.2)
+            await write(prune_tombstones)
+            if total:
+                await run_db(vacuum_analyze)
+                print(f"[retention] pruned {total} posts older than {days}d")
+        except Exception as e:
+            print(f"[retention] ERROR: {e}")
+        await asyncio.sleep(interval_seconds)
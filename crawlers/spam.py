@@ -0,0 +1,218 @@
+# crawlers/spam.py
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from django.conf import settings
+from .textclf import Features, LinearModel, hashed_features, words
+
+# =========================================================
+# Spam / ad filter for channel messages
+# =========================================================
+#
+# Channel messages are ingested without a keyword filter, so ads, promos
+# and chatter would fill Post and the bot queue. Every message is scored
+# before it is saved (crawl and push alike); above the threshold it is
+# dropped and never reaches the DB (the high-water mark still moves past it).
+# With SPAM_KEEP=1 rejects are stored as skipped instead (Post.skip_reason
+# SPAM): never queued for the bot, pruned by retention, and there to review,
+# export for training or re-queue by clearing the reason in the admin.
+#   1. keyword automata: the cue lists (strong ad cues, weak promo cues and
+#      job cues, EN + FA) are precompiled into tables of word n-grams,
+#      matched in one pass over the message's tokens (a regex alternation of
+#      ~100 terms would backtrack through every term at every position);
+#      plus a few shape cues (short, link/mention heavy, emoji heavy, shouting);
+#   2. a linear model over the cues and hashed words/bigrams
+#      (crawlers/textclf.py). Without a trained model the hand-set cue
+#      weights below are used, and only a message with a strong ad cue can
+#      be rejected: shape and weak promo cues merely add to it ("Golang
+#      needed ASAP" or "join our team, premium bonus" are not ads);
+#      `manage.py train_spam` learns the rest from labeled messages and
+#      writes SPAM_MODEL.
+# Per-channel seen/rejected counts are in /stats; SPAM_LOG=1 prints every
+# rejected message with its score, for tuning the thresholds.
+#
+# Tunables:
+#   SPAM_FILTER              1/0 (default 1)
+#   SPAM_THRESHOLD           reject at or above this probability (default 0.8)
+#   SPAM_CHANNEL_THRESHOLDS  per-channel overrides, "name=0.9,other=0.6"
+#   SPAM_MODEL               trained model file (default <BASE_DIR>/spam_model.json, used if present)
+#   SPAM_MAX_CHARS           characters of a message that are scored (default 2000)
+#   SPAM_LOG                 1/0 (default 0)
+#   SPAM_KEEP                1/0: store rejects as skipped posts (default 0: drop them)
+
+SPAM_THRESHOLD = float(os.getenv("SPAM_THRESHOLD", "0.8"))
+SPAM_MAX_CHARS = int(os.getenv("SPAM_MAX_CHARS", "2000"))
+SPAM_LOG = os.getenv("SPAM_LOG", "0") == "1"
+SPAM_KEEP = os.getenv("SPAM_KEEP", "0") == "1"
+
+# Strong cues: hardly ever in a real job post
+JUNK_CUES = [
+    # EN: ads, promos, signals, engagement bait, chatter
+    "vip", "signal", "signals", "guaranteed", "casino", "betting", "forex", "airdrop",
+    "giveaway", "followers", "promo code", "buy now", "click here", "pump", "referral", "earn money",
+    "make money", "passive income", "advertising", "sponsored", "cashback", "partner channel",
+    "good morning", "good night", "happy birthday",
+    # FA
+    "تبلیغ", "تبلیغات", "ممبر", "فالوور", "سیگنال", "سود تضمینی", "کسب درآمد",
+    "درآمد دلاری", "عضو شوید", "جوین", "شرط بندی", "کازینو",
+    "قرعه کشی", "صبح بخیر", "شب بخیر", "فروش ویژه",
+]
+# Weak cues: common in ads, but job posts use them too ("join our team", "premium bonus")
+PROMO_CUES = [
+    "profit", "bet", "members", "subscribe", "join our", "join now", "promo", "discount", "sale", "loan",
+    "premium", "invest", "investment",
+    "خرید", "تخفیف", "وام", "بیت کوین", "ارز دیجیتال", "هدیه",
+]
+JOB_CUES = [
+    # EN
+    "hiring", "hire", "salary", "remote", "job", "position", "developer", "dev", "engineer", "designer",
+    "apply", "resume", "cv", "vacancy", "full time", "part time", "freelance",
+    "freelancer", "contract", "project", "budget", "hackathon", "internship", "intern", "looking for",
+    "requirements", "experience", "portfolio", "python", "javascript", "react", "backend", "frontend",
+    "devops", "qa", "android", "ios",
+    # FA
+    "استخدام", "حقوق", "دورکاری", "رزومه", "برنامه نویس", "برنامه‌نویس", "توسعه دهنده", "توسعه‌دهنده",
+    "پروژه", "فریلنسر", "کارآموز", "همکاری", "مهارت", "تمام وقت", "پاره وقت", "نیازمندیم", "کارشناس",
+]
+
+# Hand-set weights, used until a model is trained (and as its starting point)
+SEED_WEIGHTS: Dict[str, float] = {
+    **{f"junk:{t}": 2.0 for t in JUNK_CUES},
+    **{f"promo:{t}": 0.5 for t in PROMO_CUES},
+    **{f"job:{t}": -1.5 for t in JOB_CUES},
+    "shape:short": 1.5,
+    "shape:nojob": 1.5,
+    "shape:links": 0.7,
+    "shape:mentions": 0.8,
+    "shape:emoji": 0.8,
+    "shape:caps": 0.7,
+}
+SEED_BIAS = -1.5
+
+class _Automaton:
+    """Cue terms as word n-grams, matched with one set lookup per token and length."""
+
+    def __init__(self, terms: List[str]):
+        self.grams: Dict[Tuple[str, ...], str] = {}
+        for t in terms:
+            toks = tuple(words(t))
+            if toks:
+                self.grams[toks] = " ".join(toks)
+        self.lengths = sorted({len(g) for g in self.grams}, reverse=True)
+        self.first = {g[0] for g in self.grams}
+
+    def find(self, toks: Sequence[str]) -> Set[str]:
+        grams, first, found = self.grams, self.first, set()
+        for i, tok in enumerate(toks):
+            if tok not in first:
+                continue
+            for n in self.lengths:
+                term = grams.get(tuple(toks[i:i + n]))
+                if term:
+                    found.add(term)
+                    break
+        return found
+
+_JUNK = _Automaton(JUNK_CUES)
+_PROMO = _Automaton(PROMO_CUES)
+_JOB = _Automaton(JOB_CUES)
+_LINK_RE = re.compile(r"https?://|t\.me/|www\.", re.I)
+_MENTION_RE = re.compile(r"(?<!\w)@\w{4,}")
+_EMOJI_RE = re.compile("[\U0001F000-\U0001FAFF☀-➿]")
+_LATIN_RE = re.compile(r"[A-Za-z]")
+_UPPER_RE = re.compile(r"[A-Z]")
+
+def cue_features(text: str, toks: Optional[Sequence[str]] = None) -> List[str]:
+    """Named cue features of a message (keyword automata + shape)."""
+    toks = words(text) if toks is None else toks
+    names = [f"junk:{m}" for m in _JUNK.find(toks)]
+    names += [f"promo:{m}" for m in _PROMO.find(toks)]
+    jobs = _JOB.find(toks)
+    names += [f"job:{m}" for m in jobs]
+    if len(text) < 60:
+        names.append("shape:short")
+    if not jobs:
+        names.append("shape:nojob")
+    if len(_LINK_RE.findall(text)) >= 2:
+        names.append("shape:links")
+    if len(_MENTION_RE.findall(text)) >= 2:
+        names.append("shape:mentions")
+    if len(_EMOJI_RE.findall(text)) >= 4:
+        names.append("shape:emoji")
+    latin = len(_LATIN_RE.findall(text))
+    if latin > 20 and len(_UPPER_RE.findall(text)) > latin / 2:
+        names.append("shape:caps")
+    return names
+
+def features(text: str) -> Features:
+    text = (text or "")[:SPAM_MAX_CHARS]
+    toks = words(text)
+    return hashed_features(toks, cue_features(text, toks))
+
+# ----------------- Model -----------------
+
+def spam_enabled() -> bool:
+    return os.getenv("SPAM_FILTER", "1") == "1"
+
+def model_path() -> Path:
+    return Path(os.getenv("SPAM_MODEL") or Path(settings.BASE_DIR) / "spam_model.json")
+
+def seed_model() -> LinearModel:
+    return LinearModel.from_named(SEED_WEIGHTS, SEED_BIAS)
+
+_model: Optional[LinearModel] = None
+_seeded = False  # no trained model: _model holds the seed weights
+
+def model() -> LinearModel:
+    global _model, _seeded
+    if _model is None:
+        path = model_path()
+        if path.exists():
+            try:
+                _model = LinearModel.load(path)
+                print(f"[SPAM] model loaded from {path} ({len(_model.weights)} weights)")
+            except Exception as e:
+                print(f"[SPAM] can't load {path}: {e}; using seed weights")
+        if _model is None:
+            _model = seed_model()
+            _seeded = True
+    return _model
+
+def _channel_thresholds() -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    for part in os.getenv("SPAM_CHANNEL_THRESHOLDS", "").split(","):
+        name, _, value = part.partition("=")
+        if name.strip() and value.strip():
+            out[name.strip().lower()] = float(value)
+    return out
+
+_thresholds = _channel_thresholds()
+
+def threshold(channel: str = "") -> float:
+    return _thresholds.get(channel.lower(), SPAM_THRESHOLD)
+
+def score(text: str) -> float:
+    """Probability that a message is an ad/promo/chatter rather than an opportunity."""
+    m = model()
+    text = (text or "")[:SPAM_MAX_CHARS]
+    toks = words(text)
+    cues = cue_features(text, toks)
+    if _seeded and not any(c.startswith("junk:") for c in cues):
+        # hand-set weights: shape and weak promo cues alone are no evidence
+        cues = [c for c in cues if c.startswith("job:")]
+    return m.proba(hashed_features(toks, cues))
+
+def is_spam(text: str, channel: str = "") -> bool:
+    if not spam_enabled():
+        return False
+    p = score(text)
+    if p < threshold(channel):
+        return False
+    if SPAM_LOG:
+        first = next((ln.strip() for ln in text.splitlines() if ln.strip()), "")
+        print(f"[SPAM] {channel}: {p:.2f} {first[:80]}")
+    return True
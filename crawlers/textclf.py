@@ -0,0 +1,170 @@
+# crawlers/textclf.py
+from __future__ import annotations
+
+import functools
+import json
+import math
+import random
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# =========================================================
+# Hashed-feature linear models (pure Python)
+# =========================================================
+#
+# Small text classifiers for the ingestion path (crawlers/spam.py,
+# crawlers/categorize.py): words and word bigrams (EN + FA) plus
+# caller-supplied named features are hashed into 2^HASH_BITS buckets
+# (crc32, stable across processes), and a sparse weight table scores them.
+# Scoring a channel message is one tokenizing regex pass and a few dozen
+# dict lookups, i.e. tens of microseconds. Models are trained offline with
+# logistic-regression SGD (one-vs-rest for several labels) and saved as JSON.
+
+HASH_BITS = 18
+_MASK = (1 << HASH_BITS) - 1
+
+_WORD_RE = re.compile(r"[^\W_]+", re.U)
+# Arabic letter variants -> Persian; ZWNJ joins the parts of one word (برنامه‌نویس)
+_FA_MAP = str.maketrans({"ي": "ی", "ك": "ک", "‌": ""})
+
+Features = Dict[int, float]
+
+def normalize(text: str) -> str:
+    return (text or "").lower().translate(_FA_MAP)
+
+def words(text: str) -> List[str]:
+    return _WORD_RE.findall(normalize(text))
+
+@functools.lru_cache(maxsize=1 << 16)
+def feature_index(name: str) -> int:
+    return zlib.crc32(name.encode("utf-8")) & _MASK
+
+def hashed_features(toks: Sequence[str], named: Iterable[str] = ()) -> Features:
+    """Binary features of a token list (words()): w:<word>, b:<word> <word>, plus the `named` ones."""
+    feats: Features = {}
+    for i, w in enumerate(toks):
+        feats[feature_index("w:" + w)] = 1.0
+        if i:
+            feats[feature_index(f"b:{toks[i - 1]} {w}")] = 1.0
+    for name in named:
+        feats[feature_index(name)] = 1.0
+    return feats
+
+def _sigmoid(z: float) -> float:
+    if z < -35:
+        return 0.0
+    return 1.0 / (1.0 + math.exp(-z))
+
+class LinearModel:
+    """Sparse logistic-regression weights over hashed features."""
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None, bias: float = 0.0):
+        self.weights = dict(weights or {})
+        self.bias = bias
+
+    @classmethod
+    def from_named(cls, named: Dict[str, float], bias: float = 0.0) -> "LinearModel":
+        """Hand-set weights by feature name (w:..., b:..., or a named feature)."""
+        weights: Dict[int, float] = {}
+        for name, w in named.items():
+            i = feature_index(name)
+            weights[i] = weights.get(i, 0.0) + w
+        return cls(weights, bias)
+
+    def margin(self, feats: Features) -> float:
+        w = self.weights
+        return self.bias + sum(w.get(i, 0.0) * v for i, v in feats.items())
+
+    def proba(self, feats: Features) -> float:
+        return _sigmoid(self.margin(feats))
+
+    # ----------------- training -----------------
+
+    def fit(self, examples: Sequence[Tuple[Features, int]], epochs: int = 5, lr: float = 0.2,
+            l2: float = 1e-5, seed: int = 1) -> "LinearModel":
+        """Logistic-regression SGD from the current weights; labels are 0/1."""
+        order = list(range(len(examples)))
+        rng = random.Random(seed)
+        w = self.weights
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = lr / (1 + epoch)
+            for n in order:
+                feats, label = examples[n]
+                g = self.proba(feats) - label
+                for i, v in feats.items():
+                    wi = w.get(i, 0.0)
+                    w[i] = wi - rate * (g * v + l2 * wi)
+                self.bias -= rate * g
+        # drop weights that ended up negligible: smaller file, same scores
+        self.weights = {i: v for i, v in w.items() if abs(v) >= 1e-4}
+        return self
+
+    # ----------------- storage -----------------
+
+    def to_json(self) -> dict:
+        return {"hash_bits": HASH_BITS, "bias": self.bias,
+                "weights": {str(i): round(v, 5) for i, v in sorted(self.weights.items())}}
+
+    @classmethod
+    def from_json(cls, doc: dict) -> "LinearModel":
+        if doc.get("hash_bits") != HASH_BITS:
+            raise ValueError(f"model was trained with hash_bits={doc.get('hash_bits')}, expected {HASH_BITS}")
+        return cls({int(i): float(v) for i, v in doc["weights"].items()}, float(doc.get("bias", 0.0)))
+
+    def save(self, path: Path, **meta):
+        _write_json(path, dict(self.to_json(), **meta))
+
+    @classmethod
+    def load(cls, path: Path) -> "LinearModel":
+        return cls.from_json(json.loads(Path(path).read_text()))
+
+class MulticlassModel:
+    """One-vs-rest LinearModels; the label with the highest margin wins."""
+
+    def __init__(self, models: Dict[str, LinearModel]):
+        self.models = models
+
+    def margins(self, feats: Features) -> Dict[str, float]:
+        return {label: m.margin(feats) for label, m in self.models.items()}
+
+    def predict(self, feats: Features, prior: Optional[Dict[str, float]] = None) -> Tuple[str, float]:
+        """(label, softmax probability); `prior` adds to the margins of some labels."""
+        margins = self.margins(feats)
+        for label, bonus in (prior or {}).items():
+            if label in margins:
+                margins[label] += bonus
+        top = max(margins, key=margins.get)
+        z = sum(math.exp(max(-35.0, m - margins[top])) for m in margins.values())
+        return top, 1.0 / z
+
+    def fit(self, examples: Sequence[Tuple[Features, str]], **kw) -> "MulticlassModel":
+        for label, m in self.models.items():
+            m.fit([(feats, int(y == label)) for feats, y in examples], **kw)
+        return self
+
+    def to_json(self) -> dict:
+        classes = {}
+        for label, m in self.models.items():
+            doc = m.to_json()
+            classes[label] = {"bias": doc["bias"], "weights": doc["weights"]}
+        return {"hash_bits": HASH_BITS, "classes": classes}
+
+    @classmethod
+    def from_json(cls, doc: dict) -> "MulticlassModel":
+        bits = doc.get("hash_bits")
+        return cls({label: LinearModel.from_json(dict(c, hash_bits=bits)) for label, c in doc["classes"].items()})
+
+    def save(self, path: Path, **meta):
+        _write_json(path, dict(self.to_json(), **meta))
+
+    @classmethod
+    def load(cls, path: Path) -> "MulticlassModel":
+        return cls.from_json(json.loads(Path(path).read_text()))
+
+def _write_json(path: Path, doc: dict):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(doc, ensure_ascii=False))
@@ -0,0 +1,258 @@
+# crawlers/tg_backend.py
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from . import peers
+
+# =========================================================
+# Telegram backends
+# =========================================================
+#
+# The channel crawler (crawlers/pyro_channels.py), push mode
+# (crawlers/pyro_push.py) and the account pool (crawlers/client_pool.py)
+# only talk to a TelegramBackend:
+#   resolve(username)     -> chat reference for history(), through the
+#                            persistent peer cache (crawlers/peers.py)
+#   history(chat, limit)  -> ChannelMessage, newest first
+#   get_messages(chat, ids) -> ChannelMessage or None (deleted) per id, in
+#                            one request (edit/delete sync, crawlers/tg_sync.py)
+#   subscribe(callback)   -> callback(ChannelMessage, edited) for channel
+#                            posts as they arrive
+# and see flood limits as tg_backend.FloodWait, whatever the library.
+#
+# Adapters: Pyrogram (default) and Telethon. The in-process fake
+# (crawlers/tg_fake.py) is for `manage.py tg_loadtest` and tests only: it is
+# never selected through TG_BACKEND, so the app can't publish synthetic posts.
+#
+# Tunables:
+#   TG_BACKEND  pyrogram (default) / telethon
+#   PYRO_STRING_SESSION(S), TELETHON_STRING_SESSION(S)
+#               one session string, plus comma-separated extra accounts;
+#               with none, one file-based session is used
+
+def backend_kind() -> str:
+    return os.getenv("TG_BACKEND", "pyrogram").strip().lower()
+
+class FloodWait(Exception):
+    """Telegram asked us to wait `value` seconds before the next call of this kind."""
+    def __init__(self, value: float):
+        super().__init__(f"flood wait {value:.0f}s")
+        self.value = value
+
+class ChannelMessage:
+    """A channel post as the crawler sees it, whatever the client library."""
+    __slots__ = ("id", "date", "edit_date", "text", "views", "chat_id", "username")
+
+    def __init__(self, id: int, date: Optional[datetime], text: str = "", views: Optional[int] = None,
+                 chat_id: Optional[int] = None, username: Optional[str] = None,
+                 edit_date: Optional[datetime] = None):
+        self.id = id
+        self.date = date            # aware, UTC
+        self.edit_date = edit_date  # aware, UTC
+        self.text = text            # text or media caption; "" for service/media-only posts
+        self.views = views
+        self.chat_id = chat_id
+        self.username = username
+
+def _utc(dt: Optional[datetime]) -> Optional[datetime]:
+    # naive datetimes from the libraries are local time
+    return dt.astimezone(timezone.utc) if dt else None
+
+class TelegramBackend:
+    kind = "base"
+
+    def __init__(self):
+        self.account = "default"  # peer-cache / pool key; the account's user id once started
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def resolve(self, username: str) -> Any:
+        raise NotImplementedError
+
+    def history(self, chat: Any, limit: int) -> AsyncIterator[ChannelMessage]:
+        raise NotImplementedError
+
+    async def get_messages(self, chat: Any, ids: List[int]) -> List[Optional[ChannelMessage]]:
+        raise NotImplementedError
+
+    def subscribe(self, callback: Callable[[ChannelMessage, bool], None]):
+        raise NotImplementedError
+
+    async def forget(self, username: str):
+        """Drop a cached peer that turned out to be stale."""
+        await peers.forget(self.account, username)
+
+# ----------------- Pyrogram -----------------
+
+class PyrogramBackend(TelegramBackend):
+    kind = "pyrogram"
+
+    def __init__(self, api_id: int, api_hash: str, session_string: Optional[str] = None,
+                 proxy: Optional[dict] = None, name: str = "pyrogram"):
+        super().__init__()
+        from pyrogram import Client
+
+        self.app = Client(
+            name=name,
+            api_id=api_id,
+            api_hash=api_hash,
+            session_string=session_string,  # <-- v2 way
+            proxy=proxy,
+            workdir=".",  # keep session locally if file-based
+            sleep_threshold=0,  # flood waits are handled per channel in telegram_channels_loop
+        )
+
+    async def start(self):
+        await self.app.start()
+        self.account = peers.pyrogram_account(self.app)
+
+    async def stop(self):
+        await self.app.stop()
+
+    async def resolve(self, username: str) -> int:
+        from pyrogram.errors import FloodWait as PyroFloodWait
+
+        try:
+            return await peers.pyrogram_chat_id(self.app, username)  # may call contacts.ResolveUsername
+        except PyroFloodWait as e:
+            raise FloodWait(float(e.value or 1)) from e
+
+    @staticmethod
+    def convert(msg) -> ChannelMessage:
+        chat = msg.chat
+        text = "" if getattr(msg, "service", False) else (msg.text or msg.caption or "")
+        return ChannelMessage(msg.id, _utc(msg.date), text, getattr(msg, "views", None),
+                              chat.id if chat else None, chat.username if chat else None, _utc(msg.edit_date))
+
+    async def history(self, chat: int, limit: int) -> AsyncIterator[ChannelMessage]:
+        from pyrogram.errors import FloodWait as PyroFloodWait
+
+        try:
+            async for msg in self.app.get_chat_history(chat, limit=limit):
+                yield self.convert(msg)
+        except PyroFloodWait as e:
+            raise FloodWait(float(e.value or 1)) from e
+
+    async def get_messages(self, chat: int, ids: List[int]) -> List[Optional[ChannelMessage]]:
+        from pyrogram.errors import FloodWait as PyroFloodWait
+
+        try:
+            msgs = await self.app.get_messages(chat, ids)  # up to 200 ids per request
+        except PyroFloodWait as e:
+            raise FloodWait(float(e.value or 1)) from e
+        # deleted messages come back as empty Message objects
+        return [None if getattr(m, "empty", False) else self.convert(m) for m in msgs]
+
+    def subscribe(self, callback: Callable[[ChannelMessage, bool], None]):
+        from pyrogram import filters
+        from pyrogram.handlers import EditedMessageHandler, MessageHandler
+
+        async def on_new(client, msg):
+            callback(self.convert(msg), False)
+
+        async def on_edit(client, msg):
+            callback(self.convert(msg), True)
+
+        self.app.add_handler(MessageHandler(on_new, filters.channel))
+        self.app.add_handler(EditedMessageHandler(on_edit, filters.channel))
+
+# ----------------- Telethon -----------------
+
+class TelethonBackend(TelegramBackend):
+    kind = "telethon"
+
+    def __init__(self, api_id: int, api_hash: str, session_string: Optional[str] = None):
+        super().__init__()
+        self.api_id, self.api_hash, self.session_string = api_id, api_hash, session_string
+        self.client = None
+
+    async def start(self):
+        from .telegram_channels import build_telethon_client
+
+        self.client = await build_telethon_client(self.api_id, self.api_hash, self.session_string)
+        self.client.flood_sleep_threshold = 0  # surface every flood wait, as with Pyrogram
+        self.account = await peers.telethon_account(self.client)
+
+    async def stop(self):
+        if self.client:
+            await self.client.disconnect()
+
+    async def resolve(self, username: str):
+        from telethon.errors import FloodWaitError
+
+        try:
+            return await peers.telethon_input_peer(self.client, username)  # may call contacts.ResolveUsername
+        except FloodWaitError as e:
+            raise FloodWait(float(e.seconds or 1)) from e
+
+    @staticmethod
+    def convert(msg, username: Optional[str] = None) -> ChannelMessage:
+        return ChannelMessage(msg.id, _utc(msg.date), msg.message or "", msg.views, msg.chat_id, username,
+                              _utc(msg.edit_date))
+
+    async def history(self, chat, limit: int) -> AsyncIterator[ChannelMessage]:
+        from telethon.errors import FloodWaitError
+
+        try:
+            async for msg in self.client.iter_messages(chat, limit=limit):
+                yield self.convert(msg)
+        except FloodWaitError as e:
+            raise FloodWait(float(e.seconds or 1)) from e
+
+    async def get_messages(self, chat, ids: List[int]) -> List[Optional[ChannelMessage]]:
+        from telethon.errors import FloodWaitError
+
+        try:
+            msgs = await self.client.get_messages(chat, ids=ids)  # None for deleted ids
+        except FloodWaitError as e:
+            raise FloodWait(float(e.seconds or 1)) from e
+        return [self.convert(m) if m else None for m in msgs]
+
+    def subscribe(self, callback: Callable[[ChannelMessage, bool], None]):
+        from telethon import events
+
+        def channel_post(event) -> bool:
+            return event.is_channel and not event.is_group
+
+        async def handle(event, edited: bool):
+            chat = await event.get_chat()
+            callback(self.convert(event.message, getattr(chat, "username", None)), edited)
+
+        async def on_new(event):
+            await handle(event, False)
+
+        async def on_edit(event):
+            await handle(event, True)
+
+        self.client.add_event_handler(on_new, events.NewMessage(func=channel_post))
+        self.client.add_event_handler(on_edit, events.MessageEdited(func=channel_post))
+
+# ----------------- factory -----------------
+
+def session_strings(prefix: str) -> List[Optional[str]]:
+    """<prefix>_STRING_SESSION plus the comma-separated <prefix>_STRING_SESSIONS, deduplicated."""
+    sessions = [os.getenv(f"{prefix}_STRING_SESSION", "")]
+    sessions += os.getenv(f"{prefix}_STRING_SESSIONS", "").split(",")
+    out: List[Optional[str]] = []
+    for s in (s.strip() for s in sessions):
+        if s and s not in out:
+            out.append(s)
+    return out or [None]
+
+def make_backends(api_id: int = 0, api_hash: str = "", proxy: Optional[dict] = None,
+                  kind: Optional[str] = None) -> List[TelegramBackend]:
+    """One (not yet started) backend per configured account."""
+    kind = kind or backend_kind()
+    if kind == "telethon":
+        return [TelethonBackend(api_id, api_hash, s) for s in session_strings("TELETHON")]
+    if kind != "pyrogram":
+        raise ValueError(f"unknown TG_BACKEND: {kind}")
+    return [PyrogramBackend(api_id, api_hash, s, proxy=proxy, name="pyrogram" if i == 0 else f"pyrogram{i}")
+            for i, s in enumerate(session_strings("PYRO"))]
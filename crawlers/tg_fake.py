@@ -0,0 +1,173 @@
+# crawlers/tg_fake.py
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from .tg_backend import ChannelMessage, FloodWait, TelegramBackend
+
+# =========================================================
+# Fake Telegram backend (offline load tests)
+# =========================================================
+#
+# Synthetic channels that post at a fixed rate, for running the channel
+# pipeline (crawler, push mode, persistence, bot queue) without Telegram.
+# Every username is a channel. Message k of a channel always has the same
+# id and text for a given seed; how many exist depends on the time since
+# start(): FAKE_TG_BACKLOG at start, then FAKE_TG_RATE per minute.
+# Requests take FAKE_TG_LATENCY_MS per 100-message page and fail with a
+# FloodWait of FAKE_TG_FLOOD_SECONDS with probability FAKE_TG_FLOOD_RATE.
+# Push subscribers get the new posts of every channel resolved so far.
+# FAKE_TG_EDIT_RATE / FAKE_TG_DELETE_RATE of the posts get marked filled
+# (an edit) or deleted FAKE_TG_CHANGE_AFTER seconds after they were posted.
+#
+# Tunables:
+#   FAKE_TG_RATE           posts per minute per channel (default 6)
+#   FAKE_TG_BACKLOG        posts per channel already there at start (default 50)
+#   FAKE_TG_LATENCY_MS     latency per request (default 50)
+#   FAKE_TG_FLOOD_RATE     probability of a FloodWait per request (default 0)
+#   FAKE_TG_FLOOD_SECONDS  length of those flood waits (default 5)
+#   FAKE_TG_EDIT_RATE      share of posts edited later (default 0)
+#   FAKE_TG_DELETE_RATE    share of posts deleted later (default 0)
+#   FAKE_TG_CHANGE_AFTER   seconds until those edits/deletions (default 60)
+#   FAKE_TG_SEED           content seed (default 1)
+
+FAKE_TG_RATE = float(os.getenv("FAKE_TG_RATE", "6"))
+FAKE_TG_BACKLOG = int(os.getenv("FAKE_TG_BACKLOG", "50"))
+FAKE_TG_LATENCY_MS = float(os.getenv("FAKE_TG_LATENCY_MS", "50"))
+FAKE_TG_FLOOD_RATE = float(os.getenv("FAKE_TG_FLOOD_RATE", "0"))
+FAKE_TG_FLOOD_SECONDS = float(os.getenv("FAKE_TG_FLOOD_SECONDS", "5"))
+FAKE_TG_EDIT_RATE = float(os.getenv("FAKE_TG_EDIT_RATE", "0"))
+FAKE_TG_DELETE_RATE = float(os.getenv("FAKE_TG_DELETE_RATE", "0"))
+FAKE_TG_CHANGE_AFTER = float(os.getenv("FAKE_TG_CHANGE_AFTER", "60"))
+FAKE_TG_SEED = int(os.getenv("FAKE_TG_SEED", "1"))
+
+_ROLES = ["Python developer", "Backend engineer", "Frontend developer (React)", "DevOps engineer",
+          "Data scientist", "Android developer", "Go developer", "QA engineer", "UI/UX designer",
+          "برنامه‌نویس پایتون", "توسعه‌دهنده فرانت‌اند", "کارشناس دواپس"]
+_BODIES = [
+    "Remote, full-time. Salary ${lo}k-${hi}k per month. Apply: hr@example.com",
+    "Freelance project, budget ${lo}00-${hi}00 USD. Send your portfolio.",
+    "Contract 6 months, {lo}0-{hi}0 EUR/hour, remote friendly.",
+    "دورکاری، تمام وقت. حقوق {lo}۰ تا {hi}۰ میلیون تومان. ارسال رزومه در دایرکت",
+    "Hackathon with prizes up to ${hi}k, registration open until Friday.",
+]
+_JUNK = ["🔥 Join our VIP signals channel, 300% profit guaranteed!", "Good morning everyone ☀️",
+         "تبلیغات: خرید ممبر واقعی با تخفیف ویژه", "Subscribe to our partner channel @somechannel"]
+
+def _text(seed: int, username: str, k: int) -> str:
+    rng = random.Random(f"{seed}:{username}:{k}")
+    if rng.random() < 0.15:
+        return rng.choice(_JUNK)
+    lo = rng.randint(1, 5)
+    return f"{rng.choice(_ROLES)}\n{rng.choice(_BODIES).format(lo=lo, hi=lo + rng.randint(1, 4))}\n#{username}"
+
+class FakeBackend(TelegramBackend):
+    kind = "fake"
+
+    def __init__(self, account: str = "fake", rate: float = FAKE_TG_RATE, backlog: int = FAKE_TG_BACKLOG,
+                 latency_ms: float = FAKE_TG_LATENCY_MS, flood_rate: float = FAKE_TG_FLOOD_RATE,
+                 flood_seconds: float = FAKE_TG_FLOOD_SECONDS, seed: int = FAKE_TG_SEED,
+                 rates: Optional[Dict[str, float]] = None, edit_rate: float = FAKE_TG_EDIT_RATE,
+                 delete_rate: float = FAKE_TG_DELETE_RATE, change_after: float = FAKE_TG_CHANGE_AFTER):
+        super().__init__()
+        self.account = account
+        self.rate, self.backlog, self.latency = rate, backlog, latency_ms / 1000
+        self.flood_rate, self.flood_seconds, self.seed = flood_rate, flood_seconds, seed
+        self.edit_rate, self.delete_rate, self.change_after = edit_rate, delete_rate, change_after
+        self.rates = {k.lower(): v for k, v in (rates or {}).items()}  # per-channel overrides
+        self._rng = random.Random(f"{seed}:{account}")  # flood draws
+        self._started = time.time()
+        self._channels: Dict[str, int] = {}  # resolved username -> last id pushed
+        self._subscribers: List[Callable[[ChannelMessage, bool], None]] = []
+        self._pusher: Optional[asyncio.Task] = None
+        self.requests = 0
+
+    async def start(self):
+        self._started = time.time()
+        if self._pusher is None:
+            self._pusher = asyncio.create_task(self._push_loop())
+
+    async def stop(self):
+        if self._pusher:
+            self._pusher.cancel()
+            self._pusher = None
+
+    def _rate(self, username: str) -> float:
+        return self.rates.get(username, self.rate)
+
+    def count(self, username: str, now: Optional[float] = None) -> int:
+        """Posts in the channel so far."""
+        elapsed = (now or time.time()) - self._started
+        return self.backlog + int(max(0.0, elapsed) * self._rate(username) / 60)
+
+    def message(self, username: str, k: int, now: Optional[float] = None) -> Optional[ChannelMessage]:
+        """Message k as it looks at `now`; None once it has been deleted."""
+        rate = self._rate(username) or 1.0
+        date = datetime.fromtimestamp(self._started, timezone.utc) + timedelta(minutes=(k - self.backlog) / rate)
+        text, edit_date = _text(self.seed, username, k), None
+        changed_at = date + timedelta(seconds=self.change_after)
+        if changed_at.timestamp() <= (now or time.time()):
+            fate = random.Random(f"{self.seed}:{username}:{k}:fate").random()
+            if fate < self.delete_rate:
+                return None
+            if fate < self.delete_rate + self.edit_rate:
+                text, edit_date = f"{text}\n\nUpdate: this position has been filled.", changed_at
+        return ChannelMessage(k, date, text, views=k * 7, edit_date=edit_date,
+                              chat_id=-1000000000000 - zlib.crc32(username.encode()), username=username)
+
+    async def _request(self):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        if self.flood_rate and self._rng.random() < self.flood_rate:
+            raise FloodWait(self.flood_seconds)
+
+    async def resolve(self, username: str) -> str:
+        name = username.strip().lstrip("@").lower()
+        await self._request()
+        self._channels.setdefault(name, self.count(name))
+        return name
+
+    async def history(self, chat: str, limit: int) -> AsyncIterator[ChannelMessage]:
+        newest, now = self.count(chat), time.time()
+        n = 0
+        for k in range(newest, 0, -1):
+            msg = self.message(chat, k, now)
+            if msg is None:
+                continue
+            if n == limit:
+                return
+            if n % 100 == 0:
+                await self._request()
+            n += 1
+            yield msg
+
+    async def get_messages(self, chat: str, ids: List[int]) -> List[Optional[ChannelMessage]]:
+        await self._request()
+        newest, now = self.count(chat), time.time()
+        return [self.message(chat, k, now) if 0 < k <= newest else None for k in ids]
+
+    def subscribe(self, callback: Callable[[ChannelMessage, bool], None]):
+        self._subscribers.append(callback)
+
+    async def _push_loop(self):
+        while True:
+            await asyncio.sleep(0.25)
+            if not self._subscribers:
+                continue
+            now = time.time()
+            for name, last in list(self._channels.items()):
+                newest = self.count(name, now)
+                for k in range(last + 1, newest + 1):
+                    msg = self.message(name, k, now)
+                    if msg is None:
+                        continue
+                    for cb in self._subscribers:
+                        cb(msg, False)
+                self._channels[name] = newest
+
@@ -0,0 +1,171 @@
+# crawlers/tg_sync.py
+from __future__ import annotations
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.dbexec import db_read
+from core.models import Post, SkipReason, Source, SourceType
+from core.writer import write
+from . import metrics, peers
+from .base import is_filled_text, normalize_channel_items
+from .client_pool import ClientPool
+from .pyro_channels import _msg_to_item, _username_from_url
+from .tg_backend import ChannelMessage, FloodWait
+
+# =========================================================
+# Edit/delete sync for channel posts
+# =========================================================
+#
+# Channel posts are ingested once, but admins edit them (corrections, "filled")
+# or delete them. Every CHANNEL_SYNC_INTERVAL seconds the posts ingested in
+# the last CHANNEL_SYNC_WINDOW hours are re-read by message id,
+# CHANNEL_SYNC_BATCH ids per get-messages request (never the whole history):
+#   - a deleted message (or one whose text was removed) retires its post
+#     (skip_reason DELETED);
+#   - an edited one (edit date newer than Post.tg_edit_date) rewrites the
+#     post, or retires it (FILLED) if the new text says it's filled/closed
+#     (crawlers/base.py; such posts aren't ingested in the first place).
+# Unposted rows go first. The bot also re-checks the few posts it is about
+# to send (verify()), so an edit or deletion between two passes isn't
+# posted either: edited rows are sent on the next tick with the new text.
+#
+# Requests go through the account pool, its slots and token buckets like
+# crawls; a flood wait just leaves the channel for the next pass.
+#
+# Tunables:
+#   CHANNEL_SYNC_INTERVAL  seconds between passes (default 600, 0 = no sync and no pre-send check)
+#   CHANNEL_SYNC_WINDOW    hours of posts kept in sync (default 48)
+#   CHANNEL_SYNC_BATCH     message ids per request (default 100, Telegram allows 200)
+
+CHANNEL_SYNC_INTERVAL = int(os.getenv("CHANNEL_SYNC_INTERVAL", "600"))
+CHANNEL_SYNC_WINDOW = float(os.getenv("CHANNEL_SYNC_WINDOW", "48"))
+CHANNEL_SYNC_BATCH = int(os.getenv("CHANNEL_SYNC_BATCH", "100"))
+
+# (post id, message id, edit date seen)
+Row = Tuple[int, int, Optional[datetime]]
+
+def sync_enabled() -> bool:
+    return CHANNEL_SYNC_INTERVAL > 0
+
+# ----------------- DB helpers -----------------
+
+@db_read
+def _load_posts(since: Optional[datetime] = None, ids: Optional[List[int]] = None) -> List[Tuple[Source, List[Row]]]:
+    """Live channel posts (created since `since`, or the given ids), grouped by channel, unposted first."""
+    qs = Post.objects.filter(
+        tg_message_id__isnull=False, is_duplicate=False, skip_reason="",
+        source__type=SourceType.TELEGRAM_CHANNEL,
+    )
+    qs = qs.filter(pk__in=ids) if ids is not None else qs.filter(created_at__gte=since)
+    qs = (
+        qs.select_related("source")
+        .only("id", "tg_message_id", "tg_edit_date", "source__id", "source__name", "source__url",
+              "source__category")
+        .order_by("posted_to_channel", "-created_at")
+    )
+    groups: Dict[int, Tuple[Source, List[Row]]] = {}
+    for p in qs:
+        groups.setdefault(p.source_id, (p.source, []))[1].append((p.pk, p.tg_message_id, p.tg_edit_date))
+    return list(groups.values())
+
+def _retire(post_ids: List[int], reason: str) -> int:
+    return Post.objects.filter(pk__in=post_ids, skip_reason="").update(skip_reason=reason)
+
+# ----------------- Sync -----------------
+
+class _Pass:
+    def __init__(self):
+        self.checked = self.edited = self.deleted = self.filled = 0
+        self.changed: Set[int] = set()
+
+async def _apply(src: Source, username: str, rows: List[Row], msgs: List[Optional[ChannelMessage]], res: _Pass):
+    deleted, filled, items = [], [], []
+    for (pk, _, seen_edit), msg in zip(rows, msgs):
+        if msg is None:
+            deleted.append(pk)
+            continue
+        if not msg.edit_date or (seen_edit and msg.edit_date <= seen_edit):
+            continue
+        if is_filled_text(msg.text):
+            filled.append(pk)
+            continue
+        item = _msg_to_item(msg, src.category, username)
+        if item is None:
+            deleted.append(pk)
+            continue
+        items.append(item)
+        res.changed.add(pk)
+    res.checked += len(rows)
+    if items:
+        from .scheduler import save_items  # local import to avoid cycles
+        await save_items(src, normalize_channel_items(items), update=True)
+        res.edited += len(items)
+    if deleted:
+        res.deleted += await write(_retire, deleted, SkipReason.DELETED)
+        res.changed.update(deleted)
+    if filled:
+        res.filled += await write(_retire, filled, SkipReason.FILLED)
+        res.changed.update(filled)
+
+async def _sync_channel(pool: ClientPool, src: Source, rows: List[Row], res: _Pass):
+    username = _username_from_url(src.url)
+    if not username:
+        return
+    acct = pool.pick(username.lower())
+    if acct is None:
+        return  # every account is flood-limited: next pass
+    async with acct.slots:
+        if acct.limited():
+            return  # limited while we queued for its slot: next pass
+        try:
+            chat = await acct.backend.resolve(username)
+            for i in range(0, len(rows), CHANNEL_SYNC_BATCH):
+                chunk = rows[i:i + CHANNEL_SYNC_BATCH]
+                waited = await acct.bucket.acquire()
+                if waited:
+                    metrics.record_throttle(waited)
+                msgs = await acct.backend.get_messages(chat, [mid for _, mid, _ in chunk])
+                await _apply(src, username, chunk, msgs, res)
+        except FloodWait as e:
+            pool.flood(acct, float(e.value or 1))
+            print(f"[SYNC] {src.name}: flood wait {e.value:.0f}s on account {acct.name}, skipped")
+        except Exception as e:
+            if peers.invalidates(e):
+                await acct.backend.forget(username)
+            print(f"[SYNC] {src.name}: {type(e).__name__}: {e}")
+
+async def sync_posts(pool: ClientPool, groups: List[Tuple[Source, List[Row]]]) -> Set[int]:
+    """Re-read the given posts' messages; returns the ids that were edited or retired."""
+    res = _Pass()
+    await asyncio.gather(*(_sync_channel(pool, src, rows, res) for src, rows in groups))
+    metrics.record_sync(res.checked, res.edited, res.deleted, res.filled)
+    if res.edited or res.deleted or res.filled:
+        print(f"[SYNC] {res.checked} posts checked: {res.edited} edited, {res.filled} filled, "
+              f"{res.deleted} deleted")
+    return res.changed
+
+async def verify(pool: Optional[ClientPool], post_ids: List[int]) -> Set[int]:
+    """
+    Re-check posts right before the bot sends them. Returns the ids not to
+    send now: retired ones, and edited ones (re-read them for the new text).
+    Non-channel ids are ignored; errors leave a post as it is.
+    """
+    if pool is None or not post_ids or not sync_enabled():
+        return set()
+    groups = await _load_posts(ids=post_ids)
+    return await sync_posts(pool, groups) if groups else set()
+
+async def sync_loop(pool: ClientPool, interval_seconds: int = CHANNEL_SYNC_INTERVAL):
+    print(f"[SYNC] re-checking channel posts of the last {CHANNEL_SYNC_WINDOW:g}h every {interval_seconds}s")
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            since = datetime.now(timezone.utc) - timedelta(hours=CHANNEL_SYNC_WINDOW)
+            groups = await _load_posts(since=since)
+            if groups:
+                await sync_posts(pool, groups)
+        except Exception as e:
+            print(f"[SYNC] pass failed: {e}")
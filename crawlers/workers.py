@@ -0,0 +1,191 @@
+# crawlers/workers.py
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from core.models import BreakerState, CrawlJob, Source, SourceType
+from core.writer import write
+from .backpressure import backpressure_enabled, backpressure_loop
+from .breaker import begin_probe
+from .crawl_runs import flush_runs
+from .pacing import current_interval, record_crawl
+from .scheduler import WEBSITE_SOURCE_TIMEOUT, _get_scraper, crawl_website_source
+
+# =========================================================
+# Lease-based crawl jobs (multi-process / multi-host)
+# =========================================================
+#
+# CRAWL_MODE=distributed splits website crawling in two:
+#   coordinator  (main.py, or `crawl_worker --with-coordinator`) turns due
+#                sources into CrawlJob rows -- at most one per source, so any
+#                number of coordinators can run;
+#   crawl_worker (management command, any number of processes/hosts on the
+#                same DB) claims jobs with an atomic lease, crawls them exactly
+#                like the in-process loop (crawl_website_source) and deletes
+#                the job. Source.next_due is updated by the crawl itself.
+# A worker that dies leaves its lease to expire; the job is then claimed by
+# someone else. After CRAWL_JOB_MAX_ATTEMPTS claims it is dropped and counted
+# as a failed crawl (circuit breaker, crawlers/breaker.py).
+#
+# Claiming is one conditional UPDATE per job ("... WHERE lease is free"), so
+# exactly one worker wins even on SQLite; on PostgreSQL candidates are picked
+# with SELECT ... FOR UPDATE SKIP LOCKED so workers don't queue on each other.
+#
+# Tunables:
+#   CRAWL_MODE               local (default: websites_loop in main.py) / distributed
+#   CRAWL_LEASE_SECONDS      lease per job (default WEBSITE_SOURCE_TIMEOUT + 60)
+#   CRAWL_JOB_MAX_ATTEMPTS   claims before a job is dropped (default 3)
+#   CRAWL_WORKER_CONCURRENCY jobs per worker process (default 4)
+#   CRAWL_WORKER_POLL        seconds between claims/enqueues when idle (default 5)
+
+CRAWL_LEASE_SECONDS = int(os.getenv("CRAWL_LEASE_SECONDS", str(int(WEBSITE_SOURCE_TIMEOUT) + 60)))
+CRAWL_JOB_MAX_ATTEMPTS = int(os.getenv("CRAWL_JOB_MAX_ATTEMPTS", "3"))
+CRAWL_WORKER_CONCURRENCY = int(os.getenv("CRAWL_WORKER_CONCURRENCY", "4"))
+CRAWL_WORKER_POLL = float(os.getenv("CRAWL_WORKER_POLL", "5"))
+
+def crawl_mode() -> str:
+    return os.getenv("CRAWL_MODE", "local").strip().lower()
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+# ----------------- job table (sync, run via core.writer.write) -----------------
+
+def enqueue_due(now: Optional[datetime] = None) -> int:
+    """Create a CrawlJob for every due website source that doesn't have one."""
+    now = now or datetime.now(timezone.utc)
+    due = (
+        Source.objects.filter(type=SourceType.WEBSITE, is_active=True, crawl_job__isnull=True)
+        .exclude(parser="")
+        .filter(Q(next_due__isnull=True) | Q(next_due__lte=now))
+        .only("id", "next_due", "yield_ewma")
+    )
+    jobs = [CrawlJob(source=s, due_at=s.next_due or now, priority=s.yield_ewma) for s in due]
+    # ignore_conflicts: another coordinator may have enqueued the same source meanwhile
+    CrawlJob.objects.bulk_create(jobs, ignore_conflicts=True)
+    return len(jobs)
+
+def _lease_free(now: datetime) -> Q:
+    return Q(lease_expires__isnull=True) | Q(lease_expires__lt=now)
+
+def claim(owner: str, limit: int, lease_seconds: int = CRAWL_LEASE_SECONDS) -> List[CrawlJob]:
+    """Lease up to `limit` due jobs to `owner`, highest priority first."""
+    if limit <= 0:
+        return []
+    now = datetime.now(timezone.utc)
+    lease = dict(lease_owner=owner, lease_expires=now + timedelta(seconds=lease_seconds),
+                 attempts=F("attempts") + 1)
+    candidates = CrawlJob.objects.filter(_lease_free(now), due_at__lte=now).order_by("-priority", "due_at")
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            won = list(candidates.select_for_update(skip_locked=True).values_list("pk", flat=True)[:limit])
+            CrawlJob.objects.filter(pk__in=won).update(**lease)
+    else:
+        won = []
+        for pk in candidates.values_list("pk", flat=True)[:limit * 4]:
+            if len(won) >= limit:
+                break
+            # re-checks the lease in the UPDATE itself: only one worker can match
+            if CrawlJob.objects.filter(_lease_free(now), pk=pk).update(**lease):
+                won.append(pk)
+    return list(CrawlJob.objects.filter(pk__in=won, lease_owner=owner).select_related("source"))
+
+def finish(job_id: int, owner: str) -> None:
+    CrawlJob.objects.filter(pk=job_id, lease_owner=owner).delete()
+
+def release(job_ids: List[int], owner: str) -> None:
+    """Hand jobs back (carried over, or shutting down) without counting an attempt."""
+    CrawlJob.objects.filter(pk__in=job_ids, lease_owner=owner).update(
+        lease_owner="", lease_expires=None, attempts=F("attempts") - 1,
+    )
+
+# ----------------- coordinator -----------------
+
+async def coordinator_loop(poll: float = CRAWL_WORKER_POLL):
+    while True:
+        try:
+            n = await write(enqueue_due)
+            if n:
+                print(f"[coordinator] enqueued {n} crawl job(s)")
+        except Exception as e:
+            print(f"[coordinator] ERROR: {e}")
+        await asyncio.sleep(poll)
+
+# ----------------- worker -----------------
+
+async def _run_job(job: CrawlJob, owner: str, sem: asyncio.Semaphore, base_interval: int) -> dict:
+    src = job.source
+    if job.attempts > CRAWL_JOB_MAX_ATTEMPTS:
+        print(f"[worker] {src.name}: dropped after {job.attempts - 1} expired leases")
+        await write(record_crawl, src.pk, current_interval(src, base_interval), 0, 0, False,
+                    f"lease expired {job.attempts - 1} times")
+        await write(finish, job.pk, owner)
+        return {"carried": False, "new": 0}
+    fn = _get_scraper(src.parser)
+    if not fn:
+        print(f"[{src.name}] parser not found: {src.parser}")
+        await write(finish, job.pk, owner)
+        return {"carried": False, "new": 0}
+    if src.breaker_state == BreakerState.OPEN:
+        await write(begin_probe, [src.pk])
+
+    # finish well inside the lease so nobody else picks the job up meanwhile
+    deadline = asyncio.get_running_loop().time() + CRAWL_LEASE_SECONDS * 0.9
+    res = await crawl_website_source(src, fn, sem, WEBSITE_SOURCE_TIMEOUT, base_interval, deadline)
+    if res["carried"]:
+        await write(release, [job.pk], owner)
+    else:
+        await write(finish, job.pk, owner)
+    return res
+
+async def worker_loop(owner: str, concurrency: int = CRAWL_WORKER_CONCURRENCY, base_interval: int = 60,
+                      poll: float = CRAWL_WORKER_POLL, with_coordinator: bool = False, once: bool = False):
+    """
+    Claim and crawl jobs until cancelled. once=True returns when nothing is
+    left to claim and nothing is running (handy for local testing).
+    """
+    sem = asyncio.Semaphore(concurrency)
+    running: Dict[asyncio.Task, int] = {}
+    done = new = 0
+    print(f"[worker {owner}] started: concurrency {concurrency}, lease {CRAWL_LEASE_SECONDS}s")
+    # keeps this process's backpressure reading fresh for record_crawl; main.py does the shedding
+    measuring = asyncio.create_task(backpressure_loop(shed=False)) if backpressure_enabled() else None
+    try:
+        while True:
+            if with_coordinator:
+                await write(enqueue_due)
+            for task in [t for t in running if t.done()]:
+                running.pop(task)
+                try:
+                    new += task.result().get("new", 0)
+                    done += 1
+                except Exception as e:
+                    print(f"[worker {owner}] job error: {e}")
+            jobs = await write(claim, owner, concurrency - len(running))
+            for job in jobs:
+                running[asyncio.create_task(_run_job(job, owner, sem, base_interval))] = job.pk
+            if once and not jobs and not running:
+                break
+            if jobs or running:
+                await asyncio.sleep(0.5)
+            else:
+                await asyncio.sleep(poll)
+    finally:
+        if measuring:
+            measuring.cancel()
+        await flush_runs(force=True)
+        leftover = list(running.values())
+        for task in running:
+            task.cancel()
+        if leftover:
+            await write(release, leftover, owner)
+            print(f"[worker {owner}] released {len(leftover)} job(s)")
+        print(f"[worker {owner}] stopped: {done} job(s) done, {new} new post(s)")
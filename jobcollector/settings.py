@@ -51,13 +51,53 @@ WSGI_APPLICATION = 'jobcollector.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Backend selection: SQLite (default, small deployments) or PostgreSQL.
+#   DB_ENGINE=postgres  + POSTGRES_DB / POSTGRES_USER / POSTGRES_PASSWORD /
+#                         POSTGRES_HOST / POSTGRES_PORT / POSTGRES_CONN_MAX_AGE
+# PostgreSQL needs a driver: pip install "psycopg[binary]"
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite").strip().lower()
+
+# SQLite performance profile: WAL lets readers run alongside the single writer,
+# busy_timeout makes competing writers wait instead of failing with
+# "database is locked", and IMMEDIATE transactions take the write lock up front
+# so a read->write upgrade can't deadlock. Writes from the crawlers are also
+# funnelled through one thread (core/writer.py).
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "20000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+            "transaction_mode": "IMMEDIATE",
+            "init_command": ";".join([
+                "PRAGMA journal_mode=WAL",
+                "PRAGMA synchronous=NORMAL",
+                f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}",
+                f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}",
+                f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}",
+                "PRAGMA temp_store=MEMORY",
+            ]),
+        },
     }
 }
 
+if DB_ENGINE in ("postgres", "postgresql"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("POSTGRES_DB", "jobcollector"),
+            "USER": os.getenv("POSTGRES_USER", "postgres"),
+            "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+            "HOST": os.getenv("POSTGRES_HOST", "localhost"),
+            "PORT": os.getenv("POSTGRES_PORT", "5432"),
+            "CONN_MAX_AGE": int(os.getenv("POSTGRES_CONN_MAX_AGE", "60")),
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
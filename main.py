@@ -1,6 +1,8 @@
 # main.py
 import os
+import time
 import asyncio
+import logging
 import threading
 from dotenv import load_dotenv
 
@@ -16,15 +18,47 @@ def runserver_thread():
     port = os.getenv("DJANGO_PORT", "8000")
     call_command("runserver", f"127.0.0.1:{port}")
 
+# ----------------- Event-loop debug mode -----------------
+#
+# The bot, Pyrogram and the crawl loops share one event loop, so anything
+# blocking on it (an ORM call outside core/dbexec.py or core/writer.py, a
+# sync HTTP request) stalls all of them. ASYNC_DEBUG=1 turns on asyncio's
+# debug mode, which logs every callback that runs longer than
+# ASYNC_SLOW_CALLBACK_MS, and starts a watchdog that reports loop lag.
+#
+#   ASYNC_DEBUG             1/0 (default 0)
+#   ASYNC_SLOW_CALLBACK_MS  threshold in ms (default 100)
+
+def enable_loop_debug(loop: asyncio.AbstractEventLoop) -> float:
+    threshold = int(os.getenv("ASYNC_SLOW_CALLBACK_MS", "100")) / 1000
+    logging.basicConfig(level=logging.WARNING, format="[%(name)s] %(message)s")
+    logging.getLogger("asyncio").setLevel(logging.WARNING)
+    loop.set_debug(True)
+    loop.slow_callback_duration = threshold
+    print(f"[loop] debug mode on, slow callback threshold {threshold * 1000:.0f}ms")
+    return threshold
+
+async def loop_lag_watchdog(threshold: float, tick: float = 0.5):
+    """Sleeps `tick` seconds at a time; oversleeping means something blocked the loop."""
+    while True:
+        started = time.monotonic()
+        await asyncio.sleep(tick)
+        lag = time.monotonic() - started - tick
+        if lag > threshold:
+            print(f"[loop] event loop was blocked for ~{lag * 1000:.0f}ms")
+
 def migrate_and_seed():
     from django.core.management import call_command
     call_command("migrate", interactive=False)
     call_command("seed_sources")
 
 async def async_main():
+    loop_debug = os.getenv("ASYNC_DEBUG", "0") == "1"
+    if loop_debug:
+        lag_threshold = enable_loop_debug(asyncio.get_running_loop())
+
     # ✅ All imports that touch Django models happen AFTER init_django()
-    from crawlers.telegram_channels import build_telethon_client
-    from crawlers.scheduler import websites_loop, telegram_channels_loop
+    from crawlers.scheduler import websites_loop, retention_loop
     from bots.telegram_bot import build_application
 
     # Run migrations in a separate thread
@@ -33,12 +67,13 @@ async def async_main():
     # if os.getenv("START_DJANGO_SERVER", "1") == "1":
     #     threading.Thread(target=runserver_thread, daemon=True).start()
 
-    from crawlers.pyro_channels import build_pyro_client as build_pyro_client, telegram_channels_loop as pyro_channels_loop
+    from crawlers.pyro_channels import build_channel_pool, telegram_channels_loop as pyro_channels_loop
 
     api_id_env = os.getenv("API_ID", "").strip()
     api_hash = os.getenv("API_HASH", "").strip()
-    pyro_string = os.getenv("PYRO_STRING_SESSION") or None  # generate this once locally (see below)
-    pyro_client = None
+    # TG_BACKEND=pyrogram (default) / telethon; sessions in PYRO_/TELETHON_STRING_SESSION(S),
+    # generate these once locally
+    pyro_pool = None
     if api_id_env and api_hash:
         try:
             api_id = int(api_id_env)
@@ -47,7 +82,7 @@ async def async_main():
         if api_id > 0:
             # Optional: SOCKS5/HTTP proxy dict if needed { "scheme":"socks5", "hostname":"127.0.0.1", "port":9050 }
             proxy = None
-            pyro_client = await build_pyro_client(api_id, api_hash, pyro_string, proxy=proxy)
+            pyro_pool = await build_channel_pool(api_id, api_hash, proxy=proxy)
     else:
         print("Skipping Telegram user client (no API_ID/API_HASH).")
 
@@ -55,6 +90,7 @@ async def async_main():
     target_channel = os.getenv("TARGET_CHANNEL", "")
     post_interval = int(os.getenv("POST_INTERVAL_SECONDS", "60"))
     crawl_interval = int(os.getenv("CRAWL_INTERVAL_SECONDS", "60"))
+    retention_days = int(os.getenv("RETENTION_DAYS", "0"))  # 0 = keep everything
 
     if not bot_token or not target_channel:
         print("!! BOT_TOKEN or TARGET_CHANNEL missing in .env — bot will not post.")
@@ -62,13 +98,37 @@ async def async_main():
 
     app = build_application(bot_token, target_channel)
     app.bot_data["post_interval"] = post_interval
+    if pyro_pool:
+        app.bot_data["channel_pool"] = pyro_pool  # pre-send edit/delete check
 
     await app.initialize()
     await app.start()
 
-    tasks = [asyncio.create_task(websites_loop(crawl_interval))]
-    if pyro_client:
-        tasks.append(asyncio.create_task(pyro_channels_loop(crawl_interval, pyro_client)))
+    # CRAWL_MODE=distributed: only enqueue here, `manage.py crawl_worker` processes crawl
+    from crawlers.workers import coordinator_loop, crawl_mode
+    if crawl_mode() == "distributed":
+        tasks = [asyncio.create_task(coordinator_loop())]
+        print("Website crawling is distributed: run `python manage.py crawl_worker` to process jobs.")
+    else:
+        tasks = [asyncio.create_task(websites_loop(crawl_interval))]
+    if pyro_pool:
+        from crawlers.pyro_push import CHANNEL_GAP_FILL_INTERVAL, push_enabled, push_loop
+        if push_enabled():
+            # every account hears the channels it has joined; overlaps dedupe on the post link
+            tasks += [asyncio.create_task(push_loop(backend)) for backend in pyro_pool.backends]
+            tasks.append(asyncio.create_task(pyro_channels_loop(crawl_interval, pyro_pool, CHANNEL_GAP_FILL_INTERVAL)))
+        else:
+            tasks.append(asyncio.create_task(pyro_channels_loop(crawl_interval, pyro_pool)))
+        from crawlers.tg_sync import sync_enabled, sync_loop
+        if sync_enabled():
+            tasks.append(asyncio.create_task(sync_loop(pyro_pool)))
+    if retention_days > 0:
+        tasks.append(asyncio.create_task(retention_loop(retention_days)))
+    from crawlers.backpressure import backpressure_enabled, backpressure_loop
+    if backpressure_enabled():
+        tasks.append(asyncio.create_task(backpressure_loop()))
+    if loop_debug:
+        tasks.append(asyncio.create_task(loop_lag_watchdog(lag_threshold)))
 
 
     print("Remotebridge running. Ctrl+C to exit.")
@@ -80,8 +140,8 @@ async def async_main():
     finally:
         for t in tasks:
             t.cancel()
-        if telethon_client:
-            await telethon_client.disconnect()
+        if pyro_pool:
+            await pyro_pool.stop()
         await app.stop()
         await app.shutdown()
 